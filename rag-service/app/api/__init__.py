@@ -1,5 +1,9 @@
 """API package"""
 
 from .routes import router
+from .admin_routes import admin_router
+from .job_routes import jobs_router
+from .metrics_routes import metrics_router
+from .debug_routes import debug_router
 
-__all__ = ["router"]
\ No newline at end of file
+__all__ = ["router", "admin_router", "jobs_router", "metrics_router", "debug_router"]
\ No newline at end of file
@@ -0,0 +1,212 @@
+# RAG Service Admin Routes
+
+from fastapi import APIRouter, HTTPException
+from app.api.routes import get_batcher, get_retrieval, get_services
+from app.models.reranker import get_reranker
+from app.services.executor import ExecutorSaturatedError, get_ingest_executor, get_query_executor
+from app.services.query_cache import get_query_cache
+from app.services.single_flight import get_single_flight
+from app.services.stream_ingestion import get_active_streams
+from app.config import get_settings
+from app.utils import logger
+
+admin_router = APIRouter(prefix="/admin")
+settings = get_settings()
+
+
+def _query_cache_stats():
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return {"enabled": False}
+    return query_cache.stats()
+
+
+def _lexical_index_stats():
+    chroma_service, _ = get_services()
+    if chroma_service.lexical_index is None:
+        return {"enabled": False}
+    return chroma_service.lexical_index.stats()
+
+
+def _vector_index_stats():
+    chroma_service, _ = get_services()
+    if chroma_service.vector_index is None:
+        return {"enabled": False}
+    return chroma_service.vector_index.stats()
+
+
+def _reranker_stats():
+    reranker = get_reranker()
+    if reranker is None:
+        return {"enabled": False}
+    return reranker.stats()
+
+
+def _semantic_cache_stats():
+    semantic_cache = get_retrieval().semantic_cache
+    if semantic_cache is None:
+        return {"enabled": False}
+    return semantic_cache.stats()
+
+
+@admin_router.get("/stats")
+async def get_stats():
+    """
+    Get runtime statistics
+    
+    Worker pool load, query batching and coalescing efficiency, cache
+    usage, lexical and exact vector index sizes, re-ranker throughput, and progress of running stream ingestions.
+    """
+    try:
+        _, embedding_model = get_services()
+        
+        stats = {
+            "executors": [
+                get_query_executor().stats(),
+                get_ingest_executor().stats()
+            ],
+            "embedding_cache": embedding_model.get_cache_stats(),
+            "query_cache": _query_cache_stats(),
+            "semantic_cache": _semantic_cache_stats(),
+            "lexical_index": _lexical_index_stats(),
+            "vector_index": _vector_index_stats(),
+            "reranker": _reranker_stats(),
+            "ingest_streams": get_active_streams()
+        }
+        
+        if settings.enable_query_batching:
+            stats["query_batcher"] = get_batcher().stats()
+        
+        if settings.enable_single_flight:
+            stats["single_flight"] = get_single_flight().stats()
+        
+        return stats
+    
+    except Exception as e:
+        logger.error(f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/cache/embeddings")
+async def get_embedding_cache():
+    """Inspect the embedding cache"""
+    try:
+        _, embedding_model = get_services()
+        return embedding_model.get_cache_stats()
+    
+    except Exception as e:
+        logger.error(f"Failed to get embedding cache stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/cache/embeddings")
+async def clear_embedding_cache():
+    """Flush the embedding cache"""
+    try:
+        _, embedding_model = get_services()
+        cleared = embedding_model.clear_cache()
+        logger.info(f"Embedding cache flushed ({cleared} entries)")
+        return {"success": True, "cleared": cleared}
+    
+    except Exception as e:
+        logger.error(f"Failed to flush embedding cache: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/cache/queries")
+async def get_query_result_cache():
+    """Inspect the query result cache"""
+    try:
+        return _query_cache_stats()
+    
+    except Exception as e:
+        logger.error(f"Failed to get query cache stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/cache/queries")
+async def clear_query_result_cache():
+    """Flush the query result cache"""
+    try:
+        query_cache = get_query_cache()
+        cleared = query_cache.clear() if query_cache is not None else 0
+        logger.info(f"Query cache flushed ({cleared} entries)")
+        return {"success": True, "cleared": cleared}
+    
+    except Exception as e:
+        logger.error(f"Failed to flush query cache: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/cache/semantic")
+async def get_semantic_query_cache():
+    """Inspect the semantic query cache"""
+    try:
+        return _semantic_cache_stats()
+    
+    except Exception as e:
+        logger.error(f"Failed to get semantic cache stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/cache/semantic")
+async def clear_semantic_query_cache():
+    """Flush the semantic query cache"""
+    try:
+        semantic_cache = get_retrieval().semantic_cache
+        cleared = semantic_cache.clear() if semantic_cache is not None else 0
+        logger.info(f"Semantic cache flushed ({cleared} entries)")
+        return {"success": True, "cleared": cleared}
+    
+    except Exception as e:
+        logger.error(f"Failed to flush semantic cache: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/cache/rerank")
+async def get_rerank_cache():
+    """Inspect the re-ranker and its score cache"""
+    try:
+        return _reranker_stats()
+    
+    except Exception as e:
+        logger.error(f"Failed to get re-ranker stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/cache/rerank")
+async def clear_rerank_cache():
+    """Flush the re-ranker score cache"""
+    try:
+        reranker = get_reranker()
+        cleared = reranker.clear_cache() if reranker is not None else 0
+        logger.info(f"Re-rank score cache flushed ({cleared} entries)")
+        return {"success": True, "cleared": cleared}
+    
+    except Exception as e:
+        logger.error(f"Failed to flush re-rank score cache: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/vector-index/snapshot")
+async def snapshot_vector_index():
+    """Write the exact vector index to VECTOR_SNAPSHOT_DIR for other workers to map"""
+    if not settings.vector_snapshot_dir:
+        raise HTTPException(status_code=400, detail="VECTOR_SNAPSHOT_DIR is not configured")
+    
+    try:
+        chroma_service, _ = get_services()
+        if chroma_service.vector_index is None:
+            raise HTTPException(status_code=400, detail="Exact vector index is not enabled")
+        
+        manifest = await get_ingest_executor().run(
+            chroma_service.save_exact_index_snapshot,
+            settings.vector_snapshot_dir
+        )
+        return {"success": True, "path": settings.vector_snapshot_dir, "manifest": manifest}
+    
+    except (ExecutorSaturatedError, HTTPException):
+        raise
+    except Exception as e:
+        logger.error(f"Failed to snapshot vector index: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
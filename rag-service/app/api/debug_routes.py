@@ -0,0 +1,69 @@
+# RAG Service Debug Routes
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.config import get_settings
+from app.utils import logger
+from app.utils.tracing import get_slow_query_log, sample_stacks
+
+debug_router = APIRouter(prefix="/debug")
+settings = get_settings()
+
+# One profile at a time: concurrent samplers would mostly sample each other
+_profile_lock = asyncio.Lock()
+
+
+@debug_router.get("/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=1000)):
+    """
+    Span trees of the slowest recent /query requests
+
+    Requests are traced when ENABLE_TRACING is set; those taking at least
+    SLOW_QUERY_THRESHOLD_MS are kept in a ring buffer of SLOW_QUERY_LOG_SIZE.
+    """
+    slow_log = get_slow_query_log()
+    return {
+        "tracing": settings.enable_tracing,
+        **slow_log.stats(),
+        "queries": slow_log.entries()[:limit]
+    }
+
+
+@debug_router.delete("/slow-queries")
+async def clear_slow_queries():
+    """Empty the slow query buffer"""
+    cleared = get_slow_query_log().clear()
+    logger.info(f"Slow query log cleared ({cleared} entries)")
+    return {"success": True, "cleared": cleared}
+
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    include_idle: bool = Query(False, description="Keep stacks of threads waiting for work")
+):
+    """
+    Sample every thread's stack for a while and return the collapsed stacks
+
+    One 'thread;outer;...;inner count' line per distinct stack, ready for
+    flamegraph.pl or speedscope.
+    """
+    if seconds > settings.profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.profile_max_seconds}")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None,
+            lambda: sample_stacks(seconds, interval_ms / 1000.0, include_idle)
+        )
+
+    logger.info(f"Profiled {result['samples']} samples over {seconds}s")
+    return PlainTextResponse(
+        result["collapsed"] + "\n",
+        headers={"X-Profile-Samples": str(result["samples"])}
+    )
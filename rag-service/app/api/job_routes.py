@@ -0,0 +1,109 @@
+# RAG Service Ingestion Job Routes
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.api.routes import get_services
+from app.services.job_service import get_job_manager
+from app.services.stream_ingestion import DocumentTooLargeError
+from app.config import get_settings
+from app.utils import logger
+
+jobs_router = APIRouter(prefix="/jobs")
+settings = get_settings()
+
+
+async def get_jobs():
+    """Get the job manager, starting its workers on first use"""
+    chroma_service, _ = get_services()
+    manager = get_job_manager(chroma_service)
+    await manager.start()
+    return manager
+
+
+@jobs_router.post("", status_code=202)
+async def submit_job(request: Request):
+    """
+    Submit a background ingestion job
+    
+    Accepts a JSON array of documents (or {"documents": [...]}), or an
+    NDJSON body when sent as application/x-ndjson. Returns the job ID
+    immediately; poll /jobs/{id} for progress.
+    
+    Documents are synced like /documents/add: resubmitting a doc_id
+    replaces the chunks stored for it.
+    """
+    try:
+        manager = await get_jobs()
+        
+        if "ndjson" in request.headers.get("content-type", ""):
+            return await manager.submit_stream(
+                request.stream(),
+                int(settings.stream_max_document_mb * 1024 * 1024)
+            )
+        
+        body = await request.json()
+        documents = body.get('documents') if isinstance(body, dict) else body
+        if not isinstance(documents, list):
+            raise HTTPException(status_code=400, detail="Expected a list of documents")
+        invalid = [i for i, doc in enumerate(documents) if not isinstance(doc, dict)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Documents must be JSON objects (items {invalid[:10]})")
+        
+        return await manager.submit_documents([
+            {"content": doc.get('content', ''), "metadata": doc.get('metadata', {})}
+            for doc in documents
+        ])
+    
+    except HTTPException:
+        raise
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to submit job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@jobs_router.get("")
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """List the most recent ingestion jobs"""
+    try:
+        manager = await get_jobs()
+        return {"jobs": manager.list(limit)}
+    
+    except Exception as e:
+        logger.error(f"Failed to list jobs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@jobs_router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get job status
+    
+    Includes progress, throughput (documents and chunks per second),
+    ETA and recorded errors.
+    """
+    manager = await get_jobs()
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@jobs_router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job; a running job stops after its current batch"""
+    manager = await get_jobs()
+    job = manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@jobs_router.post("/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Requeue a failed or cancelled job from its last checkpoint"""
+    manager = await get_jobs()
+    job = manager.resume(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -0,0 +1,105 @@
+# RAG Service Metrics Route
+
+import os
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.api.routes import current_services
+from app.models.reranker import get_reranker
+from app.services.executor import get_ingest_executor, get_query_executor
+from app.services.query_cache import get_query_cache
+from app.services.semantic_cache import get_semantic_cache
+from app.utils import logger
+
+metrics_router = APIRouter()
+
+
+class RuntimeCollector:
+    """
+    Reads cache, pool and collection state when Prometheus scrapes
+
+    These values already live in the services' stats(), so they are
+    collected on demand rather than updated on every request. The
+    collection size comes from ChromaService.count(), which is cached
+    until the next write.
+
+    Only services that already exist are read: a scrape (or registering
+    the collector, which collects once) never loads a model or opens the
+    collection, and whatever is not up yet is left out.
+    """
+
+    def _caches(self, embedding_model):
+        stats = {}
+        if embedding_model is not None:
+            stats["embedding"] = embedding_model.get_cache_stats()
+        if get_query_cache.cache_info().currsize:
+            query_cache = get_query_cache()
+            if query_cache is not None:
+                stats["query"] = query_cache.stats()
+        if embedding_model is not None and get_semantic_cache.cache_info().currsize:
+            semantic_cache = get_semantic_cache(embedding_model.get_dimension())
+            if semantic_cache is not None:
+                stats["semantic"] = semantic_cache.stats()
+        if get_reranker.cache_info().currsize:
+            reranker = get_reranker()
+            if reranker is not None and reranker.cache is not None:
+                stats["rerank"] = reranker.cache.stats()
+        return {name: s for name, s in stats.items() if s.get("enabled", True) and "hits" in s}
+
+    def collect(self):
+        try:
+            chroma_service, embedding_model = current_services()
+            caches = self._caches(embedding_model)
+        except Exception as e:
+            logger.warning(f"Metrics collection skipped: {e}")
+            return
+
+        if chroma_service is not None:
+            collection = GaugeMetricFamily("rag_collection_chunks", "Chunks in the collection", labels=["collection"])
+            collection.add_metric([chroma_service.collection_name], chroma_service.count())
+            yield collection
+
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("rag_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        entries = GaugeMetricFamily("rag_cache_entries", "Entries held by the cache", labels=["cache"])
+        for name, stats in caches.items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+            entries.add_metric([name], stats["entries"])
+        yield from (hits, misses, ratio, entries)
+
+        pending = GaugeMetricFamily("rag_executor_pending", "Tasks running or queued in the pool", labels=["executor"])
+        capacity = GaugeMetricFamily("rag_executor_capacity", "Tasks the pool accepts before rejecting", labels=["executor"])
+        rejected = CounterMetricFamily("rag_executor_rejected", "Tasks rejected with 503", labels=["executor"])
+        for executor in (get_query_executor(), get_ingest_executor()):
+            stats = executor.stats()
+            pending.add_metric([stats["name"]], stats["pending"])
+            capacity.add_metric([stats["name"]], stats["capacity"])
+            rejected.add_metric([stats["name"]], stats["rejected"])
+        yield from (pending, capacity, rejected)
+
+
+def _registry() -> CollectorRegistry:
+    """Registry to expose: per-process, or merged across workers in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_runtime_collector)
+    return registry
+
+
+_runtime_collector = RuntimeCollector()
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    REGISTRY.register(_runtime_collector)
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
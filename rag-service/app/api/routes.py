@@ -1,12 +1,31 @@
 # RAG Service API Routes
 
-from fastapi import APIRouter, HTTPException, Query, Body
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response, UploadFile, File, Form
+from typing import List, Dict, Any, Literal, Optional, Union
+import asyncio
+import json
+import os
+import tempfile
+import time
 from pydantic import BaseModel, Field
 from app.services.chroma_service import get_chroma_service
+from app.services.executor import ExecutorSaturatedError, get_ingest_executor, get_query_executor
+from app.services.ingestion_service import prepare_chunks, prepare_document
+from app.services.lexical_index import validate_where
+from app.services.parsing_service import parse_file
+from app.services.query_batcher import get_query_batcher
+from app.services.query_cache import QueryResultCache, get_query_cache
+from app.services.retrieval_service import get_retrieval_service
+from app.services.job_service import get_job_manager
+from app.services.semantic_cache import get_semantic_cache
+from app.services.stream_ingestion import DocumentTooLargeError, StreamIngestion
+from app.services.single_flight import get_single_flight
 from app.models.embeddings import get_embedding_model
+from app.models.reranker import get_reranker
 from app.config import get_settings
-from app.utils import chunk_text, clean_text, extract_metadata_from_text, logger
+from app.utils import logger
+from app.utils.tracing import annotate, span
+from app.utils.document_parsers import detect_type
 
 router = APIRouter()
 settings = get_settings()
@@ -31,18 +50,98 @@ def get_services():
             settings.chroma_persist_dir,
             settings.chroma_collection_name,
             _embedding_model,
-            settings.chroma_distance_metric
+            settings.chroma_distance_metric,
+            settings.chroma_hnsw_m,
+            settings.chroma_hnsw_construction_ef,
+            settings.chroma_hnsw_search_ef
         )
+        if settings.enable_lexical_index:
+            _chroma_service.enable_lexical_index(settings.bm25_k1, settings.bm25_b)
+        if settings.vector_index_mode == "exact":
+            _chroma_service.enable_exact_index(
+                settings.vector_index_dtype,
+                settings.vector_snapshot_dir,
+                settings.vector_index_rescore
+            )
     
     return _chroma_service, _embedding_model
 
 
+def current_services():
+    """
+    Services if they are already up (initialized here or at startup), else
+    (None, None); never loads a model or opens the collection
+    """
+    if _chroma_service is None and not get_chroma_service.cache_info().currsize:
+        return None, None
+    return get_services()
+
+
+def get_retrieval():
+    """Get the retrieval pipeline bound to the current services"""
+    chroma_service, embedding_model = get_services()
+    return get_retrieval_service(
+        chroma_service,
+        get_semantic_cache(embedding_model.get_dimension()),
+        settings.hybrid_candidates,
+        settings.rrf_k,
+        get_reranker(),
+        settings.rerank_candidates,
+        settings.diversity_candidates,
+        settings.max_fetch_k
+    )
+
+
+def get_batcher():
+    """Get the query micro-batcher bound to the current services"""
+    return get_query_batcher(
+        get_retrieval(),
+        get_query_executor(),
+        settings.query_batch_max_size,
+        settings.query_batch_max_wait_ms
+    )
+
+
 # Request/Response Models
 class QueryRequest(BaseModel):
     query: str = Field(..., description="Search query text")
     top_k: int = Field(5, ge=1, le=20, description="Number of results")
-    filter_category: Optional[str] = Field(None, description="Filter by category")
-    similarity_threshold: Optional[float] = Field(None, ge=0.0, le=1.0)
+    filter_category: Optional[Union[str, List[str]]] = Field(None, description="Filter by category (one or any of several)")
+    filter_topic: Optional[Union[str, List[str]]] = Field(None, description="Filter by topic")
+    filter_urgency: Optional[Union[str, List[str]]] = Field(None, description="Filter by urgency")
+    filter_source: Optional[Union[str, List[str]]] = Field(None, description="Filter by source")
+    where: Optional[Dict[str, Any]] = Field(None, description="Raw Chroma metadata filter, combined with the above")
+    similarity_threshold: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="Minimum similarity; defaults to SIMILARITY_THRESHOLD, 0 disables"
+    )
+    mode: Optional[Literal["vector", "lexical", "hybrid"]] = Field(
+        None,
+        description="vector, lexical (BM25 only) or hybrid (both, rank-fused); defaults to RETRIEVAL_MODE"
+    )
+
+    rerank: Optional[bool] = Field(None, description="Re-rank with the cross-encoder; defaults to ENABLE_RERANKING")
+    diversity: Optional[float] = Field(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="MMR trade-off: 0 = relevance only, 1 = novelty only"
+    )
+    collapse_by_source: bool = Field(False, description="Return at most one chunk per document")
+
+    @property
+    def retrieval_mode(self) -> str:
+        return self.mode or settings.retrieval_mode
+
+    @property
+    def use_reranker(self) -> bool:
+        return settings.enable_reranking if self.rerank is None else self.rerank
+
+    @property
+    def threshold(self) -> float:
+        return settings.similarity_threshold if self.similarity_threshold is None else self.similarity_threshold
 
 
 class QueryResponse(BaseModel):
@@ -50,6 +149,18 @@ class QueryResponse(BaseModel):
     query: str
     count: int
     results: List[Dict[str, Any]]
+    cache: Optional[Dict[str, Any]] = None
+    rerank: Optional[Dict[str, Any]] = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=50, description="Queries to run together")
+
+
+class BatchQueryResponse(BaseModel):
+    success: bool
+    count: int
+    results: List[QueryResponse]
 
 
 class AddDocumentRequest(BaseModel):
@@ -63,52 +174,331 @@ class AddDocumentsRequest(BaseModel):
     chunk: bool = Field(True, description="Whether to chunk documents")
 
 
+class S3IngestRequest(BaseModel):
+    prefix: Optional[str] = Field(None, description="Key prefix (defaults to S3_DOCUMENTS_PREFIX)")
+    force: bool = Field(False, description="Re-ingest objects whose ETag is unchanged")
+
+
 class CollectionInfo(BaseModel):
     name: str
     count: int
     metadata: Dict[str, Any]
 
 
+# Query request fields that filter on a metadata key
+_FILTER_FIELDS = {
+    "filter_category": "category",
+    "filter_topic": "topic",
+    "filter_urgency": "urgency",
+    "filter_source": "source"
+}
+
+
+# Metadata an upload sets from each file; the form metadata may not override it
+_UPLOAD_FILE_FIELDS = ("source", "doc_id", "file_type")
+
+
+def _json_response(model: BaseModel) -> Response:
+    """
+    Serialize a response model in the handler
+    
+    FastAPI serializes a returned model after the handler has finished,
+    outside every span; serializing here keeps that time inside the
+    caller's build_response span. The response_model still documents the
+    schema.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _build_filter(request: QueryRequest) -> Optional[Dict[str, Any]]:
+    """Build the Chroma metadata filter for a query request"""
+    conditions = []
+    for field, key in _FILTER_FIELDS.items():
+        value = getattr(request, field)
+        if isinstance(value, list):
+            if value:
+                conditions.append({key: {"$in": value}})
+        elif value:
+            conditions.append({key: value})
+    
+    if request.where:
+        try:
+            # Malformed filters are the caller's error, not Chroma's
+            validate_where(request.where)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid where filter: {e}")
+        conditions.append(request.where)
+    
+    if not conditions:
+        return None
+    # Chroma's $and needs at least two clauses
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _query_options(request: QueryRequest, deadline: float) -> Dict[str, Any]:
+    """Retrieval options of a query request beyond text, top_k and filter"""
+    return {
+        "mode": request.retrieval_mode,
+        "rerank": request.use_reranker,
+        "diversity": request.diversity,
+        "collapse_by_source": request.collapse_by_source,
+        "similarity_threshold": request.threshold,
+        "deadline": deadline
+    }
+
+
+def _ingest_document(chroma_service, request: AddDocumentRequest):
+    """Clean, chunk and sync a single document (runs on the ingest pool)"""
+    document = prepare_document(
+        request.content,
+        request.metadata,
+        chunk=request.chunk,
+        # Extract additional metadata if not provided
+        extract_metadata=not request.metadata
+    )
+    
+    result = chroma_service.sync_documents([document])
+    
+    return document['chunks'], result
+
+
+def _ingest_batch(chroma_service, documents: List[Dict[str, Any]]):
+    """Clean, chunk and sync a batch of documents (runs on the ingest pool)"""
+    prepared = [
+        prepare_document(doc.get('content', ''), doc.get('metadata', {}))
+        for doc in documents
+    ]
+    
+    result = chroma_service.sync_documents(prepared)
+    
+    all_documents = [chunk for doc in prepared for chunk in doc['chunks']]
+    return all_documents, result
+
+
+async def _save_upload(upload: UploadFile) -> str:
+    """Spool an upload to UPLOAD_DIR so a parser process can read it"""
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    limit = int(settings.max_upload_mb * 1024 * 1024)
+    fd, path = tempfile.mkstemp(dir=settings.upload_dir, suffix=os.path.splitext(upload.filename or "")[1])
+    
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                data = await upload.read(1024 * 1024)
+                if not data:
+                    break
+                size += len(data)
+                if size > limit:
+                    raise ValueError(f"File exceeds {settings.max_upload_mb} MB")
+                f.write(data)
+    except BaseException:
+        os.remove(path)
+        raise
+    
+    return path
+
+
+async def _ingest_upload(chroma_service, upload: UploadFile, extra_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse, chunk and sync one uploaded file"""
+    kind = detect_type(upload.filename, upload.content_type)
+    if kind is None:
+        return {"filename": upload.filename, "success": False, "error": "Unsupported file type"}
+    
+    try:
+        path = await _save_upload(upload)
+        try:
+            parsed = await parse_file(path, kind)
+        finally:
+            os.remove(path)
+        
+        document = prepare_chunks(
+            parsed['chunks'],
+            {**extra_metadata, "source": upload.filename, "doc_id": upload.filename, "file_type": kind},
+            parsed['content_hash']
+        )
+        result = await get_ingest_executor().run_waiting(chroma_service.sync_documents, [document])
+        if not result['success']:
+            raise RuntimeError(result.get('error', 'Sync failed'))
+        
+        return {
+            "filename": upload.filename,
+            "success": True,
+            "type": kind,
+            "sections": parsed['sections'],
+            "chunks": len(document['chunks']),
+            "added": result['added'],
+            "updated": result['updated'],
+            "deleted": result['deleted'],
+            "unchanged": result['unchanged_documents'] > 0
+        }
+    
+    except Exception as e:
+        logger.error(f"Failed to ingest upload {upload.filename}: {e}")
+        return {"filename": upload.filename, "success": False, "error": str(e)}
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_knowledge(request: QueryRequest):
     """
     Query the medical knowledge base
     
-    Search for relevant medical information using semantic search.
+    Search for relevant medical information using semantic search,
+    BM25 keyword search, or both fused by reciprocal rank (`mode`).
+    Lexical mode skips the embedding model entirely, which suits exact
+    drug names and rare condition terms. With `rerank`, a larger
+    candidate pool is rescored by a cross-encoder unless that would
+    exceed RERANK_BUDGET_MS. `diversity` applies Maximal Marginal
+    Relevance so overlapping chunks do not crowd the results, and
+    `collapse_by_source` returns distinct documents.
+    
+    The similarity threshold and metadata filters (category, topic,
+    urgency, source, or a raw `where`) are applied during retrieval,
+    which fetches deeper when needed to return top_k qualifying results.
     """
     try:
+        # Re-ranking is skipped once it would run past this point
+        deadline = time.perf_counter() + settings.rerank_budget_ms / 1000.0
+        
         chroma_service, _ = get_services()
         
         # Build filter
-        filter_metadata = None
-        if request.filter_category:
-            filter_metadata = {"category": request.filter_category}
-        
-        # Query
-        result = chroma_service.query(
-            query_text=request.query,
-            top_k=request.top_k,
-            filter_metadata=filter_metadata
+        filter_metadata = _build_filter(request)
+        annotate(query=request.query[:200], top_k=request.top_k, mode=request.retrieval_mode)
+        
+        cache_key = QueryResultCache.make_key(
+            request.query,
+            request.top_k,
+            filter_metadata,
+            request.threshold,
+            chroma_service.version,
+            {k: v for k, v in _query_options(request, deadline).items() if k != "deadline"}
         )
         
-        if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error', 'Query failed'))
+        # Serve repeated lookups straight from the result cache
+        query_cache = get_query_cache()
+        if query_cache is not None:
+            with span("query_cache.get"):
+                cached = query_cache.get(cache_key)
+            if cached is not None:
+                cached['cache'] = {"hit": True, "level": "result"}
+                with span("build_response", results=len(cached.get('results', []))):
+                    return _json_response(QueryResponse(**cached))
         
-        # Filter by similarity threshold if provided
-        if request.similarity_threshold:
-            result['results'] = [
-                r for r in result['results'] 
-                if r.get('score', 0) >= request.similarity_threshold
-            ]
-            result['count'] = len(result['results'])
+        # Identical requests already in flight share one execution
+        if settings.enable_single_flight:
+            result, shared = await get_single_flight().do(
+                cache_key,
+                lambda: _execute_query(request, filter_metadata, cache_key, deadline)
+            )
+            if shared:
+                annotate(single_flight="follower")
+                result = {**result, "cache": {"hit": True, "level": "in-flight"}}
+        else:
+            result = await _execute_query(request, filter_metadata, cache_key, deadline)
         
-        return QueryResponse(**result)
+        with span("build_response", results=len(result.get('results', []))):
+            return _json_response(QueryResponse(**result))
     
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Query failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _execute_query(
+    request: QueryRequest,
+    filter_metadata: Optional[Dict[str, Any]],
+    cache_key: tuple,
+    deadline: float
+) -> Dict[str, Any]:
+    """Search and populate the result cache"""
+    # Query (off the event loop, batched with concurrent requests; lexical
+    # lookups need no encoding so they skip the batch window)
+    if settings.enable_query_batching and request.retrieval_mode != "lexical":
+        with span("query_batcher.wait"):
+            result = await get_batcher().query(
+                request.query,
+                top_k=request.top_k,
+                filter_metadata=filter_metadata,
+                **_query_options(request, deadline)
+            )
+    else:
+        with span("retrieval.search"):
+            batch = await get_query_executor().run(
+                get_retrieval().search,
+                [{
+                    "query_text": request.query,
+                    "top_k": request.top_k,
+                    "filter_metadata": filter_metadata,
+                    **_query_options(request, deadline)
+                }]
+            )
+        result = batch['results'][0] if batch['success'] else batch
+    
+    if not result['success']:
+        raise HTTPException(status_code=500, detail=result.get('error', 'Query failed'))
+    
+    # A result whose re-ranking was skipped is not what the key asks for
+    query_cache = get_query_cache()
+    if query_cache is not None and (result.get('rerank') or {}).get('reason') != "budget":
+        query_cache.set(cache_key, result)
+        result = {**result, "cache": result.get('cache') or {"hit": False}}
+    
+    return result
+
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_knowledge_batch(request: BatchQueryRequest):
+    """
+    Query the medical knowledge base with several queries at once
+    
+    All queries are encoded in one pass and searched together; results
+    are returned in request order.
+    """
+    try:
+        deadline = time.perf_counter() + settings.rerank_budget_ms / 1000.0
+        annotate(queries=len(request.queries))
+        
+        batch = await get_query_executor().run(
+            get_retrieval().search,
+            [
+                {
+                    "query_text": q.query,
+                    "top_k": q.top_k,
+                    "filter_metadata": _build_filter(q),
+                    **_query_options(q, deadline)
+                }
+                for q in request.queries
+            ]
+        )
+        
+        if not batch['success']:
+            raise HTTPException(status_code=500, detail=batch.get('error', 'Batch query failed'))
+        
+        for result in batch['results']:
+            if not result['success']:
+                raise HTTPException(status_code=500, detail=result.get('error', 'Query failed'))
+        
+        with span("build_response", results=sum(len(result['results']) for result in batch['results'])):
+            return _json_response(BatchQueryResponse(
+                success=True,
+                count=len(batch['results']),
+                results=[QueryResponse(**result) for result in batch['results']]
+            ))
+    
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/documents/add")
 async def add_document(request: AddDocumentRequest):
     """
@@ -119,43 +509,10 @@ async def add_document(request: AddDocumentRequest):
     try:
         chroma_service, _ = get_services()
         
-        # Clean content
-        content = clean_text(request.content)
-        
-        # Chunk if requested
-        if request.chunk:
-            chunks = chunk_text(
-                content,
-                chunk_size=settings.max_chunk_size,
-                overlap=settings.chunk_overlap
-            )
-        else:
-            chunks = [content]
-        
-        # Prepare documents
-        documents = []
-        metadatas = []
-        
-        for i, chunk in enumerate(chunks):
-            documents.append(chunk)
-            
-            # Build metadata
-            metadata = {
-                **request.metadata,
-                "chunk_index": i,
-                "total_chunks": len(chunks)
-            }
-            
-            # Extract additional metadata if not provided
-            if not request.metadata:
-                metadata.update(extract_metadata_from_text(chunk))
-            
-            metadatas.append(metadata)
-        
-        # Add to ChromaDB
-        result = chroma_service.add_documents(
-            documents=documents,
-            metadatas=metadatas
+        chunks, result = await get_ingest_executor().run(
+            _ingest_document,
+            chroma_service,
+            request
         )
         
         if not result['success']:
@@ -167,9 +524,17 @@ async def add_document(request: AddDocumentRequest):
             "success": True,
             "message": f"Added {len(chunks)} chunk(s)",
             "chunks": len(chunks),
+            "added": result['added'],
+            "updated": result['updated'],
+            "deleted": result['deleted'],
+            "unchanged": result['unchanged_documents'] > 0,
             "ids": result.get('ids', [])
         }
     
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to add document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -186,36 +551,15 @@ async def add_documents_batch(documents: List[Dict[str, Any]]):
     try:
         chroma_service, _ = get_services()
         
-        all_documents = []
-        all_metadatas = []
-        
-        for doc in documents:
-            content = clean_text(doc.get('content', ''))
-            metadata = doc.get('metadata', {})
-            
-            # Chunk the content
-            chunks = chunk_text(
-                content,
-                chunk_size=settings.max_chunk_size,
-                overlap=settings.chunk_overlap
-            )
-            
-            for i, chunk in enumerate(chunks):
-                all_documents.append(chunk)
-                all_metadatas.append({
-                    **metadata,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks)
-                })
-        
-        # Add all at once
-        result = chroma_service.add_documents(
-            documents=all_documents,
-            metadatas=all_metadatas
+        all_documents, result = await get_ingest_executor().run(
+            _ingest_batch,
+            chroma_service,
+            documents
         )
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result.get('error', 'Batch add failed'))
+            status = 400 if result.get('conflicts') else 500
+            raise HTTPException(status_code=status, detail=result.get('error', 'Batch add failed'))
         
         logger.info(f"Added {len(all_documents)} chunks from {len(documents)} documents")
         
@@ -223,14 +567,142 @@ async def add_documents_batch(documents: List[Dict[str, Any]]):
             "success": True,
             "message": f"Added {len(documents)} document(s)",
             "total_chunks": len(all_documents),
+            "added": result['added'],
+            "updated": result['updated'],
+            "deleted": result['deleted'],
+            "unchanged_documents": result['unchanged_documents'],
+            "duplicate_documents": result.get('duplicate_documents', 0),
             "ids": result.get('ids', [])
         }
     
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Batch add failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/documents/upload")
+async def upload_documents(
+    files: List[UploadFile] = File(..., description="PDF, DOCX, HTML, Markdown or text files"),
+    metadata: Optional[str] = Form(None, description="JSON object of metadata applied to every file")
+):
+    """
+    Upload and ingest document files
+    
+    Files are parsed page by page (PDF) or section by section (DOCX,
+    HTML, text) in a process pool and chunked as a stream, then synced
+    into the knowledge base. Each file is one document keyed by its name
+    (re-uploading a name replaces that document), so the form metadata
+    may not set source, doc_id or file_type.
+    """
+    try:
+        extra_metadata = json.loads(metadata) if metadata else {}
+        if not isinstance(extra_metadata, dict):
+            raise HTTPException(status_code=400, detail="metadata must be a JSON object")
+        reserved = [field for field in _UPLOAD_FILE_FIELDS if field in extra_metadata]
+        if reserved:
+            raise HTTPException(
+                status_code=400,
+                detail=f"metadata may not set {', '.join(reserved)}; they are taken from each file"
+            )
+        if len(files) > settings.max_upload_files:
+            raise HTTPException(status_code=400, detail=f"At most {settings.max_upload_files} files per upload")
+        names = [upload.filename for upload in files]
+        if len(set(names)) < len(names):
+            raise HTTPException(status_code=400, detail="Each uploaded file needs a distinct filename")
+        
+        chroma_service, _ = get_services()
+        
+        results = await asyncio.gather(*(
+            _ingest_upload(chroma_service, upload, extra_metadata)
+            for upload in files
+        ))
+        
+        succeeded = [r for r in results if r['success']]
+        logger.info(f"Ingested {len(succeeded)}/{len(files)} uploaded files")
+        
+        return {
+            "success": len(succeeded) == len(files),
+            "message": f"Added {len(succeeded)} file(s)",
+            "total_chunks": sum(r['chunks'] for r in succeeded),
+            "files": results
+        }
+    
+    except HTTPException:
+        raise
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="metadata must be valid JSON")
+    except Exception as e:
+        logger.error(f"Upload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/documents/stream")
+async def add_documents_stream(request: Request):
+    """
+    Add documents from an NDJSON stream
+    
+    One JSON object per line with `content` and optional `metadata`.
+    The body is read incrementally and ingested in batches of
+    MAX_DOCUMENTS_PER_BATCH through pipelined clean/chunk, embed and
+    write stages, so memory stays flat regardless of upload size.
+    Progress of running streams is reported under /admin/stats.
+    """
+    try:
+        chroma_service, _ = get_services()
+        
+        pipeline = StreamIngestion(
+            chroma_service,
+            get_ingest_executor(),
+            batch_size=settings.max_documents_per_batch,
+            queue_depth=settings.stream_queue_depth,
+            max_line_bytes=int(settings.stream_max_document_mb * 1024 * 1024)
+        )
+        result = await pipeline.run(request.stream())
+        
+        logger.info(
+            f"Streamed {result['documents_written']} documents "
+            f"({result['chunks']} chunks) in {result['elapsed_seconds']}s"
+        )
+        
+        return {
+            "success": result['error_count'] == 0,
+            "message": f"Added {result['documents_written']} document(s)",
+            **result
+        }
+    
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Stream add failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/documents/ingest-s3", status_code=202)
+async def ingest_s3(request: S3IngestRequest = Body(default_factory=S3IngestRequest)):
+    """
+    Ingest the document corpus from S3
+    
+    Queues a background job that lists S3_BUCKET_NAME under the prefix,
+    downloads new or changed objects (by ETag) concurrently and syncs
+    them into the collection. Returns the job immediately; poll
+    /jobs/{id} for progress and the final ingest report.
+    """
+    try:
+        chroma_service, _ = get_services()
+        
+        manager = get_job_manager(chroma_service)
+        await manager.start()
+        return manager.submit_s3(request.prefix, request.force)
+    
+    except Exception as e:
+        logger.error(f"Failed to queue S3 ingestion: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/collection/info", response_model=CollectionInfo)
 async def get_collection_info():
     """
@@ -238,13 +710,17 @@ async def get_collection_info():
     """
     try:
         chroma_service, _ = get_services()
-        info = chroma_service.get_collection_info()
+        info = await get_query_executor().run(chroma_service.get_collection_info)
         
         if 'error' in info:
             raise HTTPException(status_code=500, detail=info['error'])
         
         return CollectionInfo(**info)
     
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get collection info: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -259,7 +735,7 @@ async def reset_collection():
     """
     try:
         chroma_service, _ = get_services()
-        result = chroma_service.reset_collection()
+        result = await get_ingest_executor().run_waiting(chroma_service.reset_collection)
         
         if not result.get('success'):
             raise HTTPException(status_code=500, detail=result.get('error', 'Reset failed'))
@@ -268,6 +744,10 @@ async def reset_collection():
         
         return result
     
+    except ExecutorSaturatedError:
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to reset collection: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -17,11 +17,23 @@ class Settings(BaseSettings):
     chroma_persist_dir: str = "/data/chromadb"
     chroma_collection_name: str = "medical_knowledge"
     chroma_distance_metric: str = "cosine"
+    chroma_hnsw_m: int = 16
+    chroma_hnsw_construction_ef: int = 100
+    chroma_hnsw_search_ef: int = 10
+    vector_index_mode: str = "hnsw"
+    vector_index_dtype: str = "float32"
+    vector_index_rescore: int = 4
+    vector_snapshot_dir: str = ""
+    index_refresh_seconds: float = 5.0
     
     # Embeddings
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     embedding_dimension: int = 384
     embedding_device: str = "cpu"
+    embedding_backend: str = "sentence-transformers"
+    embedding_onnx_path: str = ""
+    embedding_onnx_quantized: bool = False
+    embedding_num_threads: int = 0
     
     # OpenAI (optional)
     openai_api_key: str = ""
@@ -32,16 +44,48 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = ""
     s3_bucket_name: str = "meditriage-docs"
     s3_documents_prefix: str = "medical-documents/"
+    s3_endpoint_url: str = ""
+    s3_max_workers: int = 8
     
     # Document Processing
     max_chunk_size: int = 512
     chunk_overlap: int = 50
+    chunking_mode: str = "characters"
+    chunk_max_tokens: int = 0
+    chunk_overlap_tokens: int = 16
     max_documents_per_batch: int = 100
+    stream_queue_depth: int = 2
+    stream_max_document_mb: float = 16
+    parse_workers: int = 0
+    upload_dir: str = "/tmp/rag-uploads"
+    max_upload_mb: float = 100
+    max_upload_files: int = 20
+    
+    # Background Ingestion Jobs
+    jobs_dir: str = "/data/jobs"
+    jobs_workers: int = 1
+    jobs_max_retries: int = 3
     
     # Retrieval
     default_top_k: int = 5
     max_top_k: int = 20
     similarity_threshold: float = 0.7
+    retrieval_mode: str = "vector"
+    enable_lexical_index: bool = True
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    hybrid_candidates: int = 50
+    rrf_k: int = 60
+    
+    # Cross-Encoder Re-Ranking
+    enable_reranking: bool = False
+    reranker_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    reranker_max_length: int = 512
+    rerank_candidates: int = 20
+    rerank_budget_ms: float = 250
+    reranker_cache_max_mb: float = 8
+    diversity_candidates: int = 20
+    max_fetch_k: int = 200
     
     # Logging
     log_level: str = "INFO"
@@ -50,10 +94,36 @@ class Settings(BaseSettings):
     # Cache
     enable_cache: bool = True
     cache_ttl: int = 3600
+    embedding_cache_max_mb: float = 64
+    query_cache_max_mb: float = 32
+    enable_semantic_cache: bool = True
+    semantic_cache_size: int = 1024
+    semantic_cache_max_distance: float = 0.05
+    
+    # Metrics and Tracing
+    enable_metrics: bool = True
+    enable_tracing: bool = False
+    slow_query_threshold_ms: float = 500
+    slow_query_log_size: int = 100
+    enable_debug_endpoints: bool = False
+    profile_max_seconds: float = 30
     
     # Rate Limiting
     max_requests_per_minute: int = 60
     
+    # Execution Pools
+    query_pool_workers: int = 4
+    query_queue_size: int = 64
+    ingest_pool_workers: int = 2
+    ingest_queue_size: int = 4
+    executor_retry_after: int = 1
+    
+    # Query Micro-Batching
+    enable_query_batching: bool = True
+    query_batch_max_size: int = 32
+    query_batch_max_wait_ms: float = 5.0
+    enable_single_flight: bool = True
+    
     # CORS
     cors_origins: str = "http://localhost:3000,http://localhost:3001,http://localhost:5173"
     
@@ -3,15 +3,31 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
 import time
 from app.config import get_settings
-from app.api import router
+from app.api import router, admin_router, jobs_router, metrics_router, debug_router
+from app.services.executor import ExecutorSaturatedError, get_ingest_executor, get_query_executor
+from app.services.job_service import get_job_manager
+from app.services.parsing_service import shutdown_parse_pool
 from app.utils.logger import logger
+from app.utils.metrics import QUERIES, QUERY_LATENCY, REQUEST_LATENCY, REQUESTS, REQUESTS_IN_FLIGHT
+from app.utils.tracing import get_slow_query_log, trace
 
 settings = get_settings()
 
 
+async def _refresh_collection(chroma_service, interval: float):
+    """Pick up other workers' writes every `interval` seconds (see ChromaService.refresh)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(chroma_service.refresh)
+        except Exception as e:
+            logger.error(f"Collection refresh failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle events"""
@@ -22,6 +38,8 @@ async def lifespan(app: FastAPI):
     logger.info(f"ChromaDB: {settings.chroma_persist_dir}")
     
     # Pre-load models (optional - will load on first request otherwise)
+    chroma_service = None
+    refresher = None
     try:
         from app.models.embeddings import get_embedding_model
         from app.services.chroma_service import get_chroma_service
@@ -35,10 +53,31 @@ async def lifespan(app: FastAPI):
             settings.chroma_persist_dir,
             settings.chroma_collection_name,
             embedding_model,
-            settings.chroma_distance_metric
+            settings.chroma_distance_metric,
+            settings.chroma_hnsw_m,
+            settings.chroma_hnsw_construction_ef,
+            settings.chroma_hnsw_search_ef
         )
         
+        if settings.enable_lexical_index:
+            chroma_service.enable_lexical_index(settings.bm25_k1, settings.bm25_b)
+        
+        if settings.vector_index_mode == "exact":
+            chroma_service.enable_exact_index(
+                settings.vector_index_dtype,
+                settings.vector_snapshot_dir,
+                settings.vector_index_rescore
+            )
+        
         logger.info(f"✅ Services initialized. Collection has {chroma_service.collection.count()} documents")
+        
+        if settings.index_refresh_seconds > 0:
+            refresher = asyncio.create_task(
+                _refresh_collection(chroma_service, settings.index_refresh_seconds)
+            )
+        
+        # Resume ingestion jobs interrupted by the last shutdown
+        await get_job_manager(chroma_service).start()
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
     
@@ -46,6 +85,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down RAG Service...")
+    if refresher is not None:
+        refresher.cancel()
+    if chroma_service is not None:
+        await get_job_manager(chroma_service).stop()
+    get_query_executor().shutdown(wait=False)
+    get_ingest_executor().shutdown(wait=False)
+    shutdown_parse_pool()
 
 
 # Create FastAPI app
@@ -65,21 +111,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
+# Requests traced when ENABLE_TRACING is set
+_TRACED_PATH_PREFIX = "/query"
+
+# Route whose requests feed rag_query_duration_seconds (monitoring/alerts.yaml)
+_QUERY_ROUTE = "/query"
+
+
+# Request logging, metrics and tracing middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    status_code = 500
+    traced = settings.enable_tracing and request.url.path.startswith(_TRACED_PATH_PREFIX)
     
-    response = await call_next(request)
+    if settings.enable_metrics:
+        REQUESTS_IN_FLIGHT.labels(request.method).inc()
+    try:
+        with trace(f"{request.method} {request.url.path}") if traced else nullcontext() as root:
+            response = await call_next(request)
+            status_code = response.status_code
+    finally:
+        duration = time.time() - start_time
+        if traced:
+            get_slow_query_log().record(
+                root,
+                method=request.method,
+                path=request.url.path,
+                status=status_code
+            )
+        if settings.enable_metrics:
+            REQUESTS_IN_FLIGHT.labels(request.method).dec()
+            # Label by route template, not raw path, to bound cardinality
+            route = request.scope.get("route")
+            labels = (request.method, route.path if route is not None else "unmatched", str(status_code))
+            REQUEST_LATENCY.labels(*labels).observe(duration)
+            REQUESTS.labels(*labels).inc()
+            if route is not None and route.path == _QUERY_ROUTE and request.method == "POST":
+                QUERY_LATENCY.observe(duration)
+                QUERIES.inc()
     
-    duration = time.time() - start_time
     logger.info(
-        f"{request.method} {request.url.path} - {response.status_code} - {duration:.3f}s"
+        f"{request.method} {request.url.path} - {status_code} - {duration:.3f}s"
     )
     
     return response
 
 
+# Backpressure: reject instead of queueing without limit
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    logger.warning(f"Rejected {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(settings.executor_retry_after)},
+        content={
+            "error": "Service overloaded",
+            "message": str(exc)
+        }
+    )
+
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -111,10 +203,13 @@ async def health_check():
             settings.chroma_persist_dir,
             settings.chroma_collection_name,
             embedding_model,
-            settings.chroma_distance_metric
+            settings.chroma_distance_metric,
+            settings.chroma_hnsw_m,
+            settings.chroma_hnsw_construction_ef,
+            settings.chroma_hnsw_search_ef
         )
         
-        collection_count = chroma_service.collection.count()
+        collection_count = chroma_service.count()
         
         return {
             "status": "healthy",
@@ -150,8 +245,14 @@ async def root():
             "health": "/health",
             "docs": "/docs",
             "query": "/query (POST)",
+            "query_batch": "/query/batch (POST)",
             "add_document": "/documents/add (POST)",
-            "collection_info": "/collection/info (GET)"
+            "upload_documents": "/documents/upload (POST, multipart)",
+            "stream_documents": "/documents/stream (POST, NDJSON)",
+            "collection_info": "/collection/info (GET)",
+            "jobs": "/jobs (POST), /jobs/{id} (GET)",
+            "stats": "/admin/stats (GET)",
+            "metrics": "/metrics (GET, Prometheus)"
         },
         "model": settings.embedding_model
     }
@@ -159,6 +260,12 @@ async def root():
 
 # Include API routes
 app.include_router(router, tags=["RAG Operations"])
+app.include_router(jobs_router, tags=["Ingestion Jobs"])
+app.include_router(admin_router, tags=["Admin"])
+if settings.enable_metrics:
+    app.include_router(metrics_router, tags=["Metrics"])
+if settings.enable_debug_endpoints:
+    app.include_router(debug_router, tags=["Debug"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+# Embedding Inference Backends
+
+import json
+import os
+from typing import Any, Callable, List, Tuple
+import numpy as np
+from loguru import logger
+from app.utils.tracing import span
+
+
+ONNX_CONFIG_FILE = "onnx_config.json"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+class SentenceTransformerBackend:
+    """Runs the model through sentence-transformers (PyTorch)"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        """
+        Initialize backend
+
+        Args:
+            model_name: Hugging Face model name or local path
+            device: Device to run on ('cpu', 'cuda', 'mps')
+        """
+        # Imported here so the ONNX backend never loads torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device=device)
+        self.tokenizer = self.model.tokenizer
+        self.do_lower_case = bool(getattr(self.tokenizer, "do_lower_case", False))
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.max_seq_length = self.model.max_seq_length
+        self.special_tokens = len(self.tokenizer("")["input_ids"])
+
+    def token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """Character offsets of every token in text, without truncation"""
+        return self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )["offset_mapping"]
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress: bool = False) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress,
+            convert_to_numpy=True
+        )
+
+
+class OnnxBackend:
+    """
+    Runs an exported model through ONNX Runtime on CPU
+
+    Expects a directory produced by `python -m app.models.onnx_tools export`:
+    the ONNX graph, tokenizer.json and an onnx_config.json describing
+    pooling, normalization, padding and max sequence length, so the output
+    matches the sentence-transformers pipeline of the same model. Uses the
+    `tokenizers` library directly so that torch is never imported.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: int = 0):
+        """
+        Initialize backend
+
+        Args:
+            model_dir: Directory with the exported model
+            quantized: Load the int8 dynamically quantized graph
+            num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE)) as f:
+            config = json.load(f)
+
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = config["dimension"]
+        self.max_seq_length = config["max_seq_length"]
+        self.pooling = config.get("pooling", "mean")
+        self.normalize = config.get("normalize", True)
+        self.do_lower_case = config.get("do_lower_case", False)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(
+            pad_id=config.get("pad_token_id", 0),
+            pad_token=config.get("pad_token", "[PAD]")
+        )
+
+        # Untruncated copy for counting tokens when chunking
+        self._counter = Tokenizer.from_str(self.tokenizer.to_str())
+        self._counter.no_truncation()
+        self._counter.no_padding()
+        self.special_tokens = len(self._counter.encode("").ids)
+
+        if self.pooling not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling mode for ONNX backend: {self.pooling}")
+
+        logger.info(f"ONNX Runtime session ready: {model_file}")
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            with span("tokenize", texts=min(batch_size, len(texts) - start)):
+                encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+                tokens = {
+                    "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                    "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                    "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+                }
+            feed = {name: value for name, value in tokens.items() if name in self.input_names}
+            with span("forward", shape=list(tokens["input_ids"].shape)):
+                hidden = self.session.run(None, feed)[0]
+            with span("pool"):
+                outputs.append(self._pool(hidden, tokens["attention_mask"]))
+
+        return np.concatenate(outputs)
+
+    def token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """Character offsets of every token in text, without truncation"""
+        return self._counter.encode(text, add_special_tokens=False).offsets
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+        return pooled.astype(np.float32)
+
+
+def load_token_offsets(tokenizer: str) -> Callable[[str], List[Tuple[int, int]]]:
+    """
+    Build a token offset function without loading the model (or torch)
+
+    Used by parsing worker processes for token-budget chunking.
+
+    Args:
+        tokenizer: Path to a tokenizer.json, a model directory containing
+            one, or a Hugging Face model name
+
+    Returns:
+        Function mapping text to (start, end) character offsets of its tokens
+    """
+    from tokenizers import Tokenizer
+
+    if os.path.isdir(tokenizer):
+        tokenizer = os.path.join(tokenizer, "tokenizer.json")
+    if os.path.isfile(tokenizer):
+        counter = Tokenizer.from_file(tokenizer)
+    else:
+        counter = Tokenizer.from_pretrained(tokenizer)
+    counter.no_truncation()
+    counter.no_padding()
+
+    def token_offsets(text: str) -> List[Tuple[int, int]]:
+        return counter.encode(text, add_special_tokens=False).offsets
+
+    return token_offsets
+
+
+def create_backend(
+    backend: str,
+    model_name: str,
+    device: str = "cpu",
+    onnx_path: str = "",
+    onnx_quantized: bool = False,
+    num_threads: int = 0
+) -> Any:
+    """
+    Create an embedding backend by name
+
+    Args:
+        backend: 'sentence-transformers' or 'onnx'
+        model_name: Model name (sentence-transformers backend)
+        device: Device (sentence-transformers backend)
+        onnx_path: Exported model directory (ONNX backend)
+        onnx_quantized: Use the int8 graph (ONNX backend)
+        num_threads: Intra-op threads (ONNX backend)
+
+    Returns:
+        Backend instance
+    """
+    if backend == SentenceTransformerBackend.name:
+        return SentenceTransformerBackend(model_name, device)
+    if backend == OnnxBackend.name:
+        if not onnx_path:
+            raise ValueError("EMBEDDING_ONNX_PATH must be set for the onnx backend")
+        return OnnxBackend(onnx_path, quantized=onnx_quantized, num_threads=num_threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
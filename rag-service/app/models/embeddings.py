@@ -1,32 +1,82 @@
 # Embedding Model Wrapper
 
-from sentence_transformers import SentenceTransformer
-from typing import List, Union
+import hashlib
+import time
+from typing import List, Tuple, Union
 import numpy as np
 from loguru import logger
 from functools import lru_cache
+from app.config import get_settings
+from app.models.backends import create_backend
+from app.utils.cache import LRUCache
+from app.utils.metrics import EMBED_BATCH_SIZE, EMBEDDED_TEXTS, MODEL_LOAD_SECONDS, observe_stage
+from app.utils.tracing import annotate, span
+
+# Approximate memory held by one cache entry besides the vector itself:
+# the key tuple and its digest, the array header and the LRU bookkeeping
+_EMBEDDING_ENTRY_BYTES = 400
 
 
 class EmbeddingModel:
     """Wrapper for embedding model"""
     
-    def __init__(self, model_name: str, device: str = "cpu"):
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        cache_max_mb: float = 0,
+        cache_ttl: int = 0,
+        backend: str = "sentence-transformers",
+        onnx_path: str = "",
+        onnx_quantized: bool = False,
+        num_threads: int = 0
+    ):
         """
         Initialize embedding model
         
         Args:
             model_name: Name of the model (e.g., 'sentence-transformers/all-MiniLM-L6-v2')
             device: Device to run on ('cpu', 'cuda', 'mps')
+            cache_max_mb: Memory budget of the embedding cache (0 disables it)
+            cache_ttl: Seconds before a cached embedding expires (0 = never)
+            backend: Inference backend ('sentence-transformers', 'onnx')
+            onnx_path: Directory of the exported ONNX model (onnx backend)
+            onnx_quantized: Use the int8 quantized ONNX graph (onnx backend)
+            num_threads: ONNX Runtime intra-op threads, 0 = default (onnx backend)
         """
-        logger.info(f"Loading embedding model: {model_name} on {device}")
+        logger.info(f"Loading embedding model: {model_name} on {device} ({backend})")
         
         try:
-            self.model = SentenceTransformer(model_name, device=device)
-            self.dimension = self.model.get_sentence_embedding_dimension()
+            started = time.perf_counter()
+            self.model = create_backend(
+                backend,
+                model_name,
+                device,
+                onnx_path=onnx_path,
+                onnx_quantized=onnx_quantized,
+                num_threads=num_threads
+            )
+            self.tokenizer = self.model.tokenizer
+            self.dimension = self.model.dimension
             self.model_name = model_name
             self.device = device
+            self.backend = backend
+            self.quantized = backend == "onnx" and onnx_quantized
+            
+            # Uncased models embed "Chest Pain" and "chest pain" identically
+            self._lowercase_keys = self.model.do_lower_case
+            self.cache = None
+            if cache_max_mb > 0:
+                self.cache = LRUCache(
+                    max_bytes=int(cache_max_mb * 1024 * 1024),
+                    ttl=cache_ttl,
+                    sizeof=lambda embedding: embedding.nbytes + _EMBEDDING_ENTRY_BYTES
+                )
+            
+            self.load_seconds = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.labels("embedding", model_name).set(self.load_seconds)
             
-            logger.info(f"Model loaded successfully. Dimension: {self.dimension}")
+            logger.info(f"Model loaded successfully in {self.load_seconds:.2f}s. Dimension: {self.dimension}")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             raise
@@ -40,6 +90,9 @@ class EmbeddingModel:
         """
         Generate embeddings for text(s)
         
+        Cached embeddings are reused; only texts not in the cache are
+        run through the model.
+        
         Args:
             texts: Single text or list of texts
             batch_size: Batch size for processing
@@ -53,20 +106,83 @@ class EmbeddingModel:
             if isinstance(texts, str):
                 texts = [texts]
             
-            # Generate embeddings
-            embeddings = self.model.encode(
-                texts,
-                batch_size=batch_size,
-                show_progress_bar=show_progress,
-                convert_to_numpy=True
-            )
-            
-            return embeddings
+            with span("embedding.encode", texts=len(texts)):
+                return self._encode_cached(texts, batch_size, show_progress)
         
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
             raise
     
+    def _encode_cached(
+        self,
+        texts: List[str],
+        batch_size: int,
+        show_progress: bool
+    ) -> np.ndarray:
+        """Serve texts from the cache, encoding only the misses"""
+        if self.cache is None or not texts:
+            return self._encode_uncached(texts, batch_size, show_progress)
+        
+        keys = [self._cache_key(text) for text in texts]
+        cached = [self.cache.get(key) for key in keys]
+        
+        # Encode each distinct missing text once
+        missing = {}
+        for text, key, embedding in zip(texts, keys, cached):
+            if embedding is None and key not in missing:
+                missing[key] = text
+        annotate(cache_misses=len(missing))
+        
+        if missing:
+            fresh = self._encode_uncached(list(missing.values()), batch_size, show_progress)
+            computed = {}
+            for key, embedding in zip(missing.keys(), fresh):
+                # Copy so a cached row does not pin the whole batch array
+                embedding = embedding.copy()
+                embedding.flags.writeable = False
+                self.cache.set(key, embedding)
+                computed[key] = embedding
+            cached = [
+                embedding if embedding is not None else computed[key]
+                for key, embedding in zip(keys, cached)
+            ]
+        
+        return np.stack(cached)
+    
+    def _encode_uncached(
+        self,
+        texts: List[str],
+        batch_size: int,
+        show_progress: bool
+    ) -> np.ndarray:
+        """Run texts through the model"""
+        EMBED_BATCH_SIZE.observe(len(texts))
+        EMBEDDED_TEXTS.inc(len(texts))
+        with observe_stage("encode"):
+            return self.model.encode(texts, batch_size=batch_size, show_progress=show_progress)
+    
+    def _cache_key(self, text: str) -> tuple:
+        """Build the cache key for a text: model name plus digest of the normalized text"""
+        normalized = " ".join(text.split())
+        if self._lowercase_keys:
+            normalized = normalized.lower()
+        # A fixed-size digest keeps long chunk texts out of the cache budget
+        digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+        # int8 output differs slightly from float, so keep them apart
+        return (self.model_name, self.quantized, digest)
+    
+    def get_cache_stats(self) -> dict:
+        """Get embedding cache statistics"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def clear_cache(self) -> int:
+        """Flush the embedding cache and return how many entries were dropped"""
+        if self.cache is None:
+            return 0
+        return self.cache.clear()
+    
     def encode_query(self, query: str) -> np.ndarray:
         """
         Generate embedding for a single query
@@ -79,6 +195,23 @@ class EmbeddingModel:
         """
         return self.encode(query)[0]
     
+    def token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Tokenize text without truncation
+        
+        Args:
+            text: Text to tokenize
+            
+        Returns:
+            (start, end) character offsets of every token
+        """
+        return self.model.token_offsets(text)
+    
+    @property
+    def token_budget(self) -> int:
+        """Most content tokens one text can hold before the model truncates it"""
+        return self.model.max_seq_length - self.model.special_tokens
+    
     def get_dimension(self) -> int:
         """Get embedding dimension"""
         return self.dimension
@@ -89,6 +222,8 @@ class EmbeddingModel:
             "model_name": self.model_name,
             "dimension": self.dimension,
             "device": self.device,
+            "backend": self.backend,
+            "quantized": self.quantized,
             "max_seq_length": self.model.max_seq_length
         }
 
@@ -105,4 +240,14 @@ def get_embedding_model(model_name: str, device: str = "cpu") -> EmbeddingModel:
     Returns:
         EmbeddingModel instance
     """
-    return EmbeddingModel(model_name, device)
\ No newline at end of file
+    settings = get_settings()
+    return EmbeddingModel(
+        model_name,
+        device,
+        cache_max_mb=settings.embedding_cache_max_mb if settings.enable_cache else 0,
+        cache_ttl=settings.cache_ttl,
+        backend=settings.embedding_backend,
+        onnx_path=settings.embedding_onnx_path,
+        onnx_quantized=settings.embedding_onnx_quantized,
+        num_threads=settings.embedding_num_threads
+    )
\ No newline at end of file
@@ -0,0 +1,266 @@
+# ONNX Export and Backend Parity Tools
+#
+# Usage:
+#   python -m app.models.onnx_tools export --output /data/models/minilm-onnx --quantize
+#   python -m app.models.onnx_tools parity --onnx-path /data/models/minilm-onnx
+#
+# Export needs torch and sentence-transformers; serving the exported model
+# (EMBEDDING_BACKEND=onnx) only needs onnxruntime and tokenizers.
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+import numpy as np
+from app.config import get_settings
+from app.models.backends import (
+    ONNX_CONFIG_FILE,
+    ONNX_MODEL_FILE,
+    ONNX_QUANTIZED_MODEL_FILE,
+    OnnxBackend,
+    SentenceTransformerBackend
+)
+from app.utils import chunk_text, clean_text, logger
+
+SAMPLE_DOCS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "sample_medical_docs.json")
+
+
+def _pooling_mode(config: Dict[str, Any]) -> str:
+    """Read the pooling mode from a sentence-transformers Pooling config"""
+    if config.get("pooling_mode"):
+        return config["pooling_mode"]
+    for key, mode in (
+        ("pooling_mode_cls_token", "cls"),
+        ("pooling_mode_mean_tokens", "mean"),
+        ("pooling_mode_max_tokens", "max")
+    ):
+        if config.get(key):
+            return mode
+    return "mean"
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False, opset: int = 14) -> Dict[str, Any]:
+    """
+    Export a sentence-transformers model to ONNX
+
+    Args:
+        model_name: Model name or path
+        output_dir: Directory to write the graph, tokenizer and config to
+        quantize: Also write an int8 dynamically quantized graph
+        opset: ONNX opset version
+
+    Returns:
+        Dictionary describing the written files
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    hf_model = transformer.auto_model.eval()
+    hf_model.config.return_dict = False
+    tokenizer = transformer.tokenizer
+
+    pooling = "mean"
+    normalize = False
+    for module in st_model:
+        if type(module).__name__ == "Pooling":
+            pooling = _pooling_mode(module.get_config_dict())
+        if type(module).__name__ == "Normalize":
+            normalize = True
+
+    dummy = tokenizer(["chest pain with shortness of breath"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+
+    tokenizer.save_pretrained(output_dir)
+
+    config = {
+        "model_name": model_name,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "pooling": pooling,
+        "normalize": normalize,
+        "do_lower_case": bool(getattr(tokenizer, "do_lower_case", False)),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+    files = [ONNX_MODEL_FILE]
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            model_path,
+            os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+        files.append(ONNX_QUANTIZED_MODEL_FILE)
+
+    sizes = {
+        name: round(os.path.getsize(os.path.join(output_dir, name)) / (1024 * 1024), 2)
+        for name in files
+    }
+    logger.info(f"Exported {model_name} to {output_dir}: {sizes} MB")
+
+    return {"output_dir": output_dir, "config": config, "files_mb": sizes}
+
+
+def load_sample_texts(path: str = SAMPLE_DOCS_PATH) -> List[str]:
+    """Chunk the sample corpus the same way ingestion does"""
+    settings = get_settings()
+    with open(path) as f:
+        documents = json.load(f)
+
+    texts = []
+    for doc in documents:
+        texts.extend(chunk_text(
+            clean_text(doc.get('content', '')),
+            chunk_size=settings.max_chunk_size,
+            overlap=settings.chunk_overlap
+        ))
+        topic = doc.get('metadata', {}).get('topic')
+        if topic:
+            texts.append(topic)
+    return texts
+
+
+def _timed_encode(backend: Any, texts: List[str], batch_size: int, repeats: int) -> Dict[str, Any]:
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = backend.encode(texts, batch_size=batch_size)
+        timings.append(time.perf_counter() - start)
+    return {"embeddings": embeddings, "seconds": min(timings)}
+
+
+def check_parity(
+    model_name: str,
+    onnx_path: str,
+    texts: List[str],
+    top_k: int = 5,
+    batch_size: int = 32,
+    repeats: int = 3
+) -> Dict[str, Any]:
+    """
+    Compare ONNX backends against the sentence-transformers reference
+
+    Reports per-text cosine similarity to the reference embedding, agreement
+    of brute-force top-k neighbours (every text used as a query against the
+    rest) and encode latency.
+
+    Args:
+        model_name: Reference model name
+        onnx_path: Exported model directory
+        texts: Texts to embed
+        top_k: Neighbours compared for retrieval agreement
+        batch_size: Encode batch size
+        repeats: Timing repetitions (fastest is reported)
+
+    Returns:
+        Report dictionary
+    """
+    reference = SentenceTransformerBackend(model_name)
+    ref = _timed_encode(reference, texts, batch_size, repeats)
+    ref_emb = ref["embeddings"] / np.linalg.norm(ref["embeddings"], axis=1, keepdims=True)
+
+    def neighbours(emb: np.ndarray) -> np.ndarray:
+        sims = emb @ emb.T
+        np.fill_diagonal(sims, -np.inf)
+        return np.argsort(-sims, axis=1)[:, :top_k]
+
+    ref_neighbours = neighbours(ref_emb)
+
+    report = {
+        "texts": len(texts),
+        "top_k": top_k,
+        "backends": {
+            "sentence-transformers": {"ms_per_text": round(ref["seconds"] / len(texts) * 1000, 3)}
+        }
+    }
+
+    variants = [("onnx", False)]
+    if os.path.exists(os.path.join(onnx_path, ONNX_QUANTIZED_MODEL_FILE)):
+        variants.append(("onnx-int8", True))
+
+    for label, quantized in variants:
+        backend = OnnxBackend(onnx_path, quantized=quantized)
+        run = _timed_encode(backend, texts, batch_size, repeats)
+        emb = run["embeddings"] / np.linalg.norm(run["embeddings"], axis=1, keepdims=True)
+
+        cosine = np.sum(emb * ref_emb, axis=1)
+        overlap = [
+            len(set(a) & set(b)) / top_k
+            for a, b in zip(neighbours(emb), ref_neighbours)
+        ]
+
+        report["backends"][label] = {
+            "ms_per_text": round(run["seconds"] / len(texts) * 1000, 3),
+            "speedup": round(ref["seconds"] / run["seconds"], 2),
+            "cosine_mean": round(float(cosine.mean()), 6),
+            "cosine_min": round(float(cosine.min()), 6),
+            "cosine_diff_max": round(float(1.0 - cosine.min()), 6),
+            "topk_overlap_mean": round(float(np.mean(overlap)), 4),
+            "topk_overlap_min": round(float(np.min(overlap)), 4)
+        }
+
+    return report
+
+
+def main() -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="ONNX export and parity tools for the embedding model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the embedding model to ONNX")
+    export_parser.add_argument("--model", default=settings.embedding_model)
+    export_parser.add_argument("--output", required=True, help="Output directory")
+    export_parser.add_argument("--quantize", action="store_true", help="Also write an int8 quantized graph")
+    export_parser.add_argument("--opset", type=int, default=14)
+
+    parity_parser = subparsers.add_parser("parity", help="Compare ONNX output with sentence-transformers")
+    parity_parser.add_argument("--model", default=settings.embedding_model)
+    parity_parser.add_argument("--onnx-path", default=settings.embedding_onnx_path, required=not settings.embedding_onnx_path)
+    parity_parser.add_argument("--docs", default=SAMPLE_DOCS_PATH, help="JSON document corpus")
+    parity_parser.add_argument("--top-k", type=int, default=5)
+    parity_parser.add_argument("--batch-size", type=int, default=32)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        result = export_onnx(args.model, args.output, quantize=args.quantize, opset=args.opset)
+    else:
+        result = check_parity(
+            args.model,
+            args.onnx_path,
+            load_sample_texts(args.docs),
+            top_k=args.top_k,
+            batch_size=args.batch_size
+        )
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Cross-Encoder Re-Ranker
+
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from app.config import get_settings
+from app.utils.cache import LRUCache
+from app.utils.metrics import MODEL_LOAD_SECONDS, STAGE_LATENCY
+
+# Approximate memory held by one cached (query, chunk) score
+_SCORE_ENTRY_BYTES = 160
+
+
+class CrossEncoderReranker:
+    """
+    Rescores (query, chunk) pairs with a cross-encoder
+
+    Pairs are scored in a single forward pass. Scores are cached
+    by normalized query text and chunk ID; chunk IDs are derived from the
+    chunk content, so a cached score can never belong to edited text. The
+    observed time per pair is tracked so callers can tell in advance
+    whether a rescoring pass fits their latency budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        max_length: int = 512,
+        cache_max_mb: float = 0,
+        cache_ttl: int = 0
+    ):
+        """
+        Initialize re-ranker
+
+        Args:
+            model_name: Cross-encoder model (e.g. 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+            device: Device to run on ('cpu', 'cuda', 'mps')
+            max_length: Longest query + chunk input in tokens
+            cache_max_mb: Memory budget of the score cache (0 disables it)
+            cache_ttl: Seconds before a cached score expires (0 = never)
+        """
+        logger.info(f"Loading re-ranker model: {model_name} on {device}")
+
+        from sentence_transformers import CrossEncoder
+
+        started = time.perf_counter()
+        self.model = CrossEncoder(model_name, device=device, max_length=max_length)
+        MODEL_LOAD_SECONDS.labels("reranker", model_name).set(time.perf_counter() - started)
+        self.model_name = model_name
+        self.device = device
+
+        self.cache = None
+        if cache_max_mb > 0:
+            self.cache = LRUCache(
+                max_bytes=int(cache_max_mb * 1024 * 1024),
+                ttl=cache_ttl,
+                sizeof=lambda score: _SCORE_ENTRY_BYTES
+            )
+
+        # Moving average of forward-pass seconds per pair (None until measured)
+        self._pair_seconds: Optional[float] = None
+        self._stats_lock = threading.Lock()
+        self._passes = 0
+        self._pairs_scored = 0
+
+    @staticmethod
+    def _cache_key(query: str, chunk_id: str) -> tuple:
+        return (" ".join(query.split()), chunk_id)
+
+    def cached_scores(self, query: str, chunk_ids: List[str]) -> List[Optional[float]]:
+        """Cached score of each chunk for a query, or None where not cached"""
+        if self.cache is None:
+            return [None] * len(chunk_ids)
+        return [self.cache.get(self._cache_key(query, id_)) for id_ in chunk_ids]
+
+    def estimate_seconds(self, pairs: int) -> float:
+        """Expected time to score this many uncached pairs (0 until the first pass)"""
+        if not pairs or self._pair_seconds is None:
+            return 0.0
+        return pairs * self._pair_seconds
+
+    def score(self, pairs: List[Tuple[str, str, str]]) -> List[float]:
+        """
+        Score (query, chunk_id, chunk_text) pairs in one forward pass
+
+        Callers look up cached_scores first and pass only the misses; the
+        new scores are added to the cache.
+
+        Args:
+            pairs: Pairs to score
+
+        Returns:
+            Relevance scores in the same order (higher is better)
+        """
+        if not pairs:
+            return []
+
+        started = time.perf_counter()
+        predicted = self.model.predict(
+            [(query, text) for query, _, text in pairs],
+            batch_size=len(pairs),
+            show_progress_bar=False
+        )
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels("rerank").observe(elapsed)
+
+        scores = np.asarray(predicted, dtype=np.float32).tolist()
+        if self.cache is not None:
+            for (query, chunk_id, _), value in zip(pairs, scores):
+                self.cache.set(self._cache_key(query, chunk_id), value)
+
+        with self._stats_lock:
+            per_pair = elapsed / len(pairs)
+            self._pair_seconds = per_pair if self._pair_seconds is None else 0.8 * self._pair_seconds + 0.2 * per_pair
+            self._passes += 1
+            self._pairs_scored += len(pairs)
+
+        return scores
+
+    def stats(self) -> dict:
+        """Get model, throughput and score cache statistics"""
+        with self._stats_lock:
+            stats = {
+                "enabled": True,
+                "model_name": self.model_name,
+                "passes": self._passes,
+                "pairs_scored": self._pairs_scored,
+                "ms_per_pair": round(self._pair_seconds * 1000.0, 3) if self._pair_seconds is not None else None
+            }
+        stats["cache"] = {"enabled": True, **self.cache.stats()} if self.cache is not None else {"enabled": False}
+        return stats
+
+    def clear_cache(self) -> int:
+        """Flush the score cache and return how many entries were dropped"""
+        if self.cache is None:
+            return 0
+        return self.cache.clear()
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Get the re-ranker, or None when re-ranking is disabled"""
+    settings = get_settings()
+    if not settings.enable_reranking:
+        return None
+    return CrossEncoderReranker(
+        settings.reranker_model,
+        settings.embedding_device,
+        max_length=settings.reranker_max_length,
+        cache_max_mb=settings.reranker_cache_max_mb if settings.enable_cache else 0,
+        cache_ttl=settings.cache_ttl
+    )
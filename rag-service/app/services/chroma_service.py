@@ -2,10 +2,22 @@
 
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Union
 from loguru import logger
 from functools import lru_cache
-import uuid
+from app.services.ingestion_service import chunk_id, content_hash, document_key
+from app.services.lexical_index import BM25Index
+from app.services.vector_index import ExactVectorIndex
+from app.services.write_log import last_write, writes_since
+from app.utils.metrics import CHUNKS_UPSERTED, UPSERT_BATCH_SIZE, observe_stage
+from app.utils.tracing import span
+import numpy as np
+import json
+import sqlite3
+import threading
+
+# What Chroma uses for HNSW parameters missing from a collection's metadata
+_CHROMA_HNSW_DEFAULTS = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
 
 
 class ChromaService:
@@ -16,16 +28,26 @@ class ChromaService:
         persist_directory: str,
         collection_name: str,
         embedding_function: Any,
-        distance_metric: str = "cosine"
+        distance_metric: str = "cosine",
+        hnsw_m: int = 16,
+        hnsw_construction_ef: int = 100,
+        hnsw_search_ef: int = 10
     ):
         """
         Initialize ChromaDB service
         
+        The HNSW parameters only apply when the collection is created (or
+        reset): Chroma fixes them in the index segment, so an existing
+        collection keeps the ones it was built with.
+        
         Args:
             persist_directory: Directory to persist database
             collection_name: Name of the collection
             embedding_function: Embedding function to use
             distance_metric: Distance metric ('cosine', 'l2', 'ip')
+            hnsw_m: Graph links per node (memory and recall grow with it)
+            hnsw_construction_ef: Candidate list size while building the graph
+            hnsw_search_ef: Candidate list size while searching (at least top_k)
         """
         logger.info(f"Initializing ChromaDB at {persist_directory}")
         
@@ -39,15 +61,55 @@ class ChromaService:
                 )
             )
             
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": distance_metric}
-            )
-            
+            self.persist_directory = persist_directory
             self.collection_name = collection_name
+            self.collection_metadata = {
+                "hnsw:space": distance_metric,
+                "hnsw:M": hnsw_m,
+                "hnsw:construction_ef": hnsw_construction_ef,
+                "hnsw:search_ef": hnsw_search_ef
+            }
+            
+            # Get or create collection (get_or_create_collection would overwrite
+            # the stored metadata while the index kept its old parameters)
+            try:
+                self.collection = self.client.get_collection(name=collection_name)
+                self._check_collection_metadata()
+            except ValueError:
+                self.collection = self.client.create_collection(
+                    name=collection_name,
+                    metadata=self.collection_metadata
+                )
+            
             self.embedding_function = embedding_function
             
+            # Bumped on every write so caches can tell stale results apart
+            self._version = 0
+            self._version_lock = threading.Lock()
+            
+            # (version, count) of the last count() call
+            self._count_cache = (-1, 0)
+            
+            # Optional BM25 index kept in step with every write
+            self.lexical_index: Optional[BM25Index] = None
+            
+            # Optional exact in-memory index that replaces HNSW for queries
+            self.vector_index: Optional[ExactVectorIndex] = None
+            
+            # Snapshot directory of the exact index, whether its snapshot
+            # still holds everything this process has written, and its
+            # rescoring factor (kept for reloads)
+            self.snapshot_dir = ""
+            self._snapshot_current = False
+            self._exact_rescore = 0
+            
+            # Write-log position (collection ID, seq_id) the in-process state
+            # reflects, and how often refresh() has reloaded it
+            self._log_lock = threading.Lock()
+            self._refresh_lock = threading.Lock()
+            self._reloads = 0
+            self._log_position = self._read_log_position()
+            
             logger.info(f"Collection '{collection_name}' ready. Count: {self.collection.count()}")
             
         except Exception as e:
@@ -63,36 +125,61 @@ class ChromaService:
         """
         Add documents to the collection
         
+        Writes are upserts: chunks whose ID is already stored are not
+        re-embedded, only their metadata is refreshed.
+        
         Args:
             documents: List of document texts
             metadatas: List of metadata dicts
-            ids: Optional list of IDs (auto-generated if not provided)
+            ids: Optional list of IDs (derived as prepare_document does for an
+                unchunked document if not provided)
             
         Returns:
             Dictionary with operation results
         """
         try:
-            # Generate IDs if not provided
+            # Derive deterministic IDs if not provided
             if ids is None:
-                ids = [str(uuid.uuid4()) for _ in documents]
+                ids = [
+                    chunk_id(document_key(metadata, content_hash(document)), document)
+                    for document, metadata in zip(documents, metadatas)
+                ]
             
-            # Generate embeddings
-            logger.info(f"Generating embeddings for {len(documents)} documents")
-            embeddings = self.embedding_function.encode(documents, show_progress=True)
+            # Drop duplicates within the batch (keep the first occurrence)
+            first = {}
+            for i, id_ in enumerate(ids):
+                first.setdefault(id_, i)
+            unique = sorted(first.values())
+            documents = [documents[i] for i in unique]
+            metadatas = [metadatas[i] for i in unique]
+            ids = [ids[i] for i in unique]
             
-            # Add to collection
-            self.collection.add(
-                documents=documents,
-                embeddings=embeddings.tolist(),
-                metadatas=metadatas,
-                ids=ids
-            )
+            existing = set(self.collection.get(ids=ids, include=[])['ids']) if ids else set()
             
-            logger.info(f"Added {len(documents)} documents to collection")
+            new = [i for i, id_ in enumerate(ids) if id_ not in existing]
+            known = [i for i, id_ in enumerate(ids) if id_ in existing]
+            
+            if new:
+                self._upsert(
+                    [ids[i] for i in new],
+                    [documents[i] for i in new],
+                    [metadatas[i] for i in new]
+                )
+            
+            if known:
+                self._update_metadatas(
+                    [ids[i] for i in known],
+                    [metadatas[i] for i in known]
+                )
+            
+            self._bump_version()
+            logger.info(f"Added {len(new)} documents to collection ({len(known)} already stored)")
             
             return {
                 "success": True,
                 "count": len(documents),
+                "added": len(new),
+                "skipped": len(known),
                 "ids": ids
             }
             
@@ -103,6 +190,564 @@ class ChromaService:
                 "error": str(e)
             }
     
+    def sync_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Incrementally sync whole documents into the collection
+        
+        Each document (as built by ingestion_service.prepare_document) is
+        compared with the chunks stored under its doc_key: unchanged
+        documents are skipped, new chunks are embedded and upserted, kept
+        chunks whose metadata changed are updated, and chunks no longer
+        produced by the document are deleted.
+        
+        Args:
+            documents: List of dicts with doc_key, content_hash, ids,
+                chunks and metadatas
+            
+        Returns:
+            Dictionary with operation results
+        """
+        plan = self.plan_sync(documents)
+        if not plan['success']:
+            return plan
+        return self.apply_sync(plan)
+    
+    def plan_sync(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Work out which chunks sync_documents has to add, update and delete
+        
+        Only reads the collection. The plan is applied with apply_sync,
+        which lets a pipeline embed one batch while another is written.
+        
+        Args:
+            documents: List of dicts with doc_key, content_hash, ids,
+                chunks and metadatas
+            
+        Returns:
+            Dictionary with the planned writes
+        """
+        try:
+            # A document listed twice in one batch is synced once; two
+            # different documents under one key would overwrite each other
+            by_key: Dict[str, Dict[str, Any]] = {}
+            conflicts = set()
+            duplicates = 0
+            for doc in documents:
+                previous = by_key.setdefault(doc['doc_key'], doc)
+                if previous is doc:
+                    continue
+                if previous['content_hash'] == doc['content_hash'] and previous['metadatas'] == doc['metadatas']:
+                    duplicates += 1
+                else:
+                    conflicts.add(doc['doc_key'])
+            if conflicts:
+                return {
+                    "success": False,
+                    "error": f"Different documents share a doc_key in one batch: {sorted(conflicts)}",
+                    "conflicts": sorted(conflicts)
+                }
+            
+            stored_ids: Dict[str, set] = {}
+            stored_metadatas: Dict[str, Dict[str, Any]] = {}
+            if by_key:
+                stored = self.collection.get(
+                    where={"doc_key": {"$in": list(by_key)}},
+                    include=["metadatas"]
+                )
+                for id_, metadata in zip(stored['ids'], stored['metadatas']):
+                    stored_ids.setdefault(metadata.get('doc_key'), set()).add(id_)
+                    stored_metadatas[id_] = metadata
+            
+            add_ids, add_chunks, add_metadatas = [], [], []
+            update_ids, update_metadatas = [], []
+            delete_ids = []
+            unchanged = 0
+            
+            for key, doc in by_key.items():
+                old_ids = stored_ids.get(key, set())
+                new_ids = set(doc['ids'])
+                
+                # Same chunks with the same metadata (which includes the content hash)
+                if old_ids == new_ids and all(
+                    stored_metadatas[id_] == metadata
+                    for id_, metadata in zip(doc['ids'], doc['metadatas'])
+                ):
+                    unchanged += 1
+                    continue
+                
+                for id_, chunk, metadata in zip(doc['ids'], doc['chunks'], doc['metadatas']):
+                    if id_ in old_ids:
+                        if stored_metadatas[id_] != metadata:
+                            update_ids.append(id_)
+                            update_metadatas.append(metadata)
+                    else:
+                        add_ids.append(id_)
+                        add_chunks.append(chunk)
+                        add_metadatas.append(metadata)
+                
+                delete_ids.extend(old_ids - new_ids)
+            
+            return {
+                "success": True,
+                "documents": len(by_key),
+                "add_ids": add_ids,
+                "add_chunks": add_chunks,
+                "add_metadatas": add_metadatas,
+                "update_ids": update_ids,
+                "update_metadatas": update_metadatas,
+                "delete_ids": delete_ids,
+                "unchanged_documents": unchanged,
+                "duplicate_documents": duplicates,
+                "ids": [id_ for doc in by_key.values() for id_ in doc['ids']]
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to plan document sync: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def apply_sync(self, plan: Dict[str, Any], embeddings: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Write a plan produced by plan_sync
+        
+        Args:
+            plan: Planned writes
+            embeddings: Embeddings of plan['add_chunks'] (computed if not given)
+            
+        Returns:
+            Dictionary with operation results
+        """
+        try:
+            add_ids = plan['add_ids']
+            update_ids = plan['update_ids']
+            delete_ids = plan['delete_ids']
+            
+            if add_ids:
+                self._upsert(add_ids, plan['add_chunks'], plan['add_metadatas'], embeddings)
+            if update_ids:
+                self._update_metadatas(update_ids, plan['update_metadatas'])
+            if delete_ids:
+                self._delete(delete_ids)
+            
+            if add_ids or update_ids or delete_ids:
+                self._bump_version()
+            
+            logger.info(
+                f"Synced {plan['documents']} documents: {len(add_ids)} chunks added, "
+                f"{len(update_ids)} updated, {len(delete_ids)} deleted, "
+                f"{plan['unchanged_documents']} documents unchanged"
+            )
+            
+            return {
+                "success": True,
+                "documents": plan['documents'],
+                "added": len(add_ids),
+                "updated": len(update_ids),
+                "deleted": len(delete_ids),
+                "unchanged_documents": plan['unchanged_documents'],
+                "duplicate_documents": plan.get('duplicate_documents', 0),
+                "ids": plan['ids']
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to sync documents: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def _upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """Embed (unless embeddings are given) and upsert chunks"""
+        if embeddings is None:
+            logger.info(f"Generating embeddings for {len(documents)} documents")
+            embeddings = self.embedding_function.encode(documents, show_progress=True)
+        
+        started = self._write_started()
+        with observe_stage("upsert"):
+            # Chroma 0.4 only accepts embeddings as lists of Python floats
+            self.collection.upsert(
+                documents=documents,
+                embeddings=embeddings.tolist(),
+                metadatas=metadatas,
+                ids=ids
+            )
+        self._write_finished(started, len(ids))
+        CHUNKS_UPSERTED.inc(len(ids))
+        UPSERT_BATCH_SIZE.observe(len(ids))
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, documents, metadatas)
+        if self.vector_index is not None:
+            self.vector_index.add(ids, embeddings, documents, metadatas)
+        self._invalidate_snapshot()
+    
+    def _update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace the metadata of stored chunks"""
+        started = self._write_started()
+        self.collection.update(ids=ids, metadatas=metadatas)
+        self._write_finished(started, len(ids))
+        if self.lexical_index is not None:
+            self.lexical_index.update_metadata(ids, metadatas)
+        if self.vector_index is not None:
+            self.vector_index.update_metadata(ids, metadatas)
+        self._invalidate_snapshot()
+    
+    def _delete(self, ids: List[str]) -> None:
+        """Delete stored chunks"""
+        started = self._write_started()
+        self.collection.delete(ids=ids)
+        self._write_finished(started, len(ids))
+        if self.lexical_index is not None:
+            self.lexical_index.remove(ids)
+        if self.vector_index is not None:
+            self.vector_index.remove(ids)
+        self._invalidate_snapshot()
+    
+    def enable_lexical_index(self, k1: float = 1.2, b: float = 0.75) -> BM25Index:
+        """
+        Build the BM25 index over the collection (once) and keep it updated
+        
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            
+        Returns:
+            The collection's BM25Index
+        """
+        with self._version_lock:
+            if self.lexical_index is None:
+                index = BM25Index(k1=k1, b=b)
+                index.load(self.collection)
+                self.lexical_index = index
+        return self.lexical_index
+    
+    def enable_exact_index(
+        self,
+        dtype: str = "float32",
+        snapshot_dir: str = "",
+        rescore: int = 0
+    ) -> ExactVectorIndex:
+        """
+        Load every embedding into an exact in-memory index (once) and serve
+        vector queries from it instead of the HNSW graph
+        
+        With a snapshot directory, a snapshot whose content fingerprint
+        matches the collection is memory-mapped; otherwise a child process
+        builds one from the collection (see export_in_subprocess) and it is
+        mapped, so every worker on the host shares one copy and none of
+        them loads Chroma's HNSW segment (float32 vectors and graph) until
+        it writes. The first write afterwards invalidates the snapshot; the
+        other workers see the write on their next refresh(), and the first
+        of them to get there writes a new snapshot that the rest map.
+        
+        A float16/int8 snapshot also holds the float32 rows, which stay on
+        disk except for the candidates rescoring reads, so compact types
+        need a snapshot directory. Without one, a float32 index is built in
+        process, and its matrix comes on top of the HNSW segment that
+        loading it brings in.
+        
+        Args:
+            dtype: Matrix storage type ('float32', 'float16' for half the
+                memory, 'int8' for a quarter)
+            snapshot_dir: Directory of a memory-mapped snapshot (required
+                for float16/int8)
+            rescore: For float16/int8, re-rank this many candidates per
+                result by their float32 rows (0 = off)
+            
+        Returns:
+            The collection's ExactVectorIndex
+            
+        Raises:
+            ValueError: A float16/int8 index without a snapshot directory
+        """
+        if dtype != "float32" and not snapshot_dir:
+            raise ValueError(f"{dtype} exact indexes need a snapshot directory (VECTOR_SNAPSHOT_DIR)")
+        
+        with self._version_lock:
+            if self.vector_index is None:
+                index = self._load_exact_index(dtype, snapshot_dir)
+                if rescore > 0:
+                    index.enable_rescoring(rescore)
+                self.vector_index = index
+                self._exact_rescore = rescore
+                self.snapshot_dir = snapshot_dir
+                self._snapshot_current = bool(snapshot_dir)
+                logger.info(
+                    f"Exact vector index ready: {len(index)} chunks, {index.nbytes / (1024 * 1024):.1f} MB "
+                    f"{index.dtype} ({'mapped' if index.mapped else 'private'})"
+                )
+        return self.vector_index
+    
+    def _load_exact_index(self, dtype: str, snapshot_dir: str) -> ExactVectorIndex:
+        """
+        Map the snapshot if it matches the collection; otherwise export one
+        in a child process and map it (without a snapshot directory, build
+        the index from the collection in process)
+        """
+        if not snapshot_dir:
+            return self._build_exact_index(dtype)
+        
+        from app.services.vector_snapshot import export_in_subprocess, open_snapshot, snapshot_lock
+        
+        # Workers needing the same snapshot wait here and map the first one's
+        with snapshot_lock(snapshot_dir):
+            fingerprint = self.content_fingerprint()
+            index = self._open_snapshot(snapshot_dir, dtype, fingerprint)
+            if index is None:
+                export_in_subprocess(
+                    self.persist_directory,
+                    self.collection_name,
+                    snapshot_dir,
+                    dtype,
+                    self.embedding_function.get_dimension()
+                )
+                index = open_snapshot(snapshot_dir)
+        return index
+    
+    def _build_exact_index(self, dtype: str) -> ExactVectorIndex:
+        """Load an exact index from the collection"""
+        index = ExactVectorIndex(
+            self.embedding_function.get_dimension(),
+            distance_metric=self._distance_metric(),
+            dtype=dtype
+        )
+        index.load(self.collection)
+        return index
+    
+    def _open_snapshot(self, snapshot_dir: str, dtype: str, fingerprint: str) -> Optional[ExactVectorIndex]:
+        """Map the snapshot if it matches the collection contents and index settings, else None"""
+        from app.services.vector_snapshot import open_snapshot, read_manifest
+        
+        manifest = read_manifest(snapshot_dir)
+        if manifest is None:
+            return None
+        
+        expected = {
+            "fingerprint": fingerprint,
+            "count": self.collection.count(),
+            "dimension": self.embedding_function.get_dimension(),
+            "dtype": dtype,
+            "distance_metric": self._distance_metric(),
+            "full_precision": dtype != "float32"
+        }
+        stale = {key: manifest.get(key) for key, value in expected.items() if manifest.get(key) != value}
+        if stale:
+            logger.warning(f"Ignoring vector snapshot in {snapshot_dir}: {stale} != collection {expected}")
+            return None
+        
+        try:
+            index = open_snapshot(snapshot_dir)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable vector snapshot in {snapshot_dir}: {e}")
+            return None
+        
+        logger.info(f"Mapped vector snapshot from {snapshot_dir}: {len(index)} chunks")
+        return index
+    
+    def save_exact_index_snapshot(self, snapshot_dir: str) -> Dict[str, Any]:
+        """
+        Snapshot the collection for the exact index (which must be enabled)
+        to a directory
+        
+        The snapshot is exported from the collection in a child process
+        (see export_in_subprocess), so it includes other workers' writes
+        and this process neither loads Chroma's HNSW segment nor reads the
+        float32 rows of a compact index into memory.
+        """
+        if self.vector_index is None:
+            raise ValueError("Exact vector index is not enabled")
+        
+        from app.services.vector_snapshot import export_in_subprocess, read_manifest, snapshot_lock
+        
+        with snapshot_lock(snapshot_dir):
+            export_in_subprocess(
+                self.persist_directory,
+                self.collection_name,
+                snapshot_dir,
+                str(self.vector_index.dtype),
+                self.vector_index.dimension
+            )
+            manifest = read_manifest(snapshot_dir)
+        if snapshot_dir == self.snapshot_dir:
+            self._snapshot_current = manifest['fingerprint'] == self.content_fingerprint()
+        return manifest
+    
+    def content_fingerprint(self) -> str:
+        """Identity of the collection's contents, changed by every write (see collection_fingerprint)"""
+        from app.services.vector_snapshot import collection_fingerprint
+        
+        return collection_fingerprint(self.persist_directory, self.collection)
+    
+    def _invalidate_snapshot(self) -> None:
+        """Retire the exact index's snapshot once the collection moves past it"""
+        if not self._snapshot_current:
+            return
+        
+        from app.services.vector_snapshot import invalidate_snapshot
+        
+        self._snapshot_current = False
+        invalidate_snapshot(self.snapshot_dir)
+        logger.info(f"Vector snapshot in {self.snapshot_dir} invalidated by a write; the next start rebuilds it")
+    
+    def refresh(self) -> bool:
+        """
+        Catch up with writes other processes made to the collection
+        
+        The BM25 and exact indexes, the cached count and the collection
+        version follow this process's own writes, so with several workers
+        on one persist directory they miss everyone else's. This compares
+        the collection's position in Chroma's write log (see write_log) with
+        the one they reflect; if another process has written since, the
+        collection is looked up again, the indexes rebuilt and the version
+        bumped, which also retires cached query results. Own writes move the
+        position along as they are made and cause no reload. Queries keep
+        using the old index while the new one loads.
+        
+        Returns:
+            True if the in-process state was reloaded
+        """
+        # A reload already in progress covers this call
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            position = self._read_log_position()
+            with self._log_lock:
+                if position is None or position == self._log_position:
+                    return False
+                # Writes landing during the reload move the log past this position again
+                self._log_position = position
+                self._reloads += 1
+            
+            try:
+                self._reload()
+            except Exception as e:
+                with self._log_lock:
+                    self._log_position = None
+                logger.error(f"Failed to reload collection after outside writes: {e}")
+                return False
+            
+            self._bump_version()
+            logger.info(f"Reloaded collection '{self.collection_name}' after writes by another process")
+            return True
+        finally:
+            self._refresh_lock.release()
+    
+    def _reload(self) -> None:
+        """Rebuild the in-process state from the collection"""
+        self.collection = self.client.get_collection(name=self.collection_name)
+        if self.lexical_index is not None:
+            index = BM25Index(k1=self.lexical_index.k1, b=self.lexical_index.b)
+            index.load(self.collection)
+            self.lexical_index = index
+        if self.vector_index is not None:
+            index = self._load_exact_index(str(self.vector_index.dtype), self.snapshot_dir)
+            if self._exact_rescore > 0:
+                index.enable_rescoring(self._exact_rescore)
+            self.vector_index = index
+            self._snapshot_current = bool(self.snapshot_dir)
+    
+    def _read_log_position(self) -> Optional[tuple]:
+        """(collection ID, seq_id) of the collection's newest write, or None if the log is unreadable"""
+        try:
+            return last_write(self.persist_directory, self.collection_name)
+        except sqlite3.Error as e:
+            logger.debug(f"Chroma write log unavailable: {e}")
+            return None
+    
+    def _write_started(self) -> tuple:
+        with self._log_lock:
+            return self._log_position, self._reloads
+    
+    def _write_finished(self, started: tuple, operations: int) -> None:
+        """
+        Move the write-log position past an own write
+        
+        Only when the log shows exactly this write's operations since the
+        position it started from; anything else (another process's writes,
+        or a concurrent write of this one) leaves the position behind so
+        that the next refresh() reloads.
+        """
+        position, reloads = started
+        if position is None:
+            return
+        try:
+            count, seq_id = writes_since(self.persist_directory, position[0], position[1])
+        except sqlite3.Error:
+            return
+        with self._log_lock:
+            if count == operations and (self._log_position, self._reloads) == started:
+                self._log_position = (position[0], seq_id)
+    
+    def _distance_metric(self) -> str:
+        return (self.collection.metadata or {}).get("hnsw:space", "l2")
+    
+    def _check_collection_metadata(self) -> None:
+        """Warn when an existing collection was built with other HNSW settings"""
+        stored = {**_CHROMA_HNSW_DEFAULTS, **(self.collection.metadata or {})}
+        differing = {
+            key: stored[key]
+            for key, value in self.collection_metadata.items()
+            if stored.get(key) != value
+        }
+        if differing:
+            logger.warning(
+                f"Collection '{self.collection_name}' was created with {differing}; "
+                f"configured {self.collection_metadata} apply after a reset"
+            )
+    
+    def vector_distances(
+        self,
+        ids: List[str],
+        query_embedding: Union[np.ndarray, List[float]]
+    ) -> Dict[str, float]:
+        """
+        Distances between a query embedding and stored chunks
+        
+        Computed with the collection's distance metric, so they are
+        comparable to the distances returned by query().
+        
+        Args:
+            ids: Chunk IDs
+            query_embedding: Query embedding
+            
+        Returns:
+            Dictionary of chunk ID to distance (IDs not stored are omitted)
+        """
+        stored = self.get_embeddings(ids)
+        if not stored:
+            return {}
+        
+        vectors = np.asarray(list(stored.values()), dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        space = self._distance_metric()
+        
+        if space == "cosine":
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+            distances = 1.0 - vectors @ query / np.maximum(norms, 1e-12)
+        elif space == "ip":
+            distances = 1.0 - vectors @ query
+        else:
+            distances = ((vectors - query) ** 2).sum(axis=1)
+        
+        return dict(zip(stored, distances.tolist()))
+    
+    def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Stored embedding of each chunk (IDs not stored are omitted)"""
+        if not ids:
+            return {}
+        # The exact index answers without touching Chroma's HNSW segment
+        if self.vector_index is not None:
+            return self.vector_index.get_embeddings(ids)
+        stored = self.collection.get(ids=list(dict.fromkeys(ids)), include=["embeddings"])
+        return dict(zip(stored['ids'], stored['embeddings']))
+    
     def query(
         self,
         query_text: str,
@@ -121,29 +766,19 @@ class ChromaService:
             Dictionary with query results
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_function.encode_query(query_text)
-            
-            # Query collection
-            results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=top_k,
-                where=filter_metadata
-            )
-            
-            # Format results
-            formatted_results = []
-            
-            if results['ids'] and len(results['ids'][0]) > 0:
-                for i in range(len(results['ids'][0])):
-                    formatted_results.append({
-                        "id": results['ids'][0][i],
-                        "document": results['documents'][0][i],
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
-                        "distance": results['distances'][0][i] if results['distances'] else None,
-                        "score": 1 - results['distances'][0][i] if results['distances'] else None
-                    })
+            with span("chroma.query", top_k=top_k):
+                # Generate query embedding
+                query_embedding = self.embedding_function.encode_query(query_text)
+                
+                result = self.query_by_embeddings(
+                    [query_embedding],
+                    top_k=top_k,
+                    filter_metadata=filter_metadata
+                )
+            if not result['success']:
+                return result
             
+            formatted_results = result['results'][0]
             logger.info(f"Query returned {len(formatted_results)} results")
             
             return {
@@ -161,10 +796,187 @@ class ChromaService:
                 "results": []
             }
     
+    def query_by_embeddings(
+        self,
+        query_embeddings: Union[np.ndarray, List[List[float]]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Query the collection with several precomputed embeddings in one call
+        
+        Args:
+            query_embeddings: 2D array (or list) of query embeddings
+            top_k: Number of results to return per query
+            filter_metadata: Optional metadata filter shared by all queries
+            include_embeddings: Also return each hit's stored embedding
+            
+        Returns:
+            Dictionary whose 'results' holds one formatted result list per query,
+            in the same order as query_embeddings
+        """
+        try:
+            # The exact index takes arrays as they are; Chroma wants lists
+            if self.vector_index is None:
+                if isinstance(query_embeddings, np.ndarray):
+                    query_embeddings = query_embeddings.tolist()
+                else:
+                    query_embeddings = [
+                        e.tolist() if isinstance(e, np.ndarray) else e
+                        for e in query_embeddings
+                    ]
+            
+            include = ["documents", "metadatas", "distances"]
+            if include_embeddings:
+                include.append("embeddings")
+            
+            if self.vector_index is not None:
+                with observe_stage("exact_search", queries=len(query_embeddings), top_k=top_k):
+                    results = self.vector_index.query(
+                        query_embeddings,
+                        top_k=top_k,
+                        filter_metadata=filter_metadata,
+                        include_embeddings=include_embeddings
+                    )
+            else:
+                with observe_stage("chroma_query", queries=len(query_embeddings), top_k=top_k):
+                    results = self.collection.query(
+                        query_embeddings=query_embeddings,
+                        n_results=top_k,
+                        where=filter_metadata,
+                        include=include
+                    )
+            
+            with observe_stage("format"):
+                formatted = [
+                    self._format_results(results, q)
+                    for q in range(len(query_embeddings))
+                ]
+            
+            return {
+                "success": True,
+                "results": formatted
+            }
+            
+        except Exception as e:
+            logger.error(f"Query failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "results": []
+            }
+    
+    def query_batch(
+        self,
+        queries: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """
+        Run several queries with one encode call and one search per filter
+        
+        Chroma applies a single `where` clause per call, so queries are grouped
+        by filter (and by whether they need hit embeddings); each group is searched with n_results set to its largest
+        top_k and every query's hits are trimmed back to its own top_k.
+        
+        Args:
+            queries: List of dicts with 'query_text' and optional 'top_k',
+                'filter_metadata' and 'with_embeddings'
+            embeddings: Optional precomputed query embeddings (one row per query)
+            
+        Returns:
+            Dictionary whose 'results' holds one ChromaService.query-shaped
+            result per query, in request order
+        """
+        try:
+            if not queries:
+                return {"success": True, "results": []}
+            
+            if embeddings is None:
+                embeddings = self.embedding_function.encode([q['query_text'] for q in queries])
+            
+            groups: Dict[str, List[int]] = {}
+            for i, q in enumerate(queries):
+                key = json.dumps([q.get('filter_metadata'), bool(q.get('with_embeddings'))], sort_keys=True)
+                groups.setdefault(key, []).append(i)
+            
+            results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+            for indices in groups.values():
+                top_ks = [queries[i].get('top_k', 5) for i in indices]
+                response = self.query_by_embeddings(
+                    embeddings[indices],
+                    top_k=max(top_ks),
+                    filter_metadata=queries[indices[0]].get('filter_metadata'),
+                    include_embeddings=bool(queries[indices[0]].get('with_embeddings'))
+                )
+                
+                for pos, i in enumerate(indices):
+                    if not response['success']:
+                        results[i] = response
+                        continue
+                    hits = response['results'][pos][:top_ks[pos]]
+                    results[i] = {
+                        "success": True,
+                        "query": queries[i]['query_text'],
+                        "count": len(hits),
+                        "results": hits
+                    }
+            
+            logger.info(f"Batch of {len(queries)} queries ran in {len(groups)} search call(s)")
+            
+            return {"success": True, "results": results, "search_calls": len(groups)}
+            
+        except Exception as e:
+            logger.error(f"Batch query failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "results": []
+            }
+    
+    @staticmethod
+    def _format_results(results: Dict[str, Any], q: int) -> List[Dict[str, Any]]:
+        """Format the q-th query's hits from a raw Chroma query response"""
+        formatted_results = []
+        
+        if results['ids'] and len(results['ids'][q]) > 0:
+            for i in range(len(results['ids'][q])):
+                hit = {
+                    "id": results['ids'][q][i],
+                    "document": results['documents'][q][i],
+                    "metadata": results['metadatas'][q][i] if results['metadatas'] else {},
+                    "distance": results['distances'][q][i] if results['distances'] else None,
+                    "score": 1 - results['distances'][q][i] if results['distances'] else None
+                }
+                if results.get('embeddings'):
+                    hit["embedding"] = results['embeddings'][q][i]
+                formatted_results.append(hit)
+        
+        return formatted_results
+    
+    @property
+    def version(self) -> int:
+        """Collection version, incremented after every add, delete or reset"""
+        return self._version
+    
+    def count(self) -> int:
+        """Number of chunks in the collection, cached until the next write (see refresh)"""
+        version, count = self._count_cache
+        if version != self._version:
+            version = self._version
+            count = self.collection.count()
+            self._count_cache = (version, count)
+        return count
+    
+    def _bump_version(self) -> None:
+        with self._version_lock:
+            self._version += 1
+    
     def delete_documents(self, ids: List[str]) -> Dict[str, Any]:
         """Delete documents by IDs"""
         try:
-            self.collection.delete(ids=ids)
+            self._delete(ids)
+            self._bump_version()
             logger.info(f"Deleted {len(ids)} documents")
             return {"success": True, "deleted_count": len(ids)}
         except Exception as e:
@@ -174,7 +986,7 @@ class ChromaService:
     def get_collection_info(self) -> Dict[str, Any]:
         """Get collection information"""
         try:
-            count = self.collection.count()
+            count = self.count()
             return {
                 "name": self.collection_name,
                 "count": count,
@@ -185,10 +997,22 @@ class ChromaService:
             return {"error": str(e)}
     
     def reset_collection(self) -> Dict[str, Any]:
-        """Reset (clear) the collection"""
+        """Reset (clear) the collection, recreating it with the configured HNSW settings"""
         try:
             self.client.delete_collection(name=self.collection_name)
-            self.collection = self.client.create_collection(name=self.collection_name)
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self.collection_metadata
+            )
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
+            if self.vector_index is not None:
+                self.vector_index.clear()
+                self.vector_index.distance_metric = self._distance_metric()
+            self._invalidate_snapshot()
+            with self._log_lock:
+                self._log_position = self._read_log_position()
+            self._bump_version()
             logger.warning(f"Collection '{self.collection_name}' reset")
             return {"success": True, "message": "Collection reset"}
         except Exception as e:
@@ -201,12 +1025,18 @@ def get_chroma_service(
     persist_directory: str,
     collection_name: str,
     embedding_function: Any,
-    distance_metric: str = "cosine"
+    distance_metric: str = "cosine",
+    hnsw_m: int = 16,
+    hnsw_construction_ef: int = 100,
+    hnsw_search_ef: int = 10
 ) -> ChromaService:
     """Get cached ChromaDB service instance"""
     return ChromaService(
         persist_directory,
         collection_name,
         embedding_function,
-        distance_metric
+        distance_metric,
+        hnsw_m,
+        hnsw_construction_ef,
+        hnsw_search_ef
     )
\ No newline at end of file
@@ -0,0 +1,86 @@
+# Result Diversification (MMR and Source Collapsing)
+
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+def source_key(hit: Dict[str, Any]) -> str:
+    """Document a hit belongs to: its doc_key, else its source, else its own ID"""
+    metadata = hit.get('metadata') or {}
+    return str(metadata.get('doc_key') or metadata.get('source') or hit['id'])
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    embeddings: np.ndarray,
+    k: int,
+    diversity: float = 0.5,
+    groups: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    Pick k candidates by Maximal Marginal Relevance
+
+    Each step takes the candidate maximizing
+    (1 - diversity) * relevance - diversity * (max similarity to the
+    candidates already picked). Candidate-to-candidate cosine similarities
+    come from one matrix product; each step only updates the running
+    maximum with the row of the last pick.
+
+    Args:
+        relevance: Relevance of each candidate to the query, shape (n,)
+        embeddings: Candidate embeddings, shape (n, dim)
+        k: Number of candidates to pick
+        diversity: 0 = pure relevance order, 1 = pure novelty
+        groups: Optional group label per candidate; at most one
+            candidate per group is picked
+
+    Returns:
+        Indices of the picked candidates, in pick order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    selected: List[int] = []
+
+    for _ in range(min(k, n)):
+        scores = (1.0 - diversity) * relevance - diversity * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        if not available[best]:
+            break
+
+        selected.append(best)
+        available[best] = False
+        if groups is not None:
+            available &= groups != groups[best]
+        redundancy = similarity[best] if len(selected) == 1 else np.maximum(redundancy, similarity[best])
+
+    return selected
+
+
+def collapse_by_source(hits: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    """First (best ranked) hit of each document, up to k documents"""
+    seen = set()
+    collapsed = []
+    for hit in hits:
+        key = source_key(hit)
+        if key not in seen:
+            seen.add(key)
+            collapsed.append(hit)
+            if len(collapsed) == k:
+                break
+    return collapsed
+
+
+def group_labels(hits: List[Dict[str, Any]]) -> np.ndarray:
+    """Integer document label per hit (for mmr_select groups)"""
+    labels: Dict[str, int] = {}
+    return np.array([labels.setdefault(source_key(hit), len(labels)) for hit in hits], dtype=np.int64)
@@ -0,0 +1,148 @@
+# Bounded Execution Pools
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict
+from loguru import logger
+from app.config import get_settings
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a pool's queue is full and new work is rejected"""
+
+    def __init__(self, pool_name: str, capacity: int):
+        self.pool_name = pool_name
+        self.capacity = capacity
+        super().__init__(f"'{pool_name}' pool is saturated ({capacity} tasks pending)")
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a hard cap on pending work
+
+    Blocking work (model inference, ChromaDB calls) runs on worker threads so
+    the event loop stays responsive. Admission is rejected once
+    `max_workers + max_queue` tasks are pending instead of queueing without limit.
+    Threads are used rather than processes: torch and hnswlib release the GIL
+    in their hot loops, and a process pool would load one model copy per worker.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Initialize bounded executor
+
+        Args:
+            name: Pool name (used in thread names, logs and errors)
+            max_workers: Number of worker threads
+            max_queue: Number of tasks allowed to wait for a free worker
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"rag-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+        logger.info(f"Executor '{name}' ready: {max_workers} workers, capacity {self.capacity}")
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs):
+        """
+        Submit work to the pool
+
+        Returns:
+            concurrent.futures.Future for the call
+
+        Raises:
+            ExecutorSaturatedError: If the pool is at capacity
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                raise ExecutorSaturatedError(self.name, self.capacity)
+            self._pending += 1
+
+        try:
+            # Run in a copy of the caller's context so request tracing follows the work
+            future = self._pool.submit(contextvars.copy_context().run, partial(fn, *args, **kwargs))
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        # Slot is released when the thread finishes, not when the caller
+        # stops waiting, so cancelled requests still count until done
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool and await its result
+
+        Raises:
+            ExecutorSaturatedError: If the pool is at capacity
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_waiting(self, fn: Callable[..., Any], *args, backoff: float = 0.05, **kwargs) -> Any:
+        """
+        Like run(), but wait for a free slot instead of raising
+
+        For background work that should yield to interactive requests
+        rather than fail when the pool is full.
+        """
+        while True:
+            try:
+                return await self.run(fn, *args, **kwargs)
+            except ExecutorSaturatedError:
+                await asyncio.sleep(backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": self.max_workers,
+                "capacity": self.capacity,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the worker threads"""
+        self._pool.shutdown(wait=wait)
+
+
+@lru_cache(maxsize=1)
+def get_query_executor() -> BoundedExecutor:
+    """Get the executor serving latency-sensitive query work"""
+    settings = get_settings()
+    return BoundedExecutor(
+        "query",
+        settings.query_pool_workers,
+        settings.query_queue_size
+    )
+
+
+@lru_cache(maxsize=1)
+def get_ingest_executor() -> BoundedExecutor:
+    """Get the executor serving bulk ingestion work"""
+    settings = get_settings()
+    return BoundedExecutor(
+        "ingest",
+        settings.ingest_pool_workers,
+        settings.ingest_queue_size
+    )
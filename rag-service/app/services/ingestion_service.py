@@ -0,0 +1,186 @@
+# Document Ingestion Helpers
+
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.models import get_embedding_model
+from app.utils import chunk_spans, clean_text, extract_metadata_from_text
+from app.utils.metrics import CHUNKS_PREPARED
+
+# Metadata fields that identify a document, in order of preference
+DOCUMENT_KEY_FIELDS = ("source", "topic", "title")
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_key(metadata: Dict[str, Any], doc_hash: str) -> str:
+    """
+    Stable identity of a document across re-ingestion
+
+    Uses an explicit `doc_id` when given: re-ingesting under the same
+    doc_id replaces the document. Otherwise the key is the source/topic/title
+    metadata plus the content hash, since documents sharing those fields
+    (every page of one guide.pdf, say) are still different documents; an
+    edited copy without a doc_id is then stored as a new document.
+    """
+    if metadata.get("doc_id"):
+        return str(metadata["doc_id"])
+
+    parts = [str(metadata[field]) for field in DOCUMENT_KEY_FIELDS if metadata.get(field)]
+    return "|".join(parts + [f"sha256:{doc_hash}"])
+
+
+def chunk_id(doc_key: str, chunk: str) -> str:
+    """Deterministic chunk ID from the document key and chunk content"""
+    return content_hash(f"{doc_key}\x00{chunk}")[:32]
+
+
+def chunking_params() -> Dict[str, Any]:
+    """
+    Chunk size, overlap and token counter for the configured chunking mode
+
+    In token mode sizes are counted with the embedding model's own
+    tokenizer, capped at what the model can take, so no chunk is silently
+    truncated at embed time.
+
+    Returns:
+        Dictionary with chunk_size, overlap and token_offsets (None in
+        character mode)
+    """
+    settings = get_settings()
+
+    if settings.chunking_mode == "tokens":
+        model = get_embedding_model(settings.embedding_model, settings.embedding_device)
+        budget = model.token_budget
+        if settings.chunk_max_tokens:
+            budget = min(budget, settings.chunk_max_tokens)
+        return {
+            "chunk_size": budget,
+            "overlap": settings.chunk_overlap_tokens,
+            "token_offsets": model.token_offsets
+        }
+
+    return {
+        "chunk_size": settings.max_chunk_size,
+        "overlap": settings.chunk_overlap,
+        "token_offsets": None
+    }
+
+
+def split_document(content: str) -> List[Tuple[int, int]]:
+    """
+    Chunk cleaned document text using the configured chunking mode
+
+    Args:
+        content: Cleaned document text
+
+    Returns:
+        List of (start, end) character offsets of the chunks
+    """
+    return chunk_spans(content, **chunking_params())
+
+
+def prepare_document(
+    content: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    chunk: bool = True,
+    extract_metadata: bool = False,
+    chunks: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Clean and chunk a document and assign deterministic chunk IDs
+
+    Args:
+        content: Raw document text
+        metadata: Document metadata copied onto every chunk
+        chunk: Whether to split the document into chunks
+        extract_metadata: Add metadata extracted from each chunk's text
+        chunks: Precomputed chunks of the cleaned content (skips chunking)
+
+    Returns:
+        Dictionary with doc_key, content_hash, ids, chunks and metadatas,
+        ready for ChromaService.sync_documents
+    """
+    metadata = metadata or {}
+    content = clean_text(content)
+
+    spans = None
+    if chunks is None:
+        if chunk:
+            spans = split_document(content)
+            chunks = [content[start:end] for start, end in spans]
+        else:
+            spans = [(0, len(content))]
+            chunks = [content]
+
+    return prepare_chunks(
+        chunks,
+        metadata,
+        content_hash(content),
+        spans=spans,
+        extract_metadata=extract_metadata
+    )
+
+
+def prepare_chunks(
+    chunks: List[str],
+    metadata: Dict[str, Any],
+    doc_hash: str,
+    spans: Optional[List[Tuple[int, int]]] = None,
+    extract_metadata: bool = False
+) -> Dict[str, Any]:
+    """
+    Assign deterministic IDs and metadata to the chunks of one document
+
+    Args:
+        chunks: Chunks in document order
+        metadata: Document metadata copied onto every chunk
+        doc_hash: Content hash of the whole (cleaned) document
+        spans: Optional (start, end) offsets of each chunk in the document
+        extract_metadata: Add metadata extracted from each chunk's text
+
+    Returns:
+        Dictionary with doc_key, content_hash, ids, chunks and metadatas,
+        ready for ChromaService.sync_documents
+    """
+    doc_key = document_key(metadata, doc_hash)
+
+    # Identical chunks within a document would collide on ID; keep the first
+    ids, unique_chunks, unique_spans = [], [], []
+    seen = set()
+    for i, text in enumerate(chunks):
+        cid = chunk_id(doc_key, text)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        ids.append(cid)
+        unique_chunks.append(text)
+        unique_spans.append(spans[i] if spans else None)
+
+    CHUNKS_PREPARED.inc(len(ids))
+
+    metadatas = []
+    for i, (text, span) in enumerate(zip(unique_chunks, unique_spans)):
+        chunk_metadata = {
+            **metadata,
+            "chunk_index": i,
+            "total_chunks": len(unique_chunks),
+            "doc_key": doc_key,
+            "content_hash": doc_hash
+        }
+        if span:
+            chunk_metadata["char_start"], chunk_metadata["char_end"] = span
+        if extract_metadata:
+            chunk_metadata.update(extract_metadata_from_text(text))
+        metadatas.append(chunk_metadata)
+
+    return {
+        "doc_key": doc_key,
+        "content_hash": doc_hash,
+        "ids": ids,
+        "chunks": unique_chunks,
+        "metadatas": metadatas
+    }
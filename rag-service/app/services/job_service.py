@@ -0,0 +1,585 @@
+# Background Ingestion Jobs
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional
+from loguru import logger
+from app.config import get_settings
+from app.services.executor import BoundedExecutor, get_ingest_executor
+from app.services.ingestion_service import prepare_document
+from app.services.stream_ingestion import iter_lines, parse_document
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Payload bytes collected from an upload stream per file write
+_WRITE_BUFFER_BYTES = 1024 * 1024
+
+# Integer/float columns of a job record (besides id, status, timestamps)
+_COUNTERS = (
+    "total_documents", "offset", "byte_offset", "chunks", "added",
+    "updated", "deleted", "skipped", "failed_documents", "error_count",
+    "processing_seconds"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL DEFAULT 'documents',
+    status TEXT NOT NULL,
+    payload_path TEXT NOT NULL,
+    total_documents INTEGER NOT NULL DEFAULT 0,
+    offset INTEGER NOT NULL DEFAULT 0,
+    byte_offset INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed_documents INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    errors TEXT NOT NULL DEFAULT '[]',
+    processing_seconds REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    result TEXT
+)
+"""
+
+# Columns added after the first release, for stores created before them
+_ADDED_COLUMNS = {
+    "kind": "TEXT NOT NULL DEFAULT 'documents'",
+    "result": "TEXT",
+    "updated": "INTEGER NOT NULL DEFAULT 0",
+    "deleted": "INTEGER NOT NULL DEFAULT 0"
+}
+
+
+class JobStore:
+    """
+    SQLite store of ingestion jobs and their checkpoints
+
+    The checkpoint of a job is its `offset` (documents committed) and
+    `byte_offset` (position in the payload file just after the last
+    committed line), written after every batch. S3 jobs (`kind` 's3')
+    have no checkpoint of their own: their payload is the ingest request,
+    and a rerun skips the objects already synced by their ETag.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize job store
+
+        Args:
+            path: SQLite database file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def create(self, job_id: str, payload_path: str, total_documents: int, kind: str = "documents") -> Dict[str, Any]:
+        """Insert a queued job"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload_path, total_documents, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, payload_path, total_documents, now, now)
+            )
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update fields of a job"""
+        if 'errors' in fields:
+            fields['errors'] = json.dumps(fields['errors'])
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated_at'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record['errors'] = json.loads(record['errors'])
+        record['result'] = json.loads(record['result']) if record['result'] else None
+        return record
+
+
+class JobManager:
+    """
+    Runs ingestion jobs in the background
+
+    A submitted job's documents are written to an NDJSON payload file and
+    the job ID is returned immediately. Worker tasks take queued jobs and
+    process them in batches on the ingest pool; each batch is written with
+    ChromaService.sync_documents and then checkpointed, so resubmitting a
+    document under its doc_id replaces its old chunks as /documents/add
+    does. A later document in the same batch that reuses a doc_id with
+    different content is recorded as failed. Because unchanged documents
+    are skipped, replaying the batch that was in flight when the process
+    died costs no re-embedding.
+    Queued and running jobs are picked up again on startup and continue
+    from their checkpoint.
+
+    S3 ingestion jobs run S3Service.ingest on the ingest pool as one unit
+    and report its counters as they go.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        chroma_service: Any,
+        executor: BoundedExecutor,
+        jobs_dir: str,
+        batch_size: int = 100,
+        workers: int = 1,
+        max_retries: int = 3,
+        max_errors: int = 100,
+        s3_service: Any = None
+    ):
+        """
+        Initialize job manager
+
+        Args:
+            store: Job record store
+            chroma_service: ChromaService to write to
+            executor: Pool running the batches
+            jobs_dir: Directory for payload files
+            batch_size: Documents per batch (checkpoint interval)
+            workers: Jobs processed concurrently
+            max_retries: Attempts per batch before the job fails
+            max_errors: Errors kept per job (all are counted)
+            s3_service: S3 ingester for S3 jobs (get_s3_service if None)
+        """
+        self.store = store
+        self.chroma_service = chroma_service
+        self.executor = executor
+        self.jobs_dir = jobs_dir
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.max_retries = max(1, max_retries)
+        self.max_errors = max_errors
+        self.s3_service = s3_service
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._cancel_requested = set()
+
+    async def start(self) -> None:
+        """Start the workers and requeue unfinished jobs (idempotent)"""
+        if self._tasks:
+            return
+
+        self._queue = asyncio.Queue()
+        for job in self.store.unfinished():
+            self.store.update(job['id'], status="queued")
+            self._queue.put_nowait(job['id'])
+            logger.info(f"Resuming ingestion job {job['id']} at document {job['offset']}/{job['total_documents']}")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Stop the workers
+
+        Jobs in progress keep status 'running' with their last checkpoint
+        and are resumed on the next start.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create a job from a list of {"content", "metadata"} documents
+
+        The payload file is written from a worker thread.
+
+        Returns:
+            Job report
+        """
+        job_id = uuid.uuid4().hex
+        path = self._payload_path(job_id)
+        await asyncio.to_thread(self._write_payload, path, documents)
+        return self._enqueue(job_id, path, len(documents))
+
+    @staticmethod
+    def _write_payload(path: str, documents: List[Dict[str, Any]]) -> None:
+        with open(path, "w") as f:
+            for document in documents:
+                f.write(json.dumps(document) + "\n")
+
+    async def submit_stream(self, body: AsyncIterator[bytes], max_line_bytes: int) -> Dict[str, Any]:
+        """
+        Create a job from an NDJSON byte stream
+
+        The stream is copied to the payload file line by line; lines are
+        validated when the job runs. The file is written from a worker
+        thread about _WRITE_BUFFER_BYTES at a time, so a large upload
+        never blocks the event loop.
+
+        Returns:
+            Job report
+        """
+        job_id = uuid.uuid4().hex
+        path = self._payload_path(job_id)
+        total = 0
+        f = await asyncio.to_thread(open, path, "wb")
+        try:
+            buffer: List[bytes] = []
+            buffered = 0
+            async for line in iter_lines(body, max_line_bytes):
+                line = line.strip()
+                if not line:
+                    continue
+                buffer.append(line + b"\n")
+                buffered += len(line) + 1
+                total += 1
+                if buffered >= _WRITE_BUFFER_BYTES:
+                    await asyncio.to_thread(f.writelines, buffer)
+                    buffer, buffered = [], 0
+            if buffer:
+                await asyncio.to_thread(f.writelines, buffer)
+            await asyncio.to_thread(f.close)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.remove, path)
+            raise
+        return self._enqueue(job_id, path, total)
+
+    def submit_s3(self, prefix: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Create a job that syncs an S3 prefix into the collection
+
+        Args:
+            prefix: Key prefix (defaults to S3_DOCUMENTS_PREFIX)
+            force: Re-ingest objects whose ETag is unchanged
+
+        Returns:
+            Job report
+        """
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.jobs_dir, f"{job_id}.json")
+        with open(path, "w") as f:
+            json.dump({"prefix": prefix, "force": force}, f)
+        return self._enqueue(job_id, path, 0, kind="s3")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job report with throughput and ETA"""
+        record = self.store.get(job_id)
+        return self._report(record) if record else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Reports of the most recent jobs"""
+        return [self._report(record) for record in self.store.list(limit)]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job (stops after the current batch)"""
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        if record['status'] in ACTIVE_STATUSES:
+            self._cancel_requested.add(job_id)
+            if record['status'] == "queued":
+                self.store.update(job_id, status="cancelled", finished_at=time.time())
+        return self.get(job_id)
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Requeue a failed or cancelled job from its checkpoint"""
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        if record['status'] in ("failed", "cancelled") and os.path.exists(record['payload_path']):
+            self._cancel_requested.discard(job_id)
+            self.store.update(job_id, status="queued", finished_at=None)
+            self._queue.put_nowait(job_id)
+        return self.get(job_id)
+
+    def _payload_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.ndjson")
+
+    def _enqueue(self, job_id: str, path: str, total: int, kind: str = "documents") -> Dict[str, Any]:
+        self.store.create(job_id, path, total, kind)
+        self._queue.put_nowait(job_id)
+        if kind == "s3":
+            logger.info(f"Queued S3 ingestion job {job_id}")
+        else:
+            logger.info(f"Queued ingestion job {job_id} with {total} documents")
+        return self.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion job {job_id} crashed: {e}")
+                self.store.update(job_id, status="failed", finished_at=time.time())
+
+    async def _run_job(self, job_id: str) -> None:
+        record = self.store.get(job_id)
+        if record is None or record['status'] != "queued":
+            return
+
+        record['status'] = "running"
+        record['started_at'] = record['started_at'] or time.time()
+        self.store.update(job_id, status="running", started_at=record['started_at'])
+
+        if record['kind'] == "s3":
+            await self._run_s3_job(record)
+            return
+
+        while True:
+            if job_id in self._cancel_requested:
+                self._cancel_requested.discard(job_id)
+                self.store.update(job_id, status="cancelled", finished_at=time.time())
+                logger.info(f"Ingestion job {job_id} cancelled at document {record['offset']}")
+                return
+
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    record = await self.executor.run_waiting(self._run_batch, record)
+                    break
+                except Exception as e:
+                    logger.warning(f"Ingestion job {job_id} batch at {record['offset']} failed (attempt {attempt}): {e}")
+                    if attempt == self.max_retries:
+                        self._record_error(record, {"offset": record['offset'], "error": str(e)})
+                        self.store.update(
+                            job_id,
+                            status="failed",
+                            error_count=record['error_count'],
+                            errors=record['errors'],
+                            finished_at=time.time()
+                        )
+                        return
+                    await asyncio.sleep(2 ** (attempt - 1))
+
+            if record['status'] == "completed":
+                os.remove(record['payload_path'])
+                logger.info(f"Ingestion job {job_id} completed: {record['offset']} documents, {record['added']} chunks added")
+                return
+
+    async def _run_s3_job(self, record: Dict[str, Any]) -> None:
+        job_id = record['id']
+        with open(record['payload_path']) as f:
+            request = json.load(f)
+
+        if self.s3_service is None:
+            from app.services.s3_service import get_s3_service
+            self.s3_service = get_s3_service(self.chroma_service)
+
+        started = time.monotonic()
+        base_seconds = record['processing_seconds']
+
+        def progress(report: Dict[str, Any]) -> None:
+            self.store.update(
+                job_id,
+                total_documents=report['documents'],
+                offset=report['documents'],
+                chunks=report['chunks'],
+                added=report['added'],
+                processing_seconds=base_seconds + time.monotonic() - started
+            )
+
+        report = await self.executor.run_waiting(
+            self.s3_service.ingest,
+            request['prefix'],
+            request['force'],
+            cancelled=lambda: job_id in self._cancel_requested,
+            progress=progress
+        )
+
+        if report['cancelled']:
+            self._cancel_requested.discard(job_id)
+            status = "cancelled"
+        else:
+            status = "completed" if report['success'] else "failed"
+
+        errors = report['errors']
+        self.store.update(
+            job_id,
+            status=status,
+            total_documents=report['documents'],
+            offset=report['documents'],
+            chunks=report['chunks'],
+            added=report['added'],
+            failed_documents=sum(1 for error in errors if 'key' in error),
+            error_count=len(errors),
+            errors=errors[:self.max_errors],
+            processing_seconds=base_seconds + time.monotonic() - started,
+            result=report,
+            finished_at=time.time()
+        )
+        if status == "completed":
+            os.remove(record['payload_path'])
+        logger.info(
+            f"S3 ingestion job {job_id} {status}: {report['downloaded']} objects downloaded, "
+            f"{report['added']} chunks added, {len(errors)} errors"
+        )
+
+    def _run_batch(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Read, chunk, write and checkpoint the next batch of a job (ingest pool)
+
+        Returns:
+            The updated job record
+        """
+        started = time.monotonic()
+        record = dict(record, errors=list(record['errors']))
+
+        documents, prepared_documents, by_key = 0, [], {}
+        with open(record['payload_path'], "rb") as f:
+            f.seek(record['byte_offset'])
+            while documents < self.batch_size:
+                line = f.readline()
+                if not line:
+                    break
+                documents += 1
+                try:
+                    document = parse_document(line)
+                    prepared = prepare_document(document['content'], document['metadata'])
+                    # sync_documents rejects a batch holding two versions of one document
+                    previous = by_key.setdefault(prepared['doc_key'], prepared)
+                    if previous is not prepared:
+                        if previous['content_hash'] != prepared['content_hash'] or previous['metadatas'] != prepared['metadatas']:
+                            raise ValueError(f"Another document in this batch has doc_key {prepared['doc_key']}")
+                        continue
+                except ValueError as e:
+                    record['failed_documents'] += 1
+                    self._record_error(record, {"document": record['offset'] + documents, "error": str(e)})
+                    continue
+                prepared_documents.append(prepared)
+            byte_offset = f.tell()
+
+        chunks = sum(len(prepared['ids']) for prepared in prepared_documents)
+        if prepared_documents:
+            result = self.chroma_service.sync_documents(prepared_documents)
+            if not result['success']:
+                raise RuntimeError(result.get('error', 'sync_documents failed'))
+            record['added'] += result['added']
+            record['updated'] += result['updated']
+            record['deleted'] += result['deleted']
+            record['skipped'] += chunks - result['added'] - result['updated']
+
+        record['offset'] += documents
+        record['byte_offset'] = byte_offset
+        record['chunks'] += chunks
+        record['processing_seconds'] += time.monotonic() - started
+        if documents < self.batch_size:
+            record['status'] = "completed"
+            record['finished_at'] = time.time()
+
+        # Checkpoint only after the batch is committed
+        self.store.update(
+            record['id'],
+            status=record['status'],
+            finished_at=record['finished_at'],
+            errors=record['errors'],
+            **{name: record[name] for name in _COUNTERS}
+        )
+        return record
+
+    def _record_error(self, record: Dict[str, Any], error: Dict[str, Any]) -> None:
+        record['error_count'] += 1
+        if len(record['errors']) < self.max_errors:
+            record['errors'].append(error)
+
+    @staticmethod
+    def _report(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Job record plus throughput and ETA"""
+        seconds = record['processing_seconds']
+        remaining = max(record['total_documents'] - record['offset'], 0)
+        docs_per_sec = record['offset'] / seconds if seconds else 0.0
+
+        eta = None
+        if record['status'] in ACTIVE_STATUSES and docs_per_sec:
+            eta = round(remaining / docs_per_sec, 1)
+
+        return {
+            "id": record['id'],
+            "kind": record['kind'],
+            "status": record['status'],
+            "total_documents": record['total_documents'],
+            "processed_documents": record['offset'],
+            "progress": round(record['offset'] / record['total_documents'], 4) if record['total_documents'] else 1.0,
+            "chunks": record['chunks'],
+            "added": record['added'],
+            "updated": record['updated'],
+            "deleted": record['deleted'],
+            "skipped": record['skipped'],
+            "failed_documents": record['failed_documents'],
+            "throughput": {
+                "documents_per_second": round(docs_per_sec, 2),
+                "chunks_per_second": round(record['chunks'] / seconds, 2) if seconds else 0.0
+            },
+            "processing_seconds": round(seconds, 3),
+            "eta_seconds": eta,
+            "error_count": record['error_count'],
+            "errors": record['errors'],
+            "created_at": record['created_at'],
+            "started_at": record['started_at'],
+            "updated_at": record['updated_at'],
+            "finished_at": record['finished_at'],
+            "result": record['result']
+        }
+
+
+@lru_cache(maxsize=1)
+def get_job_manager(chroma_service: Any) -> JobManager:
+    """Get the ingestion job manager"""
+    settings = get_settings()
+    return JobManager(
+        JobStore(os.path.join(settings.jobs_dir, "jobs.db")),
+        chroma_service,
+        get_ingest_executor(),
+        settings.jobs_dir,
+        batch_size=settings.max_documents_per_batch,
+        workers=settings.jobs_workers,
+        max_retries=settings.jobs_max_retries
+    )
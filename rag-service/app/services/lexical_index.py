@@ -0,0 +1,314 @@
+# BM25 Lexical Index
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Dropped at index and query time; they match nearly every chunk
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in
+into is it its may my no not of on or our should so than that the their them
+then there these they this to was were what when where which while who why will
+with you your
+""".split())
+
+# Field operators of Chroma `where` filters
+_OPERATORS = {"$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte"}
+
+# Metadata value types a filter can compare against
+_VALUE_TYPES = (str, int, float)
+
+# Chunks loaded per collection.get call when building the index
+_LOAD_PAGE_SIZE = 1000
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text, without stopwords"""
+    return [t for t in _WORD.findall(text.lower()) if t not in STOPWORDS]
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma `where` filter against one chunk's metadata
+
+    Supports field equality, the $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin
+    operators and $and/$or, as Chroma does.
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+        elif not _matches_condition(metadata.get(key), condition):
+            return False
+
+    return True
+
+
+def validate_where(where: Any) -> None:
+    """
+    Check that a `where` filter has a shape Chroma accepts, without evaluating it
+
+    Every level is an object with exactly one key: a field mapped to a
+    value or to a single {operator: operand}, or $and/$or mapped to a list
+    of at least two filters. Values and operands are strings or numbers;
+    $gt/$gte/$lt/$lte take numbers and $in/$nin non-empty lists of one type.
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+    if not isinstance(where, dict):
+        raise ValueError(f"Expected a filter object, got {where!r}")
+    if len(where) != 1:
+        raise ValueError(f"Expected exactly one key per filter object (combine with $and), got {sorted(where)}")
+
+    (key, condition), = where.items()
+    if key in ("$and", "$or"):
+        if not isinstance(condition, list) or len(condition) < 2:
+            raise ValueError(f"{key} takes a list of at least two filters, got {condition!r}")
+        for clause in condition:
+            validate_where(clause)
+        return
+    if key.startswith("$"):
+        raise ValueError(f"Unsupported filter operator: {key}")
+
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    if len(condition) != 1:
+        raise ValueError(f"Expected exactly one operator for {key}, got {sorted(condition)}")
+
+    (op, operand), = condition.items()
+    if op not in _OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    if op in ("$in", "$nin"):
+        if (
+            not isinstance(operand, list) or not operand
+            or not isinstance(operand[0], _VALUE_TYPES)
+            or not all(isinstance(v, type(operand[0])) for v in operand)
+        ):
+            raise ValueError(f"{op} on {key} takes a non-empty list of strings or numbers of one type, got {operand!r}")
+    elif op in ("$gt", "$gte", "$lt", "$lte"):
+        if not isinstance(operand, (int, float)):
+            raise ValueError(f"{op} on {key} takes a number, got {operand!r}")
+    elif not isinstance(operand, _VALUE_TYPES):
+        raise ValueError(f"{op} on {key} takes a string or number, got {operand!r}")
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for op, operand in condition.items():
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op == "$eq":
+            ok = value == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        elif value is None:
+            ok = False
+        elif op == "$gt":
+            ok = value > operand
+        elif op == "$gte":
+            ok = value >= operand
+        elif op == "$lt":
+            ok = value < operand
+        else:
+            ok = value <= operand
+        if not ok:
+            return False
+
+    return True
+
+
+class BM25Index:
+    """
+    In-memory inverted index over the chunks stored in Chroma
+
+    Postings map each term to the chunk IDs containing it with their term
+    frequencies, so scoring a query only touches the chunks that share a
+    term with it. The index also keeps each chunk's text and metadata, which
+    lets lexical-only lookups return complete results without a Chroma
+    round trip. ChromaService updates it on every add, update and delete.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize BM25 index
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization (0 = none, 1 = full)
+        """
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, str] = {}
+        self._metadatas: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def load(self, collection: Any, page_size: int = _LOAD_PAGE_SIZE) -> int:
+        """
+        Rebuild the index from every chunk in a Chroma collection
+
+        Args:
+            collection: Chroma collection
+            page_size: Chunks fetched per call
+
+        Returns:
+            Number of chunks indexed
+        """
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=page_size,
+                offset=offset,
+                include=["documents", "metadatas"]
+            )
+            if not page['ids']:
+                break
+            self.add(page['ids'], page['documents'], page['metadatas'])
+            offset += len(page['ids'])
+
+        logger.info(f"Lexical index built: {len(self)} chunks, {len(self._postings)} terms")
+        return len(self)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Index chunks, replacing any already indexed under the same ID"""
+        with self._lock:
+            for id_, document, metadata in zip(ids, documents, metadatas):
+                if id_ in self._lengths:
+                    self._remove(id_)
+
+                terms = tokenize(document or "")
+                for term, tf in Counter(terms).items():
+                    self._postings.setdefault(term, {})[id_] = tf
+
+                self._lengths[id_] = len(terms)
+                self._total_length += len(terms)
+                self._documents[id_] = document
+                self._metadatas[id_] = metadata or {}
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace the stored metadata of indexed chunks"""
+        with self._lock:
+            for id_, metadata in zip(ids, metadatas):
+                if id_ in self._metadatas:
+                    self._metadatas[id_] = metadata or {}
+
+    def remove(self, ids: List[str]) -> None:
+        """Drop chunks from the index (unknown IDs are ignored)"""
+        with self._lock:
+            for id_ in ids:
+                if id_ in self._lengths:
+                    self._remove(id_)
+
+    def _remove(self, id_: str) -> None:
+        for term in set(tokenize(self._documents[id_] or "")):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(id_, None)
+                if not postings:
+                    del self._postings[term]
+
+        self._total_length -= self._lengths.pop(id_)
+        del self._documents[id_]
+        del self._metadatas[id_]
+
+    def clear(self) -> None:
+        """Remove every chunk"""
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._documents.clear()
+            self._metadatas.clear()
+            self._total_length = 0
+
+    def search(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank chunks by BM25 score
+
+        Args:
+            query_text: Query text
+            top_k: Number of results to return
+            filter_metadata: Optional Chroma-style metadata filter
+
+        Returns:
+            List of (chunk ID, score), best first
+        """
+        terms = set(tokenize(query_text))
+
+        with self._lock:
+            count = len(self._lengths)
+            if not terms or not count:
+                return []
+            avg_length = self._total_length / count or 1.0
+
+            scores: Dict[str, float] = {}
+            allowed: Dict[str, bool] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+
+                for id_, tf in postings.items():
+                    if filter_metadata:
+                        ok = allowed.get(id_)
+                        if ok is None:
+                            ok = allowed[id_] = matches_where(self._metadatas[id_], filter_metadata)
+                        if not ok:
+                            continue
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[id_] / avg_length)
+                    scores[id_] = scores.get(id_, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def get(self, ids: List[str]) -> List[Optional[Tuple[str, Dict[str, Any]]]]:
+        """(text, metadata) of each chunk, or None for IDs not indexed"""
+        with self._lock:
+            return [
+                (self._documents[id_], self._metadatas[id_]) if id_ in self._lengths else None
+                for id_ in ids
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        with self._lock:
+            count = len(self._lengths)
+            return {
+                "enabled": True,
+                "chunks": count,
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "avg_chunk_terms": round(self._total_length / count, 1) if count else 0.0,
+                "k1": self.k1,
+                "b": self.b
+            }
@@ -0,0 +1,69 @@
+# Document Upload Parsing (Process Pool)
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Dict
+from loguru import logger
+from app.config import get_settings
+from app.models.backends import load_token_offsets
+from app.services.ingestion_service import chunking_params
+from app.utils.document_parsers import init_parse_worker, parse_and_chunk
+
+
+@lru_cache(maxsize=1)
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Get the process pool that parses and chunks uploaded files
+
+    PDF/DOCX/HTML parsing is pure Python and holds the GIL, so it runs in
+    separate processes to use every core. Workers are spawned (not forked)
+    so they never inherit the model or thread state of the server, and in
+    token chunking mode each loads only the tokenizer.
+    """
+    settings = get_settings()
+    workers = settings.parse_workers or os.cpu_count() or 1
+
+    factory = None
+    if settings.chunking_mode == "tokens":
+        source = settings.embedding_onnx_path if settings.embedding_backend == "onnx" else settings.embedding_model
+        factory = partial(load_token_offsets, source)
+
+    logger.info(f"Parse pool ready: {workers} worker processes")
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_parse_worker,
+        initargs=(factory,)
+    )
+
+
+async def parse_file(path: str, kind: str) -> Dict[str, Any]:
+    """
+    Parse and chunk a file on the process pool
+
+    Args:
+        path: File path
+        kind: Document type from document_parsers.detect_type
+
+    Returns:
+        Dictionary with chunks, content_hash and sections
+    """
+    params = chunking_params()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_parse_pool(),
+        parse_and_chunk,
+        path,
+        kind,
+        params['chunk_size'],
+        params['overlap']
+    )
+
+
+def shutdown_parse_pool() -> None:
+    """Shut down the worker processes if the pool was started"""
+    if get_parse_pool.cache_info().currsize:
+        get_parse_pool().shutdown(wait=False, cancel_futures=True)
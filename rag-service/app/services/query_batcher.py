@@ -0,0 +1,204 @@
+# Dynamic Micro-Batching for Queries
+
+import asyncio
+import threading
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.services.executor import BoundedExecutor
+from app.utils.metrics import QUERY_BATCH_SIZE, QUERY_BATCH_WAIT
+from app.utils.tracing import current_span, trace
+
+
+class _PendingQuery:
+    """A query waiting to be flushed with its batch"""
+
+    __slots__ = ("query", "future", "enqueued_at", "span")
+
+    def __init__(self, query: Dict[str, Any], future: asyncio.Future):
+        self.query = query
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        # Span of the traced request waiting on this query, if any
+        self.span = current_span()
+
+
+class QueryBatcher:
+    """
+    Gathers concurrent queries into one encode call and one Chroma query
+
+    Requests arriving within `max_wait_ms` of the first pending one (or until
+    `max_batch_size` is reached) are handed to RetrievalService as one batch:
+    encoded together, then searched with a single multi-embedding
+    `collection.query` per distinct metadata filter. Each caller gets back
+    its own slice of the results.
+    """
+
+    def __init__(
+        self,
+        retrieval_service: Any,
+        executor: BoundedExecutor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Initialize query batcher
+
+        Args:
+            retrieval_service: RetrievalService instance
+            executor: Pool that runs the blocking encode/search work
+            max_batch_size: Flush as soon as this many queries are pending
+            max_wait_ms: Longest time the first query in a batch waits
+        """
+        self.retrieval_service = retrieval_service
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending: List[_PendingQuery] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._chroma_calls = 0
+        self._max_fill = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        **options: Any
+    ) -> Dict[str, Any]:
+        """
+        Queue a query for the next batch and wait for its results
+
+        Extra keyword options (mode, rerank, deadline) are passed through
+        to RetrievalService.search.
+
+        Returns:
+            Same dictionary shape as ChromaService.query
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingQuery(
+            {"query_text": query_text, "top_k": top_k, "filter_metadata": filter_metadata, **options},
+            future
+        ))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the pending batch to the executor (runs on the event loop)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            future = self.executor.submit(self._process_batch, batch)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(self._deliver, batch, f)
+        )
+
+    @staticmethod
+    def _deliver(batch: List[_PendingQuery], future) -> None:
+        """Route results (or the failure) back to each waiting request"""
+        error = future.exception()
+        results = None if error else future.result()
+
+        for i, item in enumerate(batch):
+            if item.future.done():
+                continue
+            if error:
+                item.future.set_exception(error)
+            else:
+                item.future.set_result(results[i])
+
+    def _process_batch(self, batch: List[_PendingQuery]) -> List[Dict[str, Any]]:
+        """Encode and search one batch (runs on a worker thread)"""
+        started = time.perf_counter()
+        waits = [started - item.enqueued_at for item in batch]
+
+        # The batch is traced once and its span tree shared by every traced request in it
+        parents = [item.span for item in batch if item.span is not None]
+        with trace("query_batch", size=len(batch)) if parents else nullcontext() as root:
+            response = self.retrieval_service.search([item.query for item in batch])
+        for parent in parents:
+            parent.children.append(root)
+
+        if response['success']:
+            results = response['results']
+            search_calls = response['search_calls']
+        else:
+            results = [response] * len(batch)
+            search_calls = 0
+
+        self._record(len(batch), search_calls, waits)
+
+        return results
+
+    def _record(self, size: int, chroma_calls: int, waits: List[float]) -> None:
+        QUERY_BATCH_SIZE.observe(size)
+        for wait in waits:
+            QUERY_BATCH_WAIT.observe(wait)
+        with self._stats_lock:
+            self._batches += 1
+            self._queries += size
+            self._chroma_calls += chroma_calls
+            self._max_fill = max(self._max_fill, size)
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batch fill and queue wait statistics"""
+        with self._stats_lock:
+            avg_size = self._queries / self._batches if self._batches else 0.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "queries": self._queries,
+                "chroma_calls": self._chroma_calls,
+                "avg_batch_size": round(avg_size, 2),
+                "avg_batch_fill": round(avg_size / self.max_batch_size, 3),
+                "max_batch_fill": self._max_fill,
+                "avg_queue_wait_ms": round(self._wait_total / self._queries * 1000.0, 3) if self._queries else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000.0, 3),
+                "pending": len(self._pending)
+            }
+
+
+@lru_cache(maxsize=1)
+def get_query_batcher(
+    retrieval_service: Any,
+    executor: BoundedExecutor,
+    max_batch_size: int = 32,
+    max_wait_ms: float = 5.0
+) -> QueryBatcher:
+    """Get cached query batcher instance"""
+    return QueryBatcher(
+        retrieval_service,
+        executor,
+        max_batch_size,
+        max_wait_ms
+    )
@@ -0,0 +1,92 @@
+# Query Result Cache
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.utils.cache import LRUCache
+
+
+def _result_size(result: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached query result"""
+    return 512 + sum(
+        len(r.get('document') or '') + 256
+        for r in result.get('results', [])
+    )
+
+
+class QueryResultCache:
+    """
+    Cache of complete /query results
+
+    Keys include the collection version, so any add, delete or reset makes
+    earlier entries unreachable and they age out of the LRU. Versions are
+    tracked per process: writes made by another worker are only picked up
+    once entries expire after `ttl`.
+    """
+
+    def __init__(self, max_mb: float, ttl: int = 0):
+        """
+        Initialize query result cache
+
+        Args:
+            max_mb: Memory budget for cached results
+            ttl: Seconds before a cached result expires (0 = never)
+        """
+        self.cache = LRUCache(
+            max_bytes=int(max_mb * 1024 * 1024),
+            ttl=ttl,
+            sizeof=_result_size
+        )
+
+    @staticmethod
+    def make_key(
+        query_text: str,
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        similarity_threshold: Optional[float],
+        version: int,
+        options: Optional[Dict[str, Any]] = None
+    ) -> tuple:
+        """
+        Build the cache key for a query against a collection version
+
+        Args:
+            options: Other retrieval options that change the result
+                (mode, rerank, diversity, ...)
+        """
+        return (
+            " ".join(query_text.split()),
+            top_k,
+            json.dumps(filter_metadata, sort_keys=True),
+            similarity_threshold,
+            json.dumps(options, sort_keys=True),
+            version
+        )
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Get a cached result, or None on a miss"""
+        result = self.cache.get(key)
+        return dict(result) if result is not None else None
+
+    def set(self, key: tuple, result: Dict[str, Any]) -> None:
+        """Store a successful result (callers must not mutate it afterwards)"""
+        if result.get('success'):
+            self.cache.set(key, dict(result))
+
+    def clear(self) -> int:
+        """Remove all cached results"""
+        return self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {"enabled": True, **self.cache.stats()}
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> Optional[QueryResultCache]:
+    """Get the query result cache, or None when caching is disabled"""
+    settings = get_settings()
+    if not settings.enable_cache or settings.query_cache_max_mb <= 0:
+        return None
+    return QueryResultCache(settings.query_cache_max_mb, settings.cache_ttl)
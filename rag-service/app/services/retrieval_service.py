@@ -0,0 +1,493 @@
+# Retrieval Service
+
+import heapq
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import numpy as np
+from loguru import logger
+from app.services.diversity import collapse_by_source, group_labels, mmr_select
+from app.services.semantic_cache import SemanticCache
+from app.utils.metrics import observe_stage
+from app.utils.tracing import span
+
+# Retrieval modes: embeddings only, BM25 only, or both fused with RRF
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
+
+class RetrievalService:
+    """
+    Query pipeline in front of ChromaService
+
+    Encodes a batch of queries once, answers near-duplicates of recent
+    queries from the semantic cache and searches the rest in Chroma.
+    The cache holds vector pools only; hybrid queries are fused after it.
+
+    When the collection has a BM25 index, queries can also run in
+    'lexical' mode (index only; no encoding or Chroma call) or 'hybrid'
+    mode, where the vector and BM25 candidate lists are merged with
+    reciprocal rank fusion: each chunk scores sum(1 / (rrf_k + rank)) over
+    the lists it appears in. Hybrid hits keep the vector distance and
+    score; for chunks found only lexically they are computed from the
+    stored embeddings.
+
+    Queries with 'rerank' set fetch a larger pool of `rerank_candidates`
+    hits, which a cross-encoder rescores before the pool is cut back to
+    top_k. The queries of one batch share a single forward pass; a query
+    whose 'deadline' (time.perf_counter value) would pass before that pass
+    finishes is answered in first-stage order instead.
+
+    Finally, 'diversity' (0-1) picks top_k hits from a pool of
+    `diversity_candidates` by Maximal Marginal Relevance over their
+    embeddings, and 'collapse_by_source' keeps one hit per document.
+
+    A 'similarity_threshold' is applied to the pool before selection.
+    When that (or collapsing) leaves fewer than top_k hits although the
+    pool was full and its worst vector score still passed the threshold,
+    the query is searched again with twice the pool, up to `max_fetch`;
+    once the pool's tail falls below the threshold no further hit can
+    qualify and the query stops.
+    """
+
+    def __init__(
+        self,
+        chroma_service: Any,
+        semantic_cache: Optional[SemanticCache] = None,
+        candidates: int = 50,
+        rrf_k: int = 60,
+        reranker: Any = None,
+        rerank_candidates: int = 20,
+        diversity_candidates: int = 20,
+        max_fetch: int = 200
+    ):
+        """
+        Initialize retrieval service
+
+        Args:
+            chroma_service: ChromaService instance
+            semantic_cache: Optional near-duplicate query cache
+            candidates: Hits taken from each list before fusion (hybrid mode)
+            rrf_k: Reciprocal rank fusion constant
+            reranker: Optional CrossEncoderReranker
+            rerank_candidates: First-stage hits rescored per re-ranked query
+            diversity_candidates: Pool that diversified or collapsed queries select from
+            max_fetch: Largest pool adaptive over-fetching grows to
+        """
+        self.chroma_service = chroma_service
+        self.embedding_model = chroma_service.embedding_function
+        self.semantic_cache = semantic_cache
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.diversity_candidates = diversity_candidates
+        self.max_fetch = max_fetch
+
+    def _params_key(self, query: Dict[str, Any]) -> int:
+        # Cached entries are first-stage pools; re-ranking and selection run on top
+        return hash((
+            self._pool_size(query),
+            json.dumps(query.get('filter_metadata'), sort_keys=True),
+            query['mode'],
+            self._needs_embeddings(query)
+        ))
+
+    def _mode(self, query: Dict[str, Any]) -> str:
+        """Requested mode, or 'vector' if the collection has no BM25 index"""
+        mode = query.get('mode') or "vector"
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if mode != "vector" and self.chroma_service.lexical_index is None:
+            return "vector"
+        return mode
+
+    def search(self, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run a batch of queries
+
+        Args:
+            queries: List of dicts with 'query_text' and optional 'top_k',
+                'filter_metadata', 'mode' (see RETRIEVAL_MODES), 'rerank',
+                'deadline', 'diversity', 'collapse_by_source' and
+                'similarity_threshold'
+
+        Returns:
+            Dictionary whose 'results' holds one ChromaService.query-shaped
+            result per query, in request order, plus the number of Chroma
+            search calls made
+        """
+        try:
+            if not queries:
+                return {"success": True, "results": [], "search_calls": 0}
+
+            queries = [{**q, "mode": self._mode(q)} for q in queries]
+            results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+            search_calls = 0
+
+            pending = list(range(len(queries)))
+            while pending:
+                batch = [queries[i] for i in pending]
+                with span("retrieval.first_stage", queries=len(batch)):
+                    response = self._first_stage(batch)
+                if not response['success']:
+                    return response
+                search_calls += response['search_calls']
+
+                pools = response['results']
+                if any(q.get('rerank') for q in batch):
+                    with span("retrieval.rerank"):
+                        self._rerank(batch, pools)
+                with span("retrieval.select"):
+                    wants_more = self._select(batch, pools)
+
+                # Short queries whose pool could still hold qualifying hits go again, deeper
+                retry = []
+                for i, result, more in zip(pending, pools, wants_more):
+                    results[i] = result
+                    size = self._pool_size(queries[i])
+                    if more and size < self.max_fetch:
+                        queries[i] = {**queries[i], "fetch_k": min(size * 2, self.max_fetch)}
+                        retry.append(i)
+                pending = retry
+
+            return {"success": True, "results": results, "search_calls": search_calls}
+
+        except Exception as e:
+            logger.error(f"Retrieval failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "results": []
+            }
+
+    def _first_stage(self, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Candidate pools of a batch: BM25 for lexical queries, Chroma for the rest"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+
+        # Lexical queries never touch the model or Chroma
+        dense = []
+        for i, q in enumerate(queries):
+            if q['mode'] == "lexical":
+                results[i] = self._lexical_search(q)
+            else:
+                dense.append(i)
+
+        search_calls = 0
+        if dense:
+            response = self._dense_search([queries[i] for i in dense])
+            if not response['success']:
+                return response
+            search_calls = response['search_calls']
+            for i, result in zip(dense, response['results']):
+                results[i] = result
+
+        return {"success": True, "results": results, "search_calls": search_calls}
+
+    def _dense_search(self, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Encode, check the semantic cache and search Chroma (vector and hybrid queries)"""
+        # Read the version before searching so a concurrent write can
+        # never be cached under the post-write version
+        version = self.chroma_service.version
+        embeddings = self.embedding_model.encode([q['query_text'] for q in queries])
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        misses = list(range(len(queries)))
+
+        if self.semantic_cache is not None:
+            params = [self._params_key(q) for q in queries]
+            lookups = self.semantic_cache.lookup(embeddings, params, version)
+            misses = []
+            for i, (cached, distance, matched) in enumerate(lookups):
+                cache_info = {
+                    "hit": cached is not None,
+                    "level": "semantic",
+                    "distance": distance,
+                    "max_distance": self.semantic_cache.max_distance
+                }
+                if cached is not None:
+                    results[i] = {
+                        **cached,
+                        "query": queries[i]['query_text'],
+                        "cache": {**cache_info, "matched_query": matched}
+                    }
+                else:
+                    results[i] = {"cache": cache_info}
+                    misses.append(i)
+
+        search_calls = 0
+        if misses:
+            response = self.chroma_service.query_batch(
+                [self._vector_query(queries[i]) for i in misses],
+                embeddings=embeddings[misses]
+            )
+            if not response['success']:
+                return response
+            search_calls = response['search_calls']
+
+            for i, result in zip(misses, response['results']):
+                if results[i] is not None:
+                    result = {**result, **results[i]}
+                results[i] = result
+
+            # Cache the vector pools: BM25 depends on the exact query text,
+            # so a near-duplicate must be fused with its own lexical hits
+            if self.semantic_cache is not None:
+                fresh = [i for i in misses if results[i].get('success')]
+                self.semantic_cache.add(
+                    embeddings[fresh],
+                    [params[i] for i in fresh],
+                    version,
+                    [
+                        {k: v for k, v in results[i].items() if k not in ("cache", "query")}
+                        for i in fresh
+                    ],
+                    [queries[i]['query_text'] for i in fresh]
+                )
+
+        for i, query in enumerate(queries):
+            if query['mode'] == "hybrid" and results[i].get('success'):
+                results[i] = self._fuse(query, results[i], embeddings[i])
+
+        return {"success": True, "results": results, "search_calls": search_calls}
+
+    def _pool_size(self, query: Dict[str, Any]) -> int:
+        """First-stage hits to return: top_k, or the re-ranking/selection pool"""
+        size = max(query.get('top_k', 5), query.get('fetch_k') or 0)
+        if query.get('rerank'):
+            size = max(size, self.rerank_candidates)
+        if query.get('diversity') or query.get('collapse_by_source'):
+            size = max(size, self.diversity_candidates)
+        return size
+
+    @staticmethod
+    def _needs_embeddings(query: Dict[str, Any]) -> bool:
+        return bool(query.get('diversity'))
+
+    def _vector_query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Chroma query for a request; hybrid queries over-fetch fusion candidates"""
+        top_k = self._pool_size(query)
+        if query['mode'] == "hybrid":
+            top_k = max(top_k, self.candidates)
+        return {**query, "top_k": top_k, "with_embeddings": self._needs_embeddings(query)}
+
+    @staticmethod
+    def _lexical_hit(id_: str, document: str, metadata: Dict[str, Any], distance: Optional[float]) -> Dict[str, Any]:
+        return {
+            "id": id_,
+            "document": document,
+            "metadata": metadata,
+            "distance": distance,
+            "score": 1 - distance if distance is not None else None
+        }
+
+    def _lexical_search(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a query from the BM25 index alone"""
+        index = self.chroma_service.lexical_index
+        with observe_stage("lexical_search"):
+            ranked = index.search(
+                query['query_text'],
+                top_k=self._pool_size(query),
+                filter_metadata=query.get('filter_metadata')
+            )
+
+        hits = []
+        for (id_, score), stored in zip(ranked, index.get([id_ for id_, _ in ranked])):
+            if stored is not None:
+                hits.append({**self._lexical_hit(id_, stored[0], stored[1], None), "bm25_score": score})
+
+        return {
+            "success": True,
+            "query": query['query_text'],
+            "count": len(hits),
+            "results": hits
+        }
+
+    def _fuse(self, query: Dict[str, Any], result: Dict[str, Any], embedding: Any) -> Dict[str, Any]:
+        """Merge a query's vector hits with its BM25 hits by reciprocal rank fusion"""
+        index = self.chroma_service.lexical_index
+        top_k = self._pool_size(query)
+        vector_hits = {hit['id']: hit for hit in result['results']}
+        with observe_stage("lexical_search"):
+            lexical_hits = index.search(
+                query['query_text'],
+                top_k=max(top_k, self.candidates),
+                filter_metadata=query.get('filter_metadata')
+            )
+        bm25_scores = dict(lexical_hits)
+
+        fused: Dict[str, float] = {}
+        for rank, id_ in enumerate(vector_hits, 1):
+            fused[id_] = 1.0 / (self.rrf_k + rank)
+        for rank, (id_, _) in enumerate(lexical_hits, 1):
+            fused[id_] = fused.get(id_, 0.0) + 1.0 / (self.rrf_k + rank)
+        top = heapq.nlargest(top_k, fused.items(), key=lambda item: item[1])
+
+        # Chunks only BM25 found: take text from the index, distance from their stored embedding
+        lexical_only = [id_ for id_, _ in top if id_ not in vector_hits]
+        stored = dict(zip(lexical_only, index.get(lexical_only)))
+        distances = self.chroma_service.vector_distances(lexical_only, embedding)
+
+        hits = []
+        for id_, rrf_score in top:
+            hit = vector_hits.get(id_)
+            if hit is None:
+                if stored[id_] is None:
+                    continue
+                hit = self._lexical_hit(id_, stored[id_][0], stored[id_][1], distances.get(id_))
+            hits.append({**hit, "rrf_score": rrf_score, "bm25_score": bm25_scores.get(id_)})
+
+        return {**result, "count": len(hits), "results": hits}
+
+    def _rerank(self, queries: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> None:
+        """Rescore the pools of re-ranked queries in one pass and cut them to top_k"""
+        pending = [i for i, q in enumerate(queries) if q.get('rerank') and results[i].get('success')]
+        if not pending:
+            return
+
+        if self.reranker is None:
+            for i in pending:
+                results[i] = {**results[i], "rerank": {"applied": False, "reason": "disabled"}}
+            return
+
+        cached = {
+            i: self.reranker.cached_scores(queries[i]['query_text'], [hit['id'] for hit in results[i]['results']])
+            for i in pending
+        }
+        uncached = {i: sum(score is None for score in cached[i]) for i in pending}
+
+        # Drop the queries with the earliest deadlines until the shared pass fits the rest
+        now = time.perf_counter()
+        eligible = sorted(pending, key=lambda i: queries[i].get('deadline') or float("inf"), reverse=True)
+        while eligible:
+            pairs = sum(uncached[i] for i in eligible)
+            deadline = queries[eligible[-1]].get('deadline')
+            if not pairs or deadline is None or now + self.reranker.estimate_seconds(pairs) <= deadline:
+                break
+            eligible.pop()
+
+        # Scores are keyed by (query, position in its pool), since the pass runs in `eligible` order
+        keys, pairs = [], []
+        for i in eligible:
+            for j, (hit, score) in enumerate(zip(results[i]['results'], cached[i])):
+                if score is None:
+                    keys.append((i, j))
+                    pairs.append((queries[i]['query_text'], hit['id'], hit['document']))
+        started = time.perf_counter()
+        scores = dict(zip(keys, self.reranker.score(pairs)))
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 3)
+
+        for i in pending:
+            if i not in eligible:
+                results[i] = {**results[i], "rerank": {"applied": False, "reason": "budget"}}
+                continue
+
+            hits = [
+                {**hit, "rerank_score": score if score is not None else scores[(i, j)]}
+                for j, (hit, score) in enumerate(zip(results[i]['results'], cached[i]))
+            ]
+            hits.sort(key=lambda hit: hit['rerank_score'], reverse=True)
+            results[i] = {**results[i], "results": hits, "rerank": {
+                "applied": True,
+                "candidates": len(hits),
+                "cached": len(hits) - uncached[i],
+                "pass_ms": elapsed_ms
+            }}
+
+    def _select(self, queries: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Cut every pool to top_k, applying the similarity threshold and
+        diversifying or collapsing by source where asked
+
+        Returns:
+            Per query, whether it came up short while a deeper pool could
+            still hold qualifying hits
+        """
+        wants_more = [False] * len(queries)
+
+        for i, query in enumerate(queries):
+            result = results[i]
+            if not result.get('success'):
+                continue
+
+            top_k = query.get('top_k', 5)
+            hits = result['results']
+            diversity = query.get('diversity') or 0.0
+            pool_full = len(hits) >= self._pool_size(query)
+
+            # Lexical-only results carry no vector score and are kept
+            threshold = query.get('similarity_threshold')
+            tail_qualifies = True
+            if threshold:
+                scores = [hit['score'] for hit in hits if hit.get('score') is not None]
+                tail_qualifies = not scores or min(scores) >= threshold
+                hits = [hit for hit in hits if hit.get('score') is None or hit['score'] >= threshold]
+
+            if diversity and len(hits) > 1:
+                missing = [hit['id'] for hit in hits if hit.get('embedding') is None]
+                stored = self.chroma_service.get_embeddings(missing)
+                hits = [
+                    hit if hit.get('embedding') is not None else {**hit, "embedding": stored.get(hit['id'])}
+                    for hit in hits
+                ]
+                hits = [hit for hit in hits if hit['embedding'] is not None]
+                picked = mmr_select(
+                    self._relevance(hits),
+                    np.asarray([hit['embedding'] for hit in hits], dtype=np.float32),
+                    top_k,
+                    diversity=diversity,
+                    groups=group_labels(hits) if query.get('collapse_by_source') else None
+                )
+                hits = [hits[j] for j in picked]
+            elif query.get('collapse_by_source'):
+                hits = collapse_by_source(hits, top_k)
+
+            hits = [
+                {k: v for k, v in hit.items() if k != "embedding"} if "embedding" in hit else hit
+                for hit in hits[:top_k]
+            ]
+            results[i] = {**result, "count": len(hits), "results": hits}
+            wants_more[i] = len(hits) < top_k and pool_full and tail_qualifies
+
+        return wants_more
+
+    @staticmethod
+    def _relevance(hits: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Query relevance of each hit on a 0-1 scale for MMR
+
+        Uses the score of the stage that ordered the pool: cross-encoder,
+        RRF or BM25 scores are min-max scaled; vector similarity is used
+        as is.
+        """
+        for field in ("rerank_score", "rrf_score", "bm25_score"):
+            values = [hit.get(field) for hit in hits]
+            if all(v is not None for v in values):
+                values = np.asarray(values, dtype=np.float32)
+                spread = values.max() - values.min()
+                return (values - values.min()) / spread if spread > 0 else np.ones_like(values)
+        return np.asarray([hit.get('score') or 0.0 for hit in hits], dtype=np.float32)
+
+
+@lru_cache(maxsize=1)
+def get_retrieval_service(
+    chroma_service: Any,
+    semantic_cache: Optional[SemanticCache] = None,
+    candidates: int = 50,
+    rrf_k: int = 60,
+    reranker: Any = None,
+    rerank_candidates: int = 20,
+    diversity_candidates: int = 20,
+    max_fetch: int = 200
+) -> RetrievalService:
+    """Get cached retrieval service instance"""
+    return RetrievalService(
+        chroma_service,
+        semantic_cache,
+        candidates,
+        rrf_k,
+        reranker,
+        rerank_candidates,
+        diversity_candidates,
+        max_fetch
+    )
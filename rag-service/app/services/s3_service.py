@@ -0,0 +1,338 @@
+# S3 Document Corpus Ingestion
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from loguru import logger
+from app.config import get_settings
+from app.services.ingestion_service import chunking_params, prepare_chunks, prepare_document
+from app.services.stream_ingestion import parse_document
+from app.utils.document_parsers import chunk_sections, iter_paragraphs
+
+# Object types the ingester understands, by extension
+TEXT_EXTENSIONS = (".txt", ".md")
+JSON_EXTENSIONS = (".json",)
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + JSON_EXTENSIONS + NDJSON_EXTENSIONS
+
+# Keys whose stored ETags are fetched from Chroma in one call
+_ETAG_LOOKUP_BATCH = 200
+
+
+class S3Service:
+    """
+    Bulk ingestion of a document corpus stored in S3
+
+    Objects under a prefix are listed page by page, and the ones whose
+    ETag differs from the one recorded on their stored chunks are
+    downloaded concurrently through a single client whose connection pool
+    is sized to the worker count. Text bodies are chunked paragraph by
+    paragraph as they download (no temp files, and never joined into one
+    string), and the resulting documents are synced into Chroma in batches
+    while later downloads are still running.
+
+    Supported objects: .txt/.md (one document), .json (a document or a
+    list of documents with `content` and `metadata`), .ndjson/.jsonl (one
+    document per line).
+    """
+
+    def __init__(
+        self,
+        chroma_service: Any,
+        bucket: str,
+        prefix: str = "",
+        region: str = "us-east-1",
+        access_key_id: str = "",
+        secret_access_key: str = "",
+        endpoint_url: str = "",
+        max_workers: int = 8,
+        batch_size: int = 100,
+        page_size: int = 1000,
+        client: Any = None
+    ):
+        """
+        Initialize S3 service
+
+        Args:
+            chroma_service: ChromaService to write to
+            bucket: Bucket name
+            prefix: Default key prefix
+            region: AWS region
+            access_key_id: Access key (default credential chain if empty)
+            secret_access_key: Secret key
+            endpoint_url: Custom endpoint (e.g. a local moto or MinIO server)
+            max_workers: Concurrent downloads (and pooled connections)
+            batch_size: Documents per Chroma sync
+            page_size: Keys per list request (S3 returns at most 1000)
+            client: Preconfigured boto3 S3 client (overrides the above)
+        """
+        self.chroma_service = chroma_service
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.page_size = max(1, min(page_size, 1000))
+
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            client = boto3.client(
+                "s3",
+                region_name=region,
+                aws_access_key_id=access_key_id or None,
+                aws_secret_access_key=secret_access_key or None,
+                endpoint_url=endpoint_url or None,
+                config=Config(
+                    max_pool_connections=self.max_workers,
+                    retries={"max_attempts": 5, "mode": "adaptive"}
+                )
+            )
+        # boto3 clients are thread-safe; all workers share this one
+        self.client = client
+
+    def list_objects(self, prefix: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        List objects under a prefix, one page at a time
+
+        Args:
+            prefix: Key prefix (defaults to the configured prefix)
+
+        Yields:
+            Lists of dicts with key, etag, size and last_modified
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=self.prefix if prefix is None else prefix,
+            PaginationConfig={"PageSize": self.page_size}
+        )
+        for page in pages:
+            yield [
+                {
+                    "key": obj["Key"],
+                    "etag": obj["ETag"].strip('"'),
+                    "size": obj["Size"],
+                    "last_modified": obj["LastModified"].isoformat()
+                }
+                for obj in page.get("Contents", [])
+            ]
+
+    def stored_etags(self, keys: List[str]) -> Dict[str, str]:
+        """ETag recorded on the stored chunks of each key (missing if never synced)"""
+        etags = {}
+        for start in range(0, len(keys), _ETAG_LOOKUP_BATCH):
+            stored = self.chroma_service.collection.get(
+                where={"s3_key": {"$in": keys[start:start + _ETAG_LOOKUP_BATCH]}},
+                include=["metadatas"]
+            )
+            for metadata in stored['metadatas']:
+                etags[metadata['s3_key']] = metadata.get('s3_etag')
+        return etags
+
+    def ingest(
+        self,
+        prefix: Optional[str] = None,
+        force: bool = False,
+        cancelled: Optional[Callable[[], bool]] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sync every supported object under a prefix into the collection
+
+        Args:
+            prefix: Key prefix (defaults to the configured prefix)
+            force: Re-ingest objects even if their ETag is unchanged
+            cancelled: Polled between objects; stop listing and downloading
+                once it returns True (objects in flight are still synced)
+            progress: Called with the report after every synced batch
+
+        Returns:
+            Dictionary with operation results
+        """
+        started = time.monotonic()
+        report = {
+            "success": True,
+            "bucket": self.bucket,
+            "prefix": self.prefix if prefix is None else prefix,
+            "listed": 0,
+            "unsupported": 0,
+            "unchanged": 0,
+            "downloaded": 0,
+            "bytes": 0,
+            "documents": 0,
+            "chunks": 0,
+            "added": 0,
+            "updated": 0,
+            "deleted": 0,
+            "cancelled": False,
+            "errors": []
+        }
+        pending_docs: List[Dict[str, Any]] = []
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rag-s3") as pool:
+                in_flight = set()
+
+                def collect(done) -> None:
+                    for future in done:
+                        obj, documents, error = future.result()
+                        if error:
+                            report['errors'].append({"key": obj['key'], "error": error})
+                            continue
+                        report['downloaded'] += 1
+                        report['bytes'] += obj['size']
+                        pending_docs.extend(documents)
+                    while len(pending_docs) >= self.batch_size:
+                        self._sync(pending_docs[:self.batch_size], report, progress)
+                        del pending_docs[:self.batch_size]
+
+                for page in self.list_objects(prefix):
+                    if cancelled and cancelled():
+                        report['cancelled'] = True
+                        break
+                    report['listed'] += len(page)
+                    objects = [obj for obj in page if obj['key'].lower().endswith(SUPPORTED_EXTENSIONS)]
+                    report['unsupported'] += len(page) - len(objects)
+
+                    if not force:
+                        etags = self.stored_etags([obj['key'] for obj in objects])
+                        changed = [obj for obj in objects if etags.get(obj['key']) != obj['etag']]
+                        report['unchanged'] += len(objects) - len(changed)
+                        objects = changed
+
+                    for obj in objects:
+                        if cancelled and cancelled():
+                            report['cancelled'] = True
+                            break
+                        # Bound downloaded-but-unsynced work to a few objects per worker
+                        if len(in_flight) >= self.max_workers * 2:
+                            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            collect(done)
+                        in_flight.add(pool.submit(self._load_object, obj))
+
+                    if report['cancelled']:
+                        break
+
+                collect(in_flight)
+
+            if pending_docs:
+                self._sync(pending_docs, report, progress)
+
+        except Exception as e:
+            logger.error(f"S3 ingestion failed: {e}")
+            report['success'] = False
+            report['errors'].append({"error": str(e)})
+
+        report['seconds'] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"S3 ingestion of s3://{self.bucket}/{report['prefix']}: {report['downloaded']} objects downloaded, "
+            f"{report['unchanged']} unchanged, {report['added']} chunks added, {len(report['errors'])} errors"
+        )
+        return report
+
+    def _sync(
+        self,
+        documents: List[Dict[str, Any]],
+        report: Dict[str, Any],
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
+        result = self.chroma_service.sync_documents(documents)
+        if not result['success']:
+            raise RuntimeError(result.get('error', 'Sync failed'))
+        report['documents'] += len(documents)
+        report['chunks'] += sum(len(doc['chunks']) for doc in documents)
+        report['added'] += result['added']
+        report['updated'] += result['updated']
+        report['deleted'] += result['deleted']
+        if progress:
+            progress(report)
+
+    def _load_object(self, obj: Dict[str, Any]):
+        """
+        Download, parse and chunk one object (runs on a download worker)
+
+        Returns:
+            Tuple of (obj, prepared documents, error message or None)
+        """
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=obj['key'])["Body"]
+            try:
+                documents = list(self._parse_body(obj['key'], body))
+            finally:
+                body.close()
+
+            source = f"s3://{self.bucket}/{obj['key']}"
+            prepared = []
+            for i, document in enumerate(documents):
+                metadata = {
+                    "source": source,
+                    **document['metadata'],
+                    "s3_key": obj['key'],
+                    "s3_etag": obj['etag']
+                }
+                if 'doc_id' not in metadata:
+                    metadata['doc_id'] = source if len(documents) == 1 else f"{source}#{i}"
+                if 'chunks' in document:
+                    prepared.append(prepare_chunks(document['chunks'], metadata, document['content_hash']))
+                else:
+                    prepared.append(prepare_document(document['content'], metadata))
+
+            return obj, prepared, None
+
+        except Exception as e:
+            logger.warning(f"Failed to ingest s3://{self.bucket}/{obj['key']}: {e}")
+            return obj, [], str(e)
+
+    @staticmethod
+    def _parse_body(key: str, body: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Turn a streaming object body into documents
+
+        Text objects are chunked as their lines arrive and come back as
+        {"chunks", "content_hash", "metadata"}; JSON and NDJSON documents
+        come back as {"content", "metadata"}. A .json object is a single
+        value, so it is the one type read whole before parsing.
+        """
+        name = key.lower()
+
+        if name.endswith(NDJSON_EXTENSIONS):
+            for line in body.iter_lines():
+                if line.strip():
+                    yield parse_document(line)
+            return
+
+        if name.endswith(JSON_EXTENSIONS):
+            data = json.loads(b"".join(body.iter_chunks()))
+            for document in data if isinstance(data, list) else [data]:
+                yield parse_document(json.dumps(document))
+            return
+
+        # Lines split on ASCII newlines, so no UTF-8 sequence is cut in two
+        lines = (line.decode("utf-8", errors="replace") for line in body.iter_lines())
+        parsed = chunk_sections(iter_paragraphs(lines), **chunking_params())
+        yield {
+            "chunks": parsed['chunks'],
+            "content_hash": parsed['content_hash'],
+            "metadata": {"title": os.path.splitext(os.path.basename(key))[0]}
+        }
+
+
+@lru_cache(maxsize=1)
+def get_s3_service(chroma_service: Any) -> S3Service:
+    """Get the S3 ingester for the configured bucket"""
+    settings = get_settings()
+    return S3Service(
+        chroma_service,
+        settings.s3_bucket_name,
+        prefix=settings.s3_documents_prefix,
+        region=settings.aws_region,
+        access_key_id=settings.aws_access_key_id,
+        secret_access_key=settings.aws_secret_access_key,
+        endpoint_url=settings.s3_endpoint_url,
+        max_workers=settings.s3_max_workers,
+        batch_size=settings.max_documents_per_batch
+    )
@@ -0,0 +1,171 @@
+# Semantic (Near-Duplicate) Query Cache
+
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import get_settings
+
+
+class SemanticCache:
+    """
+    Cache of search results keyed by query embedding
+
+    Recent query embeddings are kept in a fixed-size float32 matrix (oldest
+    entry overwritten first). A lookup computes cosine similarity against
+    every row in one matrix product and returns the stored result of the
+    nearest entry with the same search parameters and collection version,
+    if it lies within `max_distance`.
+    """
+
+    def __init__(self, dimension: int, capacity: int = 1024, max_distance: float = 0.05, ttl: int = 0):
+        """
+        Initialize semantic cache
+
+        Args:
+            dimension: Embedding dimension
+            capacity: Maximum number of cached queries
+            max_distance: Largest cosine distance that counts as a hit
+            ttl: Seconds before an entry expires (0 = never)
+        """
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.ttl = ttl
+
+        self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self._params = np.full(capacity, -1, dtype=np.int64)
+        self._versions = np.full(capacity, -1, dtype=np.int64)
+        self._stored_at = np.zeros(capacity, dtype=np.float64)
+        self._results: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._queries: List[Optional[str]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def lookup(
+        self,
+        embeddings: np.ndarray,
+        params: List[int],
+        version: int
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[float], Optional[str]]]:
+        """
+        Find cached results for a batch of query embeddings
+
+        Args:
+            embeddings: 2D array of query embeddings
+            params: Hash of the search parameters (top_k, filter) per query
+            version: Current collection version
+
+        Returns:
+            One (result, distance, matched_query) tuple per query; result is None
+            on a miss, and distance is the nearest eligible entry's distance
+            (None if there was no eligible entry)
+        """
+        queries = self._normalize(embeddings)
+
+        with self._lock:
+            if self._size == 0:
+                self.misses += len(queries)
+                return [(None, None, None)] * len(queries)
+
+            n = self._size
+            similarities = queries @ self._matrix[:n].T
+
+            eligible = self._versions[:n] == version
+            if self.ttl:
+                eligible &= self._stored_at[:n] > time.monotonic() - self.ttl
+
+            lookups = []
+            for row, param in zip(similarities, params):
+                mask = eligible & (self._params[:n] == param)
+                if not mask.any():
+                    self.misses += 1
+                    lookups.append((None, None, None))
+                    continue
+
+                scores = np.where(mask, row, -np.inf)
+                best = int(np.argmax(scores))
+                distance = max(0.0, float(1.0 - scores[best]))
+
+                if distance <= self.max_distance:
+                    self.hits += 1
+                    lookups.append((self._results[best], distance, self._queries[best]))
+                else:
+                    self.misses += 1
+                    lookups.append((None, distance, None))
+
+            return lookups
+
+    def add(
+        self,
+        embeddings: np.ndarray,
+        params: List[int],
+        version: int,
+        results: List[Dict[str, Any]],
+        queries: List[str]
+    ) -> None:
+        """Store search results for a batch of query embeddings"""
+        vectors = self._normalize(embeddings)
+        now = time.monotonic()
+
+        with self._lock:
+            for vector, param, result, query in zip(vectors, params, results, queries):
+                slot = self._next
+                self._matrix[slot] = vector
+                self._params[slot] = param
+                self._versions[slot] = version
+                self._stored_at[slot] = now
+                self._results[slot] = result
+                self._queries[slot] = query
+                self._next = (slot + 1) % self.capacity
+                self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> int:
+        """Remove all entries and return how many were dropped"""
+        with self._lock:
+            count = self._size
+            self._versions[:] = -1
+            self._results = [None] * self.capacity
+            self._queries = [None] * self.capacity
+            self._next = 0
+            self._size = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "entries": self._size,
+                "capacity": self.capacity,
+                "max_distance": self.max_distance,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache(dimension: int) -> Optional[SemanticCache]:
+    """Get the semantic cache, or None when it is disabled"""
+    settings = get_settings()
+    if not settings.enable_cache or not settings.enable_semantic_cache:
+        return None
+    return SemanticCache(
+        dimension,
+        capacity=settings.semantic_cache_size,
+        max_distance=settings.semantic_cache_max_distance,
+        ttl=settings.cache_ttl
+    )
@@ -0,0 +1,69 @@
+# Single-Flight Request Coalescing
+
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one execution
+
+    The first caller for a key starts the work as a task; callers arriving
+    with the same key while it is running await that same task instead of
+    starting their own. The task is shielded, so a disconnecting caller
+    does not cancel the work for the others. Runs on the event loop only.
+    """
+
+    def __init__(self):
+        """Initialize single-flight group"""
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            Tuple of (result, shared) where shared is True if this caller
+            reused another caller's in-flight execution
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self.executions += 1
+        task.add_done_callback(lambda t: self._done(key, t))
+
+        return await asyncio.shield(task), False
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        total = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
+
+
+@lru_cache(maxsize=1)
+def get_single_flight() -> SingleFlight:
+    """Get the single-flight group for /query"""
+    return SingleFlight()
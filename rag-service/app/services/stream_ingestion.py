@@ -0,0 +1,332 @@
+# Streaming (NDJSON) Ingestion Pipeline
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from loguru import logger
+from app.services.executor import BoundedExecutor
+from app.services.ingestion_service import prepare_document
+
+# Pipelines currently running, for progress reporting
+_active: Dict[int, "StreamIngestion"] = {}
+_ids = itertools.count(1)
+
+# Marks the end of the stream on a stage queue
+_DONE = object()
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when a single NDJSON line exceeds the configured size"""
+
+
+def parse_document(line: bytes) -> Dict[str, Any]:
+    """
+    Parse one NDJSON line into a {"content", "metadata"} document
+
+    Raises:
+        ValueError: If the line is not a valid document
+    """
+    document = json.loads(line)
+    if not isinstance(document, dict) or not isinstance(document.get('content'), str):
+        raise ValueError("expected an object with a string 'content'")
+    metadata = document.get('metadata') or {}
+    if not isinstance(metadata, dict):
+        raise ValueError("'metadata' must be an object")
+    return {"content": document['content'], "metadata": metadata}
+
+
+async def iter_lines(body: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Split an async byte stream into lines
+
+    The unfinished line is collected in a bytearray, so a long line costs
+    one copy per byte rather than one per read.
+
+    Raises:
+        DocumentTooLargeError: If a line grows beyond max_line_bytes
+    """
+    pending = bytearray()
+    async for data in body:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if len(pending) + end - start > max_line_bytes:
+                raise DocumentTooLargeError(f"NDJSON line exceeds {max_line_bytes} bytes")
+            if pending:
+                pending += data[start:end]
+                yield bytes(pending)
+                pending.clear()
+            else:
+                yield data[start:end]
+            start = end + 1
+
+        if len(pending) + len(data) - start > max_line_bytes:
+            raise DocumentTooLargeError(f"NDJSON line exceeds {max_line_bytes} bytes")
+        pending += data[start:]
+
+    if pending:
+        yield bytes(pending)
+
+
+class StreamIngestion:
+    """
+    Pipelined ingestion of an NDJSON document stream
+
+    The upload flows through four stages connected by bounded queues:
+
+        read     parse lines, group them into batches (event loop)
+        prepare  clean_text + chunking                (ingest pool)
+        embed    plan the sync, encode new chunks     (ingest pool)
+        write    upsert / update / delete in Chroma   (ingest pool)
+
+    so one batch is being embedded while the previous one is written. Each
+    queue holds at most `queue_depth` batches; when a later stage falls
+    behind, the reader stops pulling the request body and TCP flow control
+    slows the client down. Memory is bounded by a handful of batches no
+    matter how large the upload is.
+    """
+
+    def __init__(
+        self,
+        chroma_service: Any,
+        executor: BoundedExecutor,
+        batch_size: int = 100,
+        queue_depth: int = 2,
+        max_line_bytes: int = 16 * 1024 * 1024,
+        max_errors: int = 100
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            chroma_service: ChromaService to write to
+            executor: Pool running the blocking stages
+            batch_size: Documents per batch (flush size)
+            queue_depth: Batches allowed to wait between two stages
+            max_line_bytes: Largest accepted NDJSON line
+            max_errors: Errors kept in the report (all are counted)
+        """
+        self.id = next(_ids)
+        self.chroma_service = chroma_service
+        self.executor = executor
+        self.batch_size = max(1, batch_size)
+        self.queue_depth = max(1, queue_depth)
+        self.max_line_bytes = max_line_bytes
+        self.max_errors = max_errors
+
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.lines = 0
+        self.documents_received = 0
+        self.documents_written = 0
+        self.failed_documents = 0
+        self.batches = 0
+        self.chunks = 0
+        self.added = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged_documents = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+
+        self._queues: List[asyncio.Queue] = []
+        # doc_keys planned but possibly not written yet
+        self._unwritten_keys = set()
+
+    async def run(self, body: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Ingest an NDJSON byte stream
+
+        Each non-empty line must be a JSON object with `content` and an
+        optional `metadata` object. Invalid lines and failed batches are
+        recorded as errors without stopping the stream.
+
+        Args:
+            body: Async iterator of raw body chunks (e.g. Request.stream())
+
+        Returns:
+            Final progress report
+
+        Raises:
+            DocumentTooLargeError: If a line exceeds max_line_bytes
+        """
+        prepare_queue, embed_queue, write_queue = (asyncio.Queue(self.queue_depth) for _ in range(3))
+        self._queues = [prepare_queue, embed_queue, write_queue]
+
+        self.status = "running"
+        self.started_at = time.monotonic()
+        _active[self.id] = self
+
+        stages = [
+            asyncio.create_task(self._stage(prepare_queue, embed_queue, self._prepare)),
+            asyncio.create_task(self._stage(embed_queue, write_queue, self._embed)),
+            asyncio.create_task(self._stage(write_queue, None, self._write))
+        ]
+
+        try:
+            await self._read(body, prepare_queue)
+            await prepare_queue.put(_DONE)
+            await asyncio.gather(*stages)
+            self.status = "completed"
+        except BaseException:
+            self.status = "failed"
+            for stage in stages:
+                stage.cancel()
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+            _active.pop(self.id, None)
+
+        logger.info(
+            f"Stream ingestion {self.id} finished: {self.documents_written} documents, "
+            f"{self.added} chunks added, {self.error_count} errors"
+        )
+        return self.progress()
+
+    async def _read(self, body: AsyncIterator[bytes], out: asyncio.Queue) -> None:
+        """Split the body into lines and queue documents in batches"""
+        batch: List[Dict[str, Any]] = []
+
+        async for line in iter_lines(body, self.max_line_bytes):
+            batch = await self._add_line(line, batch, out)
+
+        if batch:
+            await self._flush(batch, out)
+
+    async def _add_line(self, line: bytes, batch: List[Dict[str, Any]], out: asyncio.Queue) -> List[Dict[str, Any]]:
+        self.lines += 1
+        line = line.strip()
+        if not line:
+            return batch
+
+        try:
+            document = parse_document(line)
+        except ValueError as e:
+            self.failed_documents += 1
+            self._record_error({"line": self.lines, "error": str(e)})
+            return batch
+
+        self.documents_received += 1
+        batch.append(document)
+
+        if len(batch) >= self.batch_size:
+            await self._flush(batch, out)
+            return []
+        return batch
+
+    async def _flush(self, batch: List[Dict[str, Any]], out: asyncio.Queue) -> None:
+        self.batches += 1
+        # Blocks while the pipeline is full; this is the backpressure point
+        await out.put({"batch": self.batches, "documents": batch})
+
+    async def _stage(
+        self,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        work: Callable[[Dict[str, Any]], Any]
+    ) -> None:
+        """Run one stage until the end-of-stream marker arrives"""
+        while True:
+            item = await inbox.get()
+            try:
+                if item is _DONE:
+                    if outbox is not None:
+                        await outbox.put(_DONE)
+                    return
+
+                try:
+                    result = await work(item)
+                except Exception as e:
+                    self.failed_documents += len(item['documents'])
+                    self._record_error({"batch": item['batch'], "error": str(e)})
+                    logger.error(f"Stream ingestion {self.id} batch {item['batch']} failed: {e}")
+                    continue
+
+                if outbox is not None:
+                    await outbox.put(result)
+            finally:
+                inbox.task_done()
+
+    async def _prepare(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        def prepare(documents):
+            return [prepare_document(doc['content'], doc['metadata']) for doc in documents]
+
+        prepared = await self.executor.run_waiting(prepare, item['documents'])
+        self.chunks += sum(len(doc['chunks']) for doc in prepared)
+        return {**item, "prepared": prepared}
+
+    async def _embed(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        keys = {doc['doc_key'] for doc in item['prepared']}
+
+        # Planning reads the collection; a document repeated from a batch
+        # still waiting to be written must see that write first
+        if keys & self._unwritten_keys:
+            await self._queues[2].join()
+            self._unwritten_keys.clear()
+
+        def embed(prepared):
+            plan = self.chroma_service.plan_sync(prepared)
+            if not plan['success']:
+                raise RuntimeError(plan.get('error', 'Sync planning failed'))
+            embeddings = None
+            if plan['add_chunks']:
+                embeddings = self.chroma_service.embedding_function.encode(plan['add_chunks'])
+            return plan, embeddings
+
+        plan, embeddings = await self.executor.run_waiting(embed, item['prepared'])
+        self._unwritten_keys |= keys
+        return {"batch": item['batch'], "documents": item['documents'], "plan": plan, "embeddings": embeddings}
+
+    async def _write(self, item: Dict[str, Any]) -> None:
+        result = await self.executor.run_waiting(self.chroma_service.apply_sync, item['plan'], item['embeddings'])
+        if not result['success']:
+            raise RuntimeError(result.get('error', 'Write failed'))
+
+        self.documents_written += len(item['documents'])
+        self.added += result['added']
+        self.updated += result['updated']
+        self.deleted += result['deleted']
+        self.unchanged_documents += result['unchanged_documents']
+
+        logger.info(
+            f"Stream ingestion {self.id}: batch {item['batch']} written "
+            f"({self.documents_written}/{self.documents_received} documents)"
+        )
+
+    def _record_error(self, error: Dict[str, Any]) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    def progress(self) -> Dict[str, Any]:
+        """Get a progress report"""
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "id": self.id,
+            "status": self.status,
+            "documents_received": self.documents_received,
+            "documents_written": self.documents_written,
+            "failed_documents": self.failed_documents,
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "added": self.added,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "unchanged_documents": self.unchanged_documents,
+            "queued_batches": [queue.qsize() for queue in self._queues],
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(self.documents_written / elapsed, 2) if elapsed else 0.0,
+            "error_count": self.error_count,
+            "errors": list(self.errors)
+        }
+
+
+def get_active_streams() -> List[Dict[str, Any]]:
+    """Progress of every stream ingestion currently running"""
+    return [pipeline.progress() for pipeline in list(_active.values())]
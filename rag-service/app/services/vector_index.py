@@ -0,0 +1,549 @@
+# Exact (Brute-Force) Vector Index
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+from app.services.lexical_index import matches_where
+
+# Chunks loaded per collection.get call when building the index
+_LOAD_PAGE_SIZE = 1000
+
+# Rows converted to float32 at a time when scoring a float16 or int8 matrix
+_SCORE_BLOCK_ROWS = 1024
+
+# Largest int8 code; symmetric so zero stays exactly zero
+_INT8_MAX = 127
+
+
+class ExactVectorIndex:
+    """
+    In-process exact nearest-neighbour index
+
+    All embeddings live in one contiguous matrix (float32, float16 to halve
+    memory, or int8 with a per-dimension scale to quarter it) with the chunk
+    IDs, texts and metadata in side arrays at the same row. A batch of queries is one matrix product followed by
+    argpartition, so results are exact and, for collections of a few
+    thousand chunks, faster than an HNSW graph walk. Rows are appended
+    into spare capacity and deleted by moving the last row into the gap.
+    ChromaService updates it on every add, update and delete.
+
+    A compact matrix can keep the float32 rows it was encoded from: a
+    read-only (memory-mapped) matrix from its snapshot plus the vectors
+    written since. Searches then rank on the compact rows and rescore the
+    best few candidates per result in float32, reading only the candidates'
+    rows of the float32 matrix.
+    """
+
+    def __init__(self, dimension: int, distance_metric: str = "cosine", dtype: str = "float32"):
+        """
+        Initialize exact index
+
+        Args:
+            dimension: Embedding dimension
+            distance_metric: 'cosine', 'l2' or 'ip' (as the Chroma collection)
+            dtype: Matrix storage type, 'float32', 'float16' or 'int8'
+        """
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        if distance_metric not in ("cosine", "l2", "ip"):
+            raise ValueError(f"Unsupported distance metric: {distance_metric}")
+
+        self.dimension = dimension
+        self.distance_metric = distance_metric
+        self.dtype = np.dtype(dtype)
+
+        self._matrix = np.zeros((0, dimension), dtype=self.dtype)
+        # int8 only: a row decodes as codes * scale; a dimension's scale only
+        # grows, re-encoding the stored rows when a new vector exceeds it
+        self._scale = np.zeros(dimension, dtype=np.float32) if self.dtype == np.int8 else None
+        # Squared norms of the (decoded) stored rows (l2 distances)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._ids: List[str] = []
+        # Lists, or read-only sequences while serving a mapped snapshot
+        self._documents: Sequence[str] = []
+        self._metadatas: Sequence[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        # Float32 rows of a compact matrix (None when not kept): the
+        # snapshot's matrix, its row per ID, and vectors written since
+        self._full: Optional[np.ndarray] = None
+        self._full_rows: Dict[str, int] = {}
+        self._full_written: Dict[str, np.ndarray] = {}
+        # Candidates rescored per result
+        self.rescore_factor = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, collection: Any, page_size: int = _LOAD_PAGE_SIZE) -> int:
+        """
+        Rebuild the index from every chunk in a Chroma collection
+
+        Args:
+            collection: Chroma collection
+            page_size: Chunks fetched per call
+
+        Returns:
+            Number of chunks indexed
+        """
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=page_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not page['ids']:
+                break
+            self.add(page['ids'], page['embeddings'], page['documents'], page['metadatas'])
+            offset += len(page['ids'])
+
+        logger.info(f"Exact vector index built: {len(self)} chunks ({self.nbytes / 1024 / 1024:.1f} MB)")
+        return len(self)
+
+    def attach(
+        self,
+        matrix: np.ndarray,
+        ids: List[str],
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        scale: Optional[np.ndarray] = None,
+        full: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Serve existing arrays (e.g. a read-only memory-mapped snapshot)
+        without copying them
+
+        The matrix rows must already be normalized for cosine. Read-only
+        arrays are copied into private memory on the first write.
+
+        Args:
+            matrix: Embedding matrix, one row per ID, in this index's dtype
+            ids: Chunk IDs
+            documents: Chunk texts (any indexable sequence)
+            metadatas: Chunk metadata (any indexable sequence)
+            scale: Per-dimension scale of an int8 matrix
+            full: Float32 rows of a compact matrix (prepared like the
+                matrix rows, same order), kept for rescoring
+        """
+        if matrix.shape != (len(ids), self.dimension) or matrix.dtype != self.dtype:
+            raise ValueError(f"Matrix {matrix.shape} {matrix.dtype} does not fit this index")
+        if (scale is None) != (self._scale is None) or (scale is not None and scale.shape != (self.dimension,)):
+            raise ValueError("An int8 matrix needs a per-dimension scale (and only an int8 matrix)")
+        if full is not None and (full.shape != (len(ids), self.dimension) or full.dtype != np.float32):
+            raise ValueError(f"Float32 rows {full.shape} {full.dtype} do not fit this index")
+
+        with self._lock:
+            self._matrix = matrix
+            if scale is not None:
+                self._scale = np.array(scale, dtype=np.float32)
+            sq_norms = np.empty(len(ids), dtype=np.float32)
+            for start in range(0, len(ids), _SCORE_BLOCK_ROWS):
+                block = self._decode(matrix[start:start + _SCORE_BLOCK_ROWS])
+                sq_norms[start:start + len(block)] = (block * block).sum(axis=1)
+            self._sq_norms = sq_norms
+            self._ids = list(ids)
+            self._documents = documents
+            self._metadatas = metadatas
+            self._rows = {id_: row for row, id_ in enumerate(self._ids)}
+            if full is not None:
+                self._full = full
+                self._full_rows = dict(self._rows)
+                self._full_written = {}
+
+    def export(self) -> Tuple[np.ndarray, List[str], List[str], List[Dict[str, Any]]]:
+        """Copy of the occupied matrix rows (as stored) with their IDs, texts and metadata"""
+        with self._lock:
+            count = len(self._ids)
+            return (
+                np.array(self._matrix[:count]),
+                list(self._ids),
+                [self._documents[row] for row in range(count)],
+                [self._metadatas[row] for row in range(count)]
+            )
+
+    def export_full(self) -> Optional[np.ndarray]:
+        """Float32 rows in export() order, or None when they are not kept"""
+        with self._lock:
+            if self._full is None:
+                return None
+            return self._full_vectors(range(len(self._ids)))
+
+    def keep_full_precision(self) -> None:
+        """
+        Keep the float32 row of every vector written from now on (a compact
+        index that is about to be loaded and snapshotted)
+        """
+        with self._lock:
+            if self.dtype != np.float32 and self._full is None:
+                self._full = np.zeros((0, self.dimension), dtype=np.float32)
+
+    def _full_vectors(self, rows: Iterable[int]) -> np.ndarray:
+        """Float32 rows of the given matrix rows; only those rows of the float32 matrix are read"""
+        rows = list(rows)
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        positions, snapshot_rows = [], []
+        for i, row in enumerate(rows):
+            written = self._full_written.get(self._ids[row])
+            if written is not None:
+                vectors[i] = written
+            else:
+                positions.append(i)
+                snapshot_rows.append(self._full_rows[self._ids[row]])
+        if snapshot_rows:
+            vectors[positions] = self._full[snapshot_rows]
+        return vectors
+
+    @property
+    def mapped(self) -> bool:
+        """Whether the index still serves a read-only (memory-mapped) matrix"""
+        return not self._matrix.flags.writeable
+
+    def _materialize(self) -> None:
+        """Copy read-only attached arrays into private memory before a write"""
+        if self.mapped:
+            self._matrix = np.array(self._matrix)
+        if not isinstance(self._documents, list):
+            self._documents = list(self._documents)
+        if not isinstance(self._metadatas, list):
+            self._metadatas = list(self._metadatas)
+
+    @property
+    def scale(self) -> Optional[np.ndarray]:
+        """Per-dimension scale of an int8 matrix (None for float matrices)"""
+        return self._scale
+
+    @property
+    def rescoring(self) -> bool:
+        """Whether searches rescore their candidates in full precision"""
+        return self._full is not None and self.rescore_factor > 0
+
+    def enable_rescoring(self, factor: int = 4) -> None:
+        """
+        Rescore compact-matrix results with the kept float32 rows
+
+        Each search ranks `factor` x top_k candidates on the compact matrix
+        and keeps the top_k by their float32 distance. Pointless (and
+        ignored) for float32.
+
+        Args:
+            factor: Candidates ranked per result
+
+        Raises:
+            ValueError: The index keeps no float32 rows (see attach and
+                keep_full_precision)
+        """
+        if self.dtype == np.float32:
+            return
+        if self._full is None:
+            raise ValueError("Rescoring needs the float32 rows of the compact matrix")
+        self.rescore_factor = factor
+
+    def _prepare(self, embeddings: Any) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if self.distance_metric == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Prepared float32 rows in the matrix dtype, growing the int8 scale to fit them"""
+        if self._scale is None:
+            return vectors.astype(self.dtype)
+
+        needed = np.abs(vectors).max(axis=0) / _INT8_MAX if len(vectors) else self._scale
+        if np.any(needed > self._scale):
+            scale = np.maximum(np.maximum(self._scale, needed), 1e-12).astype(np.float32)
+            count = len(self._ids)
+            if count:
+                # Re-encode the stored rows on the wider grid
+                ratio = self._scale / scale
+                for start in range(0, count, _SCORE_BLOCK_ROWS):
+                    stop = min(start + _SCORE_BLOCK_ROWS, count)
+                    self._matrix[start:stop] = np.round(self._matrix[start:stop] * ratio).astype(np.int8)
+                    block = self._matrix[start:stop] * scale
+                    self._sq_norms[start:stop] = (block * block).sum(axis=1)
+            self._scale = scale
+
+        return np.clip(np.round(vectors / self._scale), -_INT8_MAX, _INT8_MAX).astype(np.int8)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Stored rows as float32"""
+        if self._scale is None:
+            return rows.astype(np.float32)
+        return rows.astype(np.float32) * self._scale
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the matrix capacity (doubling) to hold at least `rows` rows"""
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 256)
+
+        matrix = np.zeros((capacity, self.dimension), dtype=self.dtype)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:len(self._ids)] = self._sq_norms[:len(self._ids)]
+        self._matrix, self._sq_norms = matrix, sq_norms
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: Any,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Insert chunks, replacing any already indexed under the same ID"""
+        vectors = self._prepare(embeddings)
+
+        with self._lock:
+            self._materialize()
+            self._reserve(len(self._ids) + len(ids))
+            codes = self._encode(vectors)
+            decoded = self._decode(codes) if self.dtype != np.float32 else vectors
+            for id_, code, vector, document, metadata in zip(ids, codes, decoded, documents, metadatas):
+                row = self._rows.get(id_)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[id_] = row
+                    self._ids.append(id_)
+                    self._documents.append(document)
+                    self._metadatas.append(metadata or {})
+                else:
+                    self._documents[row] = document
+                    self._metadatas[row] = metadata or {}
+                self._matrix[row] = code
+                self._sq_norms[row] = float(np.dot(vector, vector))
+            if self._full is not None:
+                self._full_written.update(zip(ids, vectors))
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace the stored metadata of indexed chunks"""
+        with self._lock:
+            self._materialize()
+            for id_, metadata in zip(ids, metadatas):
+                row = self._rows.get(id_)
+                if row is not None:
+                    self._metadatas[row] = metadata or {}
+
+    def remove(self, ids: List[str]) -> None:
+        """Drop chunks (unknown IDs are ignored); the last row fills each gap"""
+        with self._lock:
+            self._materialize()
+            for id_ in ids:
+                row = self._rows.pop(id_, None)
+                if row is None:
+                    continue
+                self._full_written.pop(id_, None)
+                last = len(self._ids) - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._sq_norms[row] = self._sq_norms[last]
+                    self._ids[row] = self._ids[last]
+                    self._documents[row] = self._documents[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._documents.pop()
+                self._metadatas.pop()
+
+    def clear(self) -> None:
+        """Remove every chunk"""
+        with self._lock:
+            self._matrix = np.zeros((0, self.dimension), dtype=self.dtype)
+            if self._scale is not None:
+                self._scale = np.zeros(self.dimension, dtype=np.float32)
+            self._sq_norms = np.zeros(0, dtype=np.float32)
+            self._ids = []
+            self._documents = []
+            self._metadatas = []
+            self._rows = {}
+            if self._full is not None:
+                self._full = np.zeros((0, self.dimension), dtype=np.float32)
+                self._full_rows = {}
+                self._full_written = {}
+
+    def _distances(self, queries: np.ndarray, count: int) -> np.ndarray:
+        """Distances of each query to the first `count` rows, shape (queries, count)"""
+        if self.dtype == np.float32:
+            dots = queries @ self._matrix[:count].T
+        else:
+            # (q * scale) . codes == q . (codes * scale), without decoding the rows
+            scaled = queries * self._scale if self._scale is not None else queries
+            dots = np.empty((len(queries), count), dtype=np.float32)
+            for start in range(0, count, _SCORE_BLOCK_ROWS):
+                stop = min(start + _SCORE_BLOCK_ROWS, count)
+                dots[:, start:stop] = scaled @ self._matrix[start:stop].astype(np.float32).T
+
+        if self.distance_metric == "l2":
+            return self._sq_norms[:count] - 2.0 * dots + (queries * queries).sum(axis=1, keepdims=True)
+        return 1.0 - dots
+
+    @staticmethod
+    def _nearest(distances: np.ndarray, k: int) -> np.ndarray:
+        """Rows of the k smallest distances, nearest first"""
+        if k < len(distances):
+            rows = np.argpartition(distances, k - 1)[:k]
+        else:
+            rows = np.arange(len(distances))
+        return rows[np.argsort(distances[rows], kind="stable")]
+
+    def search(
+        self,
+        query_embeddings: Any,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Exact nearest neighbours of one or more queries
+
+        All queries are scored against the matrix in one product. With a
+        filter, the nearest rows are checked against it in growing windows
+        (8x top_k first), so selective filters do not cost a metadata check
+        of every row. When rescoring, rescore_factor x top_k candidates are
+        kept per query and re-ranked on their full-precision embeddings.
+
+        Args:
+            query_embeddings: Query embedding, or 2D array of them
+            top_k: Number of results per query
+            filter_metadata: Optional Chroma-style metadata filter
+
+        Returns:
+            Per query, a list of (row, distance), nearest first; distances
+            use the same definitions as Chroma's hnsw:space
+        """
+        queries = self._prepare(query_embeddings)
+
+        with self._lock:
+            count = len(self._ids)
+            if not count or top_k <= 0:
+                return [[] for _ in queries]
+
+            wanted = top_k * self.rescore_factor if self.rescoring else top_k
+            all_distances = self._distances(queries, count)
+            allowed: Dict[int, bool] = {}
+            results = []
+            for distances in all_distances:
+                if not filter_metadata:
+                    rows = self._nearest(distances, wanted)
+                else:
+                    window = min(count, wanted * 8)
+                    while True:
+                        rows = []
+                        for row in self._nearest(distances, window).tolist():
+                            ok = allowed.get(row)
+                            if ok is None:
+                                ok = allowed[row] = matches_where(self._metadatas[row], filter_metadata)
+                            if ok:
+                                rows.append(row)
+                                if len(rows) == wanted:
+                                    break
+                        if len(rows) == wanted or window == count:
+                            break
+                        window = min(count, window * 4)
+
+                results.append([(int(row), float(distances[row])) for row in rows])
+
+            if self.rescoring:
+                results = self._rescore(queries, results, top_k)
+            return results
+
+    def _rescore(
+        self,
+        queries: np.ndarray,
+        candidates: List[List[Tuple[int, float]]],
+        top_k: int
+    ) -> List[List[Tuple[int, float]]]:
+        """Re-rank each query's candidates by their exact float32 distance"""
+        rows = sorted({row for hits in candidates for row, _ in hits})
+        full = self._full_vectors(rows)
+        position = {row: i for i, row in enumerate(rows)}
+        dots = queries @ full.T
+        if self.distance_metric == "l2":
+            exact = (full * full).sum(axis=1) - 2.0 * dots + (queries * queries).sum(axis=1, keepdims=True)
+        else:
+            exact = 1.0 - dots
+
+        results = []
+        for i, hits in enumerate(candidates):
+            rescored = [(row, float(exact[i, position[row]])) for row, _ in hits]
+            rescored.sort(key=lambda hit: hit[1])
+            results.append(rescored[:top_k])
+        return results
+
+    def query(
+        self,
+        query_embeddings: Any,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Search several queries, returning the same shape as collection.query
+
+        Args:
+            query_embeddings: 2D array (or list) of query embeddings
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filter shared by all queries
+            include_embeddings: Also return each hit's stored embedding
+                (its float32 row when kept)
+
+        Returns:
+            Dictionary of per-query lists: ids, documents, metadatas,
+            distances (and embeddings)
+        """
+        response = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": None}
+        if include_embeddings:
+            response["embeddings"] = []
+
+        with self._lock:
+            for hits in self.search(query_embeddings, top_k, filter_metadata):
+                rows = [row for row, _ in hits]
+                response["ids"].append([self._ids[row] for row in rows])
+                response["documents"].append([self._documents[row] for row in rows])
+                response["metadatas"].append([self._metadatas[row] for row in rows])
+                response["distances"].append([distance for _, distance in hits])
+                if include_embeddings:
+                    response["embeddings"].append(self._vectors(rows).tolist())
+
+        return response
+
+    def _vectors(self, rows: List[int]) -> np.ndarray:
+        """Float32 rows when kept, else the decoded matrix rows"""
+        if self._full is not None:
+            return self._full_vectors(rows)
+        return self._decode(self._matrix[rows])
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """
+        Stored embedding of each indexed chunk (normalized for cosine; the
+        kept float32 row of a compact matrix, else decoded from it)
+        """
+        with self._lock:
+            known = [id_ for id_ in dict.fromkeys(ids) if id_ in self._rows]
+            vectors = self._vectors([self._rows[id_] for id_ in known])
+            return dict(zip(known, vectors.tolist()))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the occupied rows of the matrix (and the int8 scale)"""
+        scale_bytes = self._scale.nbytes if self._scale is not None else 0
+        return len(self._ids) * self.dimension * self.dtype.itemsize + scale_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        with self._lock:
+            return {
+                "enabled": True,
+                "chunks": len(self._ids),
+                "capacity": len(self._matrix),
+                "dimension": self.dimension,
+                "dtype": str(self.dtype),
+                "distance_metric": self.distance_metric,
+                "mapped": self.mapped,
+                "full_precision_rows": self._full is not None,
+                "rescore_factor": self.rescore_factor if self.rescoring else 0,
+                "matrix_mb": round(self.nbytes / (1024 * 1024), 2)
+            }
@@ -0,0 +1,466 @@
+# Memory-Mapped Vector Index Snapshots
+#
+# Usage:
+#   python -m app.services.vector_snapshot export --output /data/vector-snapshot
+#   python -m app.services.vector_snapshot info --path /data/vector-snapshot
+#
+# A snapshot is a directory holding the exact index's embedding matrix as a
+# .npy file (with its per-dimension scale when int8, and for float16/int8
+# the float32 rows that rescoring reads) plus offsets-indexed files of chunk
+# IDs, texts and metadata. Workers map it read-only, so every worker on a
+# host shares one page-cache copy and a cold start maps files instead of
+# paging the whole collection out of Chroma.
+#
+# Workers build snapshots with this module's export command in a child
+# process: reading embeddings out of Chroma loads the collection's HNSW
+# segment (float32 vectors and graph) for good, and it should only ever be
+# resident in processes that write.
+#
+# Each snapshot is written to its own version directory inside the snapshot
+# directory, and the `current` symlink is then swapped to it in one rename,
+# so a reader always sees one complete snapshot. The manifest records the
+# collection's content fingerprint; a snapshot whose fingerprint no longer
+# matches the collection is not used. Workers check for, build and write
+# snapshots under the directory's lock file, so when several need a new
+# snapshot at once one writes it and the others map it.
+
+import argparse
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+from loguru import logger
+from app.config import get_settings
+from app.services.vector_index import ExactVectorIndex
+from app.services.write_log import last_write
+
+SNAPSHOT_FORMAT = 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+SCALE_FILE = "scale.npy"
+FULL_FILE = "full.npy"
+IDS_FILE = "ids.npy"
+DOCUMENTS_FILE = "documents.bin"
+DOCUMENTS_OFFSETS_FILE = "documents.offsets.npy"
+METADATAS_FILE = "metadatas.jsonl"
+METADATAS_OFFSETS_FILE = "metadatas.offsets.npy"
+
+# Symlink to the version directory of the live snapshot
+CURRENT_LINK = "current"
+_VERSION_PREFIX = "v"
+
+# Lock file serializing snapshot builds across workers
+LOCK_FILE = ".lock"
+
+# Files of the single-directory layout written before version directories
+_LEGACY_FILES = (
+    MANIFEST_FILE, EMBEDDINGS_FILE, SCALE_FILE, IDS_FILE, DOCUMENTS_FILE,
+    DOCUMENTS_OFFSETS_FILE, METADATAS_FILE, METADATAS_OFFSETS_FILE
+)
+
+# Chunks hashed per collection.get call by the fallback fingerprint
+_FINGERPRINT_PAGE_SIZE = 1000
+
+# Directory the export child process runs in (where `app` is importable)
+_SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _OffsetColumn:
+    """
+    Read-only sequence over variable-length records in a mapped file
+
+    Record i spans bytes offsets[i]:offsets[i + 1] and is decoded only
+    when accessed.
+    """
+
+    def __init__(self, path: str, offsets: np.ndarray, decode: Callable[[bytes], Any]):
+        self._offsets = offsets
+        self._decode = decode
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap keeps its own reference to the file
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> Any:
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._decode(self._buffer[self._offsets[row]:self._offsets[row + 1]])
+
+    def __iter__(self) -> Iterator[Any]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+def _write_column(path: str, offsets_path: str, records: List[bytes]) -> None:
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(record) for record in records], out=offsets[1:])
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(record)
+    with open(offsets_path, "wb") as f:
+        np.save(f, offsets)
+
+
+def collection_fingerprint(persist_directory: str, collection: Any) -> str:
+    """
+    Identity of a collection's current contents
+
+    Chroma logs every add, update, upsert and delete of a collection with
+    an increasing sequence number, so the collection ID plus the last one
+    changes with every write and is read without touching the data. When
+    that log cannot be read (another Chroma version, say), the fingerprint
+    is a hash of every chunk ID and its metadata instead; chunk IDs are
+    derived from chunk text, so that still covers every change.
+
+    Args:
+        persist_directory: Chroma persist directory
+        collection: Chroma collection
+
+    Returns:
+        Fingerprint string
+    """
+    try:
+        _, seq_id = last_write(persist_directory, collection.name)
+        return f"{collection.id}:seq:{seq_id}"
+    except sqlite3.Error as e:
+        logger.debug(f"Chroma write log unavailable, hashing the collection: {e}")
+
+    digest = hashlib.sha256()
+    offset = 0
+    while True:
+        page = collection.get(limit=_FINGERPRINT_PAGE_SIZE, offset=offset, include=["metadatas"])
+        if not page['ids']:
+            break
+        for id_, metadata in sorted(zip(page['ids'], page['metadatas'])):
+            digest.update(id_.encode("utf-8"))
+            digest.update(json.dumps(metadata, sort_keys=True).encode("utf-8"))
+        offset += len(page['ids'])
+    return f"{collection.id}:sha256:{digest.hexdigest()}"
+
+
+@contextmanager
+def snapshot_lock(path: str) -> Iterator[None]:
+    """Hold the snapshot directory's lock (blocks while another worker holds it)"""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, LOCK_FILE), "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _live_directory(path: str) -> str:
+    """Directory holding the live snapshot files (the snapshot directory itself in the legacy layout)"""
+    link = os.path.join(path, CURRENT_LINK)
+    if os.path.islink(link):
+        return os.path.join(path, os.readlink(link))
+    return path
+
+
+def save_snapshot(index: ExactVectorIndex, path: str, fingerprint: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write an index snapshot to a directory
+
+    The files go to a new version directory, and the `current` symlink is
+    swapped to it with one rename. Workers mapping an older snapshot keep
+    their mapped files, and a reader never sees a mix of two snapshots.
+    Version directories other than the new and the previous one are then
+    removed.
+
+    Args:
+        index: Index to snapshot
+        path: Snapshot directory (created if needed)
+        fingerprint: collection_fingerprint of the contents the index holds
+
+    Returns:
+        The snapshot manifest
+    """
+    started = time.perf_counter()
+    matrix, ids, documents, metadatas = index.export()
+    full = index.export_full()
+    os.makedirs(path, exist_ok=True)
+
+    version = f"{_VERSION_PREFIX}{time.time_ns()}-{os.getpid()}"
+    directory = os.path.join(path, version)
+    os.makedirs(directory)
+
+    def target(name: str) -> str:
+        return os.path.join(directory, name)
+
+    try:
+        with open(target(EMBEDDINGS_FILE), "wb") as f:
+            np.save(f, matrix)
+        if index.scale is not None:
+            with open(target(SCALE_FILE), "wb") as f:
+                np.save(f, index.scale)
+        if full is not None:
+            with open(target(FULL_FILE), "wb") as f:
+                np.save(f, full)
+        with open(target(IDS_FILE), "wb") as f:
+            np.save(f, np.array(ids, dtype=str))
+        _write_column(
+            target(DOCUMENTS_FILE),
+            target(DOCUMENTS_OFFSETS_FILE),
+            [(document or "").encode("utf-8") for document in documents]
+        )
+        _write_column(
+            target(METADATAS_FILE),
+            target(METADATAS_OFFSETS_FILE),
+            [json.dumps(metadata, separators=(",", ":")).encode("utf-8") + b"\n" for metadata in metadatas]
+        )
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "count": len(ids),
+            "dimension": index.dimension,
+            "dtype": str(index.dtype),
+            "distance_metric": index.distance_metric,
+            "full_precision": full is not None,
+            "fingerprint": fingerprint,
+            "created_at": time.time()
+        }
+        with open(target(MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    link = os.path.join(path, CURRENT_LINK)
+    previous = os.readlink(link) if os.path.islink(link) else None
+    staged_link = os.path.join(path, f".{CURRENT_LINK}-{os.getpid()}")
+    if os.path.lexists(staged_link):
+        os.remove(staged_link)
+    os.symlink(version, staged_link)
+    os.replace(staged_link, link)
+
+    _remove_old_versions(path, keep={version, previous})
+
+    logger.info(
+        f"Vector snapshot written to {directory}: {len(ids)} chunks "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return manifest
+
+
+def _remove_old_versions(path: str, keep: set) -> None:
+    """Remove version directories not in `keep`, and the files of the legacy layout"""
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if name.startswith(_VERSION_PREFIX) and name not in keep and os.path.isdir(full) and not os.path.islink(full):
+            shutil.rmtree(full, ignore_errors=True)
+        elif name in _LEGACY_FILES and os.path.isfile(full):
+            os.remove(full)
+
+
+def invalidate_snapshot(path: str) -> None:
+    """
+    Stop a snapshot from being used, e.g. after a write it does not contain
+
+    Workers that already mapped it are unaffected; the next start rebuilds
+    the index from the collection and writes a new snapshot.
+    """
+    for name in (CURRENT_LINK, MANIFEST_FILE):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+
+
+def _load_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the snapshot in a directory, or None when there is none"""
+    return _load_manifest(_live_directory(path))
+
+
+def open_snapshot(path: str) -> ExactVectorIndex:
+    """
+    Map a snapshot read-only and serve it as an ExactVectorIndex
+
+    Nothing is copied: the matrix (and the float32 rows of a compact one)
+    are read-only memmaps and texts and metadata are decoded on access. The index copies them into private
+    memory on its first write.
+
+    Args:
+        path: Snapshot directory
+
+    Returns:
+        Index over the mapped snapshot
+
+    Raises:
+        ValueError: The snapshot is missing, of another format, or its
+            files disagree on the chunk count
+    """
+    # Resolve `current` once, so every file comes from the same snapshot
+    directory = _live_directory(path)
+    manifest = _load_manifest(directory)
+    if manifest is None:
+        raise ValueError(f"No vector snapshot in {path}")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported vector snapshot format: {manifest.get('format')}")
+
+    matrix = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+    scale = np.load(os.path.join(directory, SCALE_FILE)) if manifest["dtype"] == "int8" else None
+    full = np.load(os.path.join(directory, FULL_FILE), mmap_mode="r") if manifest.get("full_precision") else None
+    ids = np.load(os.path.join(directory, IDS_FILE)).tolist()
+    documents = _OffsetColumn(
+        os.path.join(directory, DOCUMENTS_FILE),
+        np.load(os.path.join(directory, DOCUMENTS_OFFSETS_FILE), mmap_mode="r"),
+        lambda record: record.decode("utf-8")
+    )
+    metadatas = _OffsetColumn(
+        os.path.join(directory, METADATAS_FILE),
+        np.load(os.path.join(directory, METADATAS_OFFSETS_FILE), mmap_mode="r"),
+        json.loads
+    )
+
+    count = manifest["count"]
+    if not (len(matrix) == len(ids) == len(documents) == len(metadatas) == count) or (
+        full is not None and len(full) != count
+    ):
+        raise ValueError(f"Vector snapshot in {path} is inconsistent (expected {count} chunks)")
+
+    index = ExactVectorIndex(manifest["dimension"], manifest["distance_metric"], manifest["dtype"])
+    index.attach(matrix, ids, documents, metadatas, scale=scale, full=full)
+    return index
+
+
+def export_collection(
+    persist_directory: str,
+    collection_name: str,
+    output: str,
+    dtype: str = "float32",
+    dimension: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Build an exact index from a persisted Chroma collection and snapshot it
+
+    A float16/int8 snapshot also gets the float32 rows for rescoring.
+
+    Args:
+        persist_directory: Chroma persist directory
+        collection_name: Collection name
+        output: Snapshot directory
+        dtype: Matrix storage type
+        dimension: Embedding dimension (required to snapshot an empty collection)
+
+    Returns:
+        The snapshot manifest
+    """
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(path=persist_directory, settings=ChromaSettings(anonymized_telemetry=False))
+    collection = client.get_collection(collection_name)
+
+    if dimension is None:
+        first = collection.get(limit=1, include=["embeddings"])
+        if not first['ids']:
+            raise ValueError(f"Collection '{collection_name}' is empty")
+        dimension = len(first['embeddings'][0])
+
+    index = ExactVectorIndex(
+        dimension,
+        distance_metric=(collection.metadata or {}).get("hnsw:space", "l2"),
+        dtype=dtype
+    )
+    index.keep_full_precision()
+    fingerprint = collection_fingerprint(persist_directory, collection)
+    index.load(collection)
+    return save_snapshot(index, output, fingerprint)
+
+
+def export_in_subprocess(
+    persist_directory: str,
+    collection_name: str,
+    output: str,
+    dtype: str,
+    dimension: int
+) -> None:
+    """
+    Run export_collection in a child process, which takes the HNSW segment
+    it loads along when it exits
+
+    The caller must hold the snapshot lock (the child does not take it).
+
+    Raises:
+        RuntimeError: The export failed
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [
+            sys.executable, "-m", "app.services.vector_snapshot", "export",
+            "--persist-dir", persist_directory,
+            "--collection", collection_name,
+            "--output", output,
+            "--dtype", dtype,
+            "--dimension", str(dimension),
+            "--no-lock"
+        ],
+        cwd=_SERVICE_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Vector snapshot export failed: {completed.stderr.strip()[-2000:]}")
+    logger.info(f"Vector snapshot exported by a child process in {time.perf_counter() - started:.2f}s")
+
+
+def main() -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Memory-mapped vector index snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Snapshot the Chroma collection")
+    export_parser.add_argument("--persist-dir", default=settings.chroma_persist_dir)
+    export_parser.add_argument("--collection", default=settings.chroma_collection_name)
+    export_parser.add_argument("--output", default=settings.vector_snapshot_dir, required=not settings.vector_snapshot_dir)
+    export_parser.add_argument("--dtype", default=settings.vector_index_dtype, choices=["float32", "float16", "int8"])
+    export_parser.add_argument("--dimension", type=int, default=None, help="Needed for an empty collection")
+    export_parser.add_argument("--no-lock", action="store_true", help="The caller holds the snapshot lock")
+
+    info_parser = subparsers.add_parser("info", help="Describe a snapshot")
+    info_parser.add_argument("--path", default=settings.vector_snapshot_dir, required=not settings.vector_snapshot_dir)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        if args.no_lock:
+            result = export_collection(args.persist_dir, args.collection, args.output, args.dtype, args.dimension)
+        else:
+            with snapshot_lock(args.output):
+                result = export_collection(args.persist_dir, args.collection, args.output, args.dtype, args.dimension)
+    else:
+        started = time.perf_counter()
+        result = {
+            "manifest": read_manifest(args.path),
+            "index": open_snapshot(args.path).stats(),
+            "open_ms": round((time.perf_counter() - started) * 1000.0, 2)
+        }
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Chroma Write Log
+#
+# Chroma records every add, update, upsert and delete in the embeddings_queue
+# table of chroma.sqlite3, numbered with an increasing seq_id and tagged with
+# the collection's topic. Reading a collection's newest seq_id tells whether
+# it changed without touching its data, which is how a worker notices writes
+# that other processes sharing the persist directory have made.
+
+import os
+import sqlite3
+from typing import Tuple
+
+SQLITE_FILE = "chroma.sqlite3"
+
+
+def _connect(persist_directory: str) -> sqlite3.Connection:
+    path = os.path.join(persist_directory, SQLITE_FILE)
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def last_write(persist_directory: str, collection_name: str) -> Tuple[str, int]:
+    """
+    Position of a collection in the write log
+
+    Args:
+        persist_directory: Chroma persist directory
+        collection_name: Collection name
+
+    Returns:
+        Tuple of (collection ID, seq_id of its newest write or 0); the ID
+        is empty if the collection does not exist
+
+    Raises:
+        sqlite3.Error: If the log cannot be read
+    """
+    conn = _connect(persist_directory)
+    try:
+        row = conn.execute(
+            "SELECT id, topic FROM collections WHERE name = ?", (collection_name,)
+        ).fetchone()
+        if row is None:
+            return "", 0
+        # Walks the primary key backwards, so it stops at the collection's newest write
+        seq = conn.execute(
+            "SELECT seq_id FROM embeddings_queue WHERE topic = ? ORDER BY seq_id DESC LIMIT 1",
+            (row[1],)
+        ).fetchone()
+        return row[0], seq[0] if seq else 0
+    finally:
+        conn.close()
+
+
+def writes_since(persist_directory: str, collection_id: str, seq_id: int) -> Tuple[int, int]:
+    """
+    Writes logged for a collection after a position
+
+    Args:
+        persist_directory: Chroma persist directory
+        collection_id: Collection ID
+        seq_id: Position to count from
+
+    Returns:
+        Tuple of (number of writes after seq_id, seq_id of the newest)
+
+    Raises:
+        sqlite3.Error: If the log cannot be read
+    """
+    conn = _connect(persist_directory)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(seq_id), ?) FROM embeddings_queue "
+            "WHERE seq_id > ? AND topic = (SELECT topic FROM collections WHERE id = ?)",
+            (seq_id, seq_id, collection_id)
+        ).fetchone()
+        return row[0], row[1]
+    finally:
+        conn.close()
@@ -1,12 +1,16 @@
 """Utilities package"""
 
-from .text_processing import chunk_text, clean_text, extract_metadata_from_text, summarize_text
+from .text_processing import chunk_spans, chunk_stream, chunk_text, clean_text, extract_metadata_from_text, summarize_text
 from .logger import logger
+from .cache import LRUCache
 
 __all__ = [
+    "chunk_spans",
+    "chunk_stream",
     "chunk_text",
     "clean_text", 
     "extract_metadata_from_text",
     "summarize_text",
-    "logger"
+    "logger",
+    "LRUCache"
 ]
\ No newline at end of file
@@ -0,0 +1,236 @@
+# Document Parsers
+#
+# Each parser yields the text of a file one page (PDF) or section (DOCX,
+# HTML, plain text) at a time so documents can be chunked as a stream.
+# Parser libraries are imported lazily; this module is also the entry
+# point of the parsing worker processes and must stay cheap to import.
+
+import hashlib
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .text_processing import chunk_stream, clean_text
+
+# Supported document types by file extension
+DOCUMENT_TYPES = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".html": "html",
+    ".htm": "html",
+    ".txt": "text",
+    ".md": "text"
+}
+
+CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/html": "html",
+    "text/plain": "text",
+    "text/markdown": "text"
+}
+
+_HTML_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_HTML_BLOCKS = _HTML_HEADINGS | {
+    "p", "li", "dt", "dd", "td", "th", "caption", "pre", "blockquote",
+    "figcaption", "div", "section", "article", "main", "body"
+}
+_HTML_SKIP = {"script", "style", "noscript", "template", "head", "nav", "svg"}
+
+# Token offset function of the worker process (token chunking mode)
+_worker_token_offsets: Optional[Callable[[str], List[Tuple[int, int]]]] = None
+
+
+def detect_type(filename: str, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Detect the document type of a file
+
+    Args:
+        filename: File name (the extension is checked first)
+        content_type: Optional MIME type
+
+    Returns:
+        'pdf', 'docx', 'html' or 'text', or None if unsupported
+    """
+    kind = DOCUMENT_TYPES.get(os.path.splitext(filename or "")[1].lower())
+    if kind is None and content_type:
+        kind = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return kind
+
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    """Yield the text of each PDF page; pages are parsed on demand"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def iter_docx_sections(path: str) -> Iterator[str]:
+    """Yield DOCX text section by section, starting a section at each heading"""
+    import docx
+
+    document = docx.Document(path)
+    section: List[str] = []
+
+    for paragraph in document.paragraphs:
+        style = paragraph.style.name if paragraph.style is not None else ""
+        if style.startswith("Heading") and section:
+            yield "\n".join(section)
+            section = []
+        if paragraph.text.strip():
+            section.append(paragraph.text)
+
+    if section:
+        yield "\n".join(section)
+
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if cells:
+                yield " | ".join(cells)
+
+
+def iter_html_sections(path: str) -> Iterator[str]:
+    """
+    Yield HTML text section by section, starting a section at each heading
+
+    Uses lxml's incremental parser and clears each block once its text
+    has been taken, so the text of a large page is not held twice.
+    """
+    from lxml import etree
+
+    parts: List[str] = []
+
+    for _, element in etree.iterparse(path, events=("end",), html=True, remove_comments=True, recover=True):
+        tag = element.tag.lower() if isinstance(element.tag, str) else ""
+
+        if tag in _HTML_SKIP:
+            element.clear(keep_tail=True)
+            continue
+        if tag not in _HTML_BLOCKS:
+            continue
+
+        if tag in _HTML_HEADINGS and parts:
+            yield "\n".join(parts)
+            parts = []
+
+        text = " ".join(t.strip() for t in element.itertext() if t.strip())
+        if text:
+            parts.append(text)
+
+        # Drop the element's content; its tail belongs to the parent
+        element.clear(keep_tail=True)
+
+    if parts:
+        yield "\n".join(parts)
+
+
+def iter_paragraphs(lines: Iterable[str]) -> Iterator[str]:
+    """Group lines of plain text into paragraphs (blank-line separated)"""
+    paragraph: List[str] = []
+    for line in lines:
+        if line.strip():
+            paragraph.append(line.rstrip("\n"))
+        elif paragraph:
+            yield "\n".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield "\n".join(paragraph)
+
+
+def iter_text_sections(path: str) -> Iterator[str]:
+    """Yield plain text paragraph by paragraph (blank-line separated)"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from iter_paragraphs(f)
+
+
+PARSERS = {
+    "pdf": iter_pdf_pages,
+    "docx": iter_docx_sections,
+    "html": iter_html_sections,
+    "text": iter_text_sections
+}
+
+
+def iter_sections(path: str, kind: str) -> Iterator[str]:
+    """
+    Yield the text of a document piece by piece
+
+    Args:
+        path: File path
+        kind: Document type from detect_type
+
+    Returns:
+        Iterator of page/section texts
+    """
+    if kind not in PARSERS:
+        raise ValueError(f"Unsupported document type: {kind}")
+    return PARSERS[kind](path)
+
+
+def init_parse_worker(token_offsets_factory: Optional[Callable[[], Callable]] = None) -> None:
+    """Process pool initializer: load the tokenizer once per worker (token mode)"""
+    global _worker_token_offsets
+    _worker_token_offsets = token_offsets_factory() if token_offsets_factory else None
+
+
+def chunk_sections(
+    sections: Iterable[str],
+    chunk_size: int,
+    overlap: int,
+    token_offsets: Optional[Callable[[str], List[Tuple[int, int]]]] = None
+) -> Dict[str, object]:
+    """
+    Clean and chunk a document arriving section by section
+
+    Args:
+        sections: Iterable of raw page/section texts in document order
+        chunk_size: Maximum chunk size (tokens with token_offsets)
+        overlap: Overlap between chunks
+        token_offsets: Tokenizer offset function for token-budget chunking
+
+    Returns:
+        Dictionary with chunks, content_hash (of the cleaned text) and the
+        number of sections read
+    """
+    digest = hashlib.sha256()
+    counts = {"sections": 0}
+
+    def cleaned_sections() -> Iterator[str]:
+        for section in sections:
+            counts["sections"] += 1
+            text = clean_text(section)
+            if text:
+                digest.update(text.encode("utf-8"))
+                digest.update(b"\n\n")
+                yield text
+
+    chunks = list(chunk_stream(
+        cleaned_sections(),
+        chunk_size=chunk_size,
+        overlap=overlap,
+        token_offsets=token_offsets
+    ))
+
+    return {
+        "chunks": chunks,
+        "content_hash": digest.hexdigest(),
+        "sections": counts["sections"]
+    }
+
+
+def parse_and_chunk(path: str, kind: str, chunk_size: int, overlap: int) -> Dict[str, object]:
+    """
+    Parse a file and chunk it as a stream (runs in a worker process)
+
+    Args:
+        path: File path
+        kind: Document type from detect_type
+        chunk_size: Maximum chunk size (tokens if the worker has a tokenizer)
+        overlap: Overlap between chunks
+
+    Returns:
+        Dictionary with chunks, content_hash (of the cleaned text) and the
+        number of sections read
+    """
+    return chunk_sections(iter_sections(path, kind), chunk_size, overlap, _worker_token_offsets)
@@ -0,0 +1,78 @@
+# Prometheus Metrics
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+from prometheus_client import Counter, Gauge, Histogram
+from app.utils.tracing import span
+
+# Pipeline stages take from well under a millisecond (BM25, formatting) to
+# seconds (large encode batches)
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# HTTP (names match the alert rules in monitoring/alerts.yaml)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Total HTTP request time",
+    ["method", "route", "status"],
+    buckets=_REQUEST_BUCKETS
+)
+REQUESTS = Counter("http_requests_total", "HTTP requests served", ["method", "route", "status"])
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+
+# Query pipeline
+QUERY_LATENCY = Histogram(
+    "rag_query_duration_seconds",
+    "Total time to answer POST /query, response serialization included",
+    buckets=_REQUEST_BUCKETS
+)
+QUERIES = Counter("rag_queries_total", "POST /query requests answered")
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each pipeline stage (encode, chroma_query, exact_search, format, lexical_search, rerank, upsert)",
+    ["stage"],
+    buckets=_STAGE_BUCKETS
+)
+QUERY_BATCH_SIZE = Histogram("rag_query_batch_size", "Queries per micro-batch", buckets=_BATCH_BUCKETS)
+QUERY_BATCH_WAIT = Histogram(
+    "rag_query_batch_wait_seconds",
+    "Time a query waited in the micro-batch queue",
+    buckets=_STAGE_BUCKETS
+)
+
+# Embedding and ingestion
+EMBED_BATCH_SIZE = Histogram("rag_embed_batch_size", "Texts per embedding model call", buckets=_BATCH_BUCKETS)
+EMBEDDED_TEXTS = Counter("rag_embedded_texts_total", "Texts run through the embedding model")
+CHUNKS_PREPARED = Counter("rag_ingest_chunks_prepared_total", "Chunks produced by document chunking")
+CHUNKS_UPSERTED = Counter("rag_ingest_chunks_upserted_total", "Chunks written to the collection")
+UPSERT_BATCH_SIZE = Histogram("rag_ingest_upsert_batch_size", "Chunks per collection upsert", buckets=_BATCH_BUCKETS)
+
+# Models
+MODEL_LOAD_SECONDS = Gauge(
+    "rag_model_load_seconds",
+    "Time taken to load a model",
+    ["kind", "model"],
+    multiprocess_mode="max"
+)
+
+
+@contextmanager
+def observe_stage(stage: str, **attrs: Any) -> Iterator[None]:
+    """
+    Record the time spent in the block under the given pipeline stage
+
+    Also opens a trace span of the same name when the request is traced.
+    """
+    started = time.perf_counter()
+    try:
+        with span(stage, **attrs):
+            yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
@@ -1,75 +1,221 @@
 # Text Processing Utilities
 
-from typing import List, Dict, Any
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import re
 from loguru import logger
 
+_NON_SPACE = re.compile(r'\S')
+_SENTENCE_ENDS = (". ", "! ", "? ", ".\n", "!\n", "?\n")
+
+
+class _CharMeasure:
+    """Chunk lengths measured in characters"""
+
+    def __init__(self, text: str):
+        self.size = len(text)
+
+    def length(self, start: int, end: int) -> int:
+        return end - start
+
+    def advance(self, pos: int, n: int) -> int:
+        """Offset n units after pos"""
+        return min(pos + n, self.size)
+
+    def retreat(self, pos: int, n: int) -> int:
+        """Offset n units before pos"""
+        return max(pos - n, 0)
+
+
+class _TokenMeasure:
+    """Chunk lengths measured in tokens, from one tokenization of the text"""
+
+    def __init__(self, text: str, token_offsets: Callable[[str], List[Tuple[int, int]]]):
+        self.size = len(text)
+        self.starts = [start for start, _ in token_offsets(text)]
+
+    def _index(self, pos: int) -> int:
+        return bisect_left(self.starts, pos)
+
+    def length(self, start: int, end: int) -> int:
+        return self._index(end) - self._index(start)
+
+    def advance(self, pos: int, n: int) -> int:
+        i = self._index(pos) + n
+        return self.starts[i] if i < len(self.starts) else self.size
+
+    def retreat(self, pos: int, n: int) -> int:
+        i = self._index(pos) - n
+        return self.starts[i] if i > 0 else 0
+
+
+def _last_break(text: str, start: int, limit: int, separator: str) -> int:
+    """
+    End offset of the last paragraph or sentence that fits in text[start:limit]
+
+    Uses reverse substring searches so each chunk costs one bounded scan
+    done in C rather than a Python step per sentence.
+
+    Returns:
+        Offset just past the break, or -1 if there is none after start
+    """
+    best = -1
+    if separator:
+        pos = text.rfind(separator, start + 1, limit + len(separator))
+        if pos > start:
+            best = pos
+    for marker in _SENTENCE_ENDS:
+        pos = text.rfind(marker, start, limit + 1)
+        if pos >= start and pos + 1 > max(best, start):
+            best = pos + 1
+    return best
+
+
+def chunk_spans(
+    text: str,
+    chunk_size: int = 512,
+    overlap: int = 50,
+    separator: str = "\n\n",
+    token_offsets: Optional[Callable[[str], List[Tuple[int, int]]]] = None
+) -> List[Tuple[int, int]]:
+    """
+    Split text into overlapping chunks, returned as (start, end) offsets
+
+    Works in one forward pass over offsets without building substrings:
+    each chunk is extended as far as `chunk_size` allows and then cut at the
+    last paragraph or sentence end inside it, else at the last space. Each
+    chunk after the first starts up to `overlap` units before the end of the
+    previous one, on a word boundary.
+
+    Args:
+        text: Text to split
+        chunk_size: Maximum chunk size (characters, or tokens with token_offsets)
+        overlap: Overlap between consecutive chunks, in the same unit
+        separator: Paragraph separator
+        token_offsets: Function returning the (start, end) character offsets
+            of every token in a text. When given, sizes are counted in tokens
+            of that tokenizer instead of characters
+
+    Returns:
+        List of (start, end) character offsets into text
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    measure = _TokenMeasure(text, token_offsets) if token_offsets else _CharMeasure(text)
+    overlap = max(0, min(overlap, chunk_size // 2))
+    size = len(text)
+
+    spans: List[Tuple[int, int]] = []
+    match = _NON_SPACE.search(text)
+    start = match.start() if match else size
+    # Chunks must reach past the previous one, or an overlap could repeat it
+    floor = start
+
+    while start < size:
+        limit = measure.advance(start, chunk_size)
+
+        if limit >= size:
+            end = size
+        else:
+            end = _last_break(text, floor, limit, separator)
+            if end <= floor:
+                end = text.rfind(" ", floor + 1, limit + 1)
+            if end <= floor:
+                end = max(limit, floor + 1)
+
+        # Trim trailing whitespace (the break itself may end in spaces)
+        stop = end
+        while stop > start and text[stop - 1].isspace():
+            stop -= 1
+        spans.append((start, stop))
+
+        if end >= size:
+            break
+
+        floor = stop
+        next_start = end
+        if overlap:
+            pos = measure.retreat(stop, overlap)
+            if pos > 0 and not text[pos - 1].isspace():
+                pos = text.find(" ", pos, stop) + 1
+            if start < pos < stop:
+                next_start = pos
+
+        match = _NON_SPACE.search(text, next_start)
+        start = match.start() if match else size
+
+    return spans
+
 
 def chunk_text(
     text: str,
     chunk_size: int = 512,
     overlap: int = 50,
-    separator: str = "\n\n"
+    separator: str = "\n\n",
+    token_offsets: Optional[Callable[[str], List[Tuple[int, int]]]] = None
 ) -> List[str]:
     """
     Split text into chunks with overlap
     
     Args:
         text: Text to split
-        chunk_size: Maximum chunk size in characters
+        chunk_size: Maximum chunk size in characters (tokens with token_offsets)
         overlap: Overlap size between chunks
         separator: Separator to split on
+        token_offsets: Tokenizer offset function for token-budget chunking
         
     Returns:
         List of text chunks
     """
-    # Split by separator first
-    paragraphs = text.split(separator)
+    return [
+        text[start:end]
+        for start, end in chunk_spans(text, chunk_size, overlap, separator, token_offsets)
+    ]
+
+
+def chunk_stream(
+    sections: Iterable[str],
+    chunk_size: int = 512,
+    overlap: int = 50,
+    separator: str = "\n\n",
+    token_offsets: Optional[Callable[[str], List[Tuple[int, int]]]] = None
+) -> Iterator[str]:
+    """
+    Chunk a document arriving as a sequence of sections (pages, paragraphs)
     
-    chunks = []
-    current_chunk = ""
+    Sections are joined with the paragraph separator into a small rolling
+    buffer. Every chunk except the last one in the buffer is final and is
+    yielded; the last one is kept, since it may continue into the next
+    section. Only about one section plus one chunk is held at a time, so a
+    long document is never materialized as one string.
     
-    for para in paragraphs:
-        para = para.strip()
-        if not para:
+    Args:
+        sections: Iterable of text pieces in document order
+        chunk_size: Maximum chunk size (characters, or tokens with token_offsets)
+        overlap: Overlap between consecutive chunks, in the same unit
+        separator: Separator placed between sections
+        token_offsets: Tokenizer offset function for token-budget chunking
+        
+    Yields:
+        Text chunks, as chunk_text would produce for the joined sections
+    """
+    buffer = ""
+    
+    for section in sections:
+        if not section:
             continue
+        buffer = f"{buffer}{separator}{section}" if buffer else section
         
-        # If paragraph itself is larger than chunk_size, split it
-        if len(para) > chunk_size:
-            # Split by sentences
-            sentences = re.split(r'(?<=[.!?])\s+', para)
-            for sentence in sentences:
-                if len(current_chunk) + len(sentence) < chunk_size:
-                    current_chunk += sentence + " "
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = sentence + " "
-        else:
-            if len(current_chunk) + len(para) < chunk_size:
-                current_chunk += para + "\n\n"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para + "\n\n"
-    
-    # Add the last chunk
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    # Add overlap
-    if overlap > 0 and len(chunks) > 1:
-        overlapped_chunks = []
-        for i, chunk in enumerate(chunks):
-            if i > 0:
-                # Add overlap from previous chunk
-                prev_chunk = chunks[i-1]
-                overlap_text = prev_chunk[-overlap:] if len(prev_chunk) > overlap else prev_chunk
-                chunk = overlap_text + " " + chunk
-            overlapped_chunks.append(chunk)
-        return overlapped_chunks
-    
-    return chunks
+        spans = chunk_spans(buffer, chunk_size, overlap, separator, token_offsets)
+        if len(spans) > 1:
+            for start, end in spans[:-1]:
+                yield buffer[start:end]
+            buffer = buffer[spans[-1][0]:]
+    
+    if buffer:
+        for start, end in chunk_spans(buffer, chunk_size, overlap, separator, token_offsets):
+            yield buffer[start:end]
 
 
 def clean_text(text: str) -> str:
@@ -0,0 +1,201 @@
+# Request Tracing and Sampling Profiler
+
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+from app.config import get_settings
+
+# Innermost frames of threads parked waiting for work
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("rag_current_span", default=None)
+
+
+class Span:
+    """One timed step of a request; children are the steps inside it"""
+
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000.0
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Span tree as JSON-ready dicts; self_ms is the time not covered by children"""
+        origin = self.start if origin is None else origin
+        children = [child.to_dict(origin) for child in self.children]
+        duration = self.duration_ms
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000.0, 3),
+            "duration_ms": round(duration, 3),
+            "self_ms": round(max(duration - sum(c["duration_ms"] for c in children), 0.0), 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": children} if children else {})
+        }
+
+
+def current_span() -> Optional[Span]:
+    """Innermost open span of the running request, or None when not tracing"""
+    return _current_span.get()
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Span]:
+    """Open a new root span; spans opened inside the block become its children"""
+    root = Span(name, attrs)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span
+
+    A no-op (yielding None) outside a trace, so instrumented code pays only
+    a context variable lookup when tracing is off.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes to the current span (if tracing)"""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of the span trees of requests over a latency threshold"""
+
+    def __init__(self, threshold_ms: float, size: int = 100):
+        """
+        Initialize slow query log
+
+        Args:
+            threshold_ms: Requests taking at least this long are kept
+            size: Entries kept; the oldest is dropped first
+        """
+        self.threshold_ms = threshold_ms
+        self._entries: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, root: Span, **details: Any) -> bool:
+        """Keep a finished request trace if it was slow; returns whether it was kept"""
+        if root.duration_ms < self.threshold_ms:
+            return False
+        entry = {"timestamp": time.time(), **details, "trace": root.to_dict()}
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        return True
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Kept requests, slowest first"""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda e: e["trace"]["duration_ms"], reverse=True)
+
+    def clear(self) -> int:
+        """Drop every entry and return how many were dropped"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer statistics"""
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms,
+                "capacity": self._entries.maxlen,
+                "entries": len(self._entries),
+                "recorded": self.recorded
+            }
+
+
+@lru_cache(maxsize=1)
+def get_slow_query_log() -> SlowQueryLog:
+    """Get the process-wide slow query log"""
+    settings = get_settings()
+    return SlowQueryLog(settings.slow_query_threshold_ms, settings.slow_query_log_size)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+    """
+    Sample every thread's Python stack for a while
+
+    Blocks the calling thread (which is itself excluded) for `seconds`.
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        include_idle: Keep stacks of threads parked waiting for work
+
+    Returns:
+        Dictionary with sample counts and the collapsed stacks
+        ('thread;outer;...;inner count' lines, flamegraph.pl input)
+    """
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not include_idle and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(labels))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {
+        "seconds": seconds,
+        "interval_ms": interval * 1000.0,
+        "samples": samples,
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    }
@@ -0,0 +1,189 @@
+# Chunker Micro-Benchmark
+#
+# Usage:
+#   python -m benchmarks.chunking --sizes-mb 1 4 16
+#   python -m benchmarks.chunking --sizes-mb 4 --tokens --model /data/models/minilm
+#
+# Compares the single-pass offset chunker with the previous string-building
+# implementation (kept below as legacy_chunk_text) on synthetic documents
+# built from the sample corpus.
+
+import argparse
+import json
+import os
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from app.config import get_settings
+from app.utils import chunk_spans, chunk_text
+
+SAMPLE_DOCS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "sample_medical_docs.json")
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 512, overlap: int = 50, separator: str = "\n\n") -> List[str]:
+    """The chunker as it was before offset-based chunking, for comparison"""
+    paragraphs = text.split(separator)
+
+    chunks = []
+    current_chunk = ""
+
+    for para in paragraphs:
+        para = para.strip()
+        if not para:
+            continue
+
+        if len(para) > chunk_size:
+            sentences = re.split(r'(?<=[.!?])\s+', para)
+            for sentence in sentences:
+                if len(current_chunk) + len(sentence) < chunk_size:
+                    current_chunk += sentence + " "
+                else:
+                    if current_chunk:
+                        chunks.append(current_chunk.strip())
+                    current_chunk = sentence + " "
+        else:
+            if len(current_chunk) + len(para) < chunk_size:
+                current_chunk += para + "\n\n"
+            else:
+                if current_chunk:
+                    chunks.append(current_chunk.strip())
+                current_chunk = para + "\n\n"
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    if overlap > 0 and len(chunks) > 1:
+        overlapped_chunks = []
+        for i, chunk in enumerate(chunks):
+            if i > 0:
+                prev_chunk = chunks[i-1]
+                overlap_text = prev_chunk[-overlap:] if len(prev_chunk) > overlap else prev_chunk
+                chunk = overlap_text + " " + chunk
+            overlapped_chunks.append(chunk)
+        return overlapped_chunks
+
+    return chunks
+
+
+def build_document(size_mb: float, path: str = SAMPLE_DOCS_PATH) -> str:
+    """Repeat the sample corpus, one paragraph per document, up to size_mb"""
+    with open(path) as f:
+        paragraphs = [doc.get('content', '').strip() for doc in json.load(f)]
+
+    target = int(size_mb * 1024 * 1024)
+    parts, length, i = [], 0, 0
+    while length < target:
+        paragraph = paragraphs[i % len(paragraphs)]
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+        i += 1
+    return "\n\n".join(parts)[:target]
+
+
+def _measure(fn: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(min(timings), 4),
+        "peak_alloc_mb": round(peak / (1024 * 1024), 2),
+        "chunks": len(result)
+    }
+
+
+def run(
+    sizes_mb: List[float],
+    chunk_size: int,
+    overlap: int,
+    repeats: int = 3,
+    token_offsets: Callable = None,
+    token_budget: int = 0,
+    token_overlap: int = 0
+) -> Dict[str, Any]:
+    """
+    Time the chunkers on documents of each size
+
+    Args:
+        sizes_mb: Document sizes in MB
+        chunk_size: Character chunk size
+        overlap: Character overlap
+        repeats: Timing repetitions (fastest is reported)
+        token_offsets: Tokenizer offset function, to also time token mode
+        token_budget: Token chunk size for token mode
+        token_overlap: Token overlap for token mode
+
+    Returns:
+        Report dictionary
+    """
+    report = {"chunk_size": chunk_size, "overlap": overlap, "results": []}
+
+    for size_mb in sizes_mb:
+        text = build_document(size_mb)
+        entry = {
+            "size_mb": size_mb,
+            "legacy": _measure(lambda: legacy_chunk_text(text, chunk_size, overlap), repeats),
+            "chunk_spans": _measure(lambda: chunk_spans(text, chunk_size, overlap), repeats),
+            "chunk_text": _measure(lambda: chunk_text(text, chunk_size, overlap), repeats)
+        }
+        entry["speedup_spans"] = round(entry["legacy"]["seconds"] / max(entry["chunk_spans"]["seconds"], 1e-9), 2)
+        entry["speedup_text"] = round(entry["legacy"]["seconds"] / max(entry["chunk_text"]["seconds"], 1e-9), 2)
+
+        if token_offsets:
+            entry["tokens"] = _measure(
+                lambda: chunk_spans(text, token_budget, token_overlap, token_offsets=token_offsets),
+                1
+            )
+            entry["tokens"]["chunk_size"] = token_budget
+
+        report["results"].append(entry)
+
+    return report
+
+
+def main() -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Chunker micro-benchmark")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--chunk-size", type=int, default=settings.max_chunk_size)
+    parser.add_argument("--overlap", type=int, default=settings.chunk_overlap)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tokens", action="store_true", help="Also time token-budget chunking")
+    parser.add_argument("--model", default=settings.embedding_model, help="Model whose tokenizer is used")
+    args = parser.parse_args()
+
+    token_offsets, token_budget = None, 0
+    if args.tokens:
+        from app.models.embeddings import EmbeddingModel
+
+        model = EmbeddingModel(
+            args.model,
+            backend=settings.embedding_backend,
+            onnx_path=settings.embedding_onnx_path
+        )
+        token_offsets = model.token_offsets
+        token_budget = settings.chunk_max_tokens or model.token_budget
+
+    result = run(
+        args.sizes_mb,
+        args.chunk_size,
+        args.overlap,
+        repeats=args.repeats,
+        token_offsets=token_offsets,
+        token_budget=token_budget,
+        token_overlap=settings.chunk_overlap_tokens
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
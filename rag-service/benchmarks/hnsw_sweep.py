@@ -0,0 +1,199 @@
+# HNSW Parameter Sweep
+#
+# Usage:
+#   python -m benchmarks.hnsw_sweep --size 20000
+#   python -m benchmarks.hnsw_sweep --from-collection --m 16 32 --search-ef 32 64 128
+#
+# Rebuilds a scratch Chroma collection for every combination of M,
+# construction_ef and search_ef (Chroma fixes all three when a collection is
+# created) and reports build time, index size on disk, query latency and
+# recall@k against brute-force search over the same embeddings. The
+# recommendation is the fastest combination reaching --target-recall; put it
+# in CHROMA_HNSW_M / CHROMA_HNSW_CONSTRUCTION_EF / CHROMA_HNSW_SEARCH_EF and
+# reset (or re-ingest) the collection.
+#
+# With --from-collection the embeddings come from the configured collection
+# (read only), so the sweep reflects the deployment's own data.
+
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import chromadb
+import numpy as np
+from chromadb.config import Settings as ChromaSettings
+from app.config import get_settings
+from app.services.vector_index import ExactVectorIndex
+from benchmarks.vector_search import _CHROMA_BATCH, _recall, _time_queries, synthetic_embeddings
+
+
+def _collection_embeddings(size: int) -> np.ndarray:
+    """Up to `size` embeddings of the configured collection"""
+    settings = get_settings()
+    client = chromadb.PersistentClient(
+        path=settings.chroma_persist_dir,
+        settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    collection = client.get_collection(settings.chroma_collection_name)
+    index = ExactVectorIndex(settings.embedding_dimension, distance_metric=settings.chroma_distance_metric)
+    index.load(collection)
+    vectors, _, _, _ = index.export()
+    return np.asarray(vectors[:size], dtype=np.float32)
+
+
+def _perturbed_queries(vectors: np.ndarray, count: int, noise: float = 0.5, seed: int = 1) -> np.ndarray:
+    """Queries near (not at) stored vectors, so the nearest neighbour is not trivially the vector itself"""
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    scale = noise * np.linalg.norm(picked, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    queries = picked + scale * rng.standard_normal(picked.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _build(persist_dir: str, vectors: np.ndarray, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    client = chromadb.PersistentClient(path=persist_dir, settings=ChromaSettings(anonymized_telemetry=False))
+    collection = client.create_collection("sweep", metadata=metadata)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), _CHROMA_BATCH):
+        end = offset + _CHROMA_BATCH
+        collection.add(ids=ids[offset:end], embeddings=vectors[offset:end].tolist())
+    build_seconds = time.perf_counter() - start
+
+    # The HNSW segment is the one directory beside chroma.sqlite3
+    segment_dirs = [
+        os.path.join(persist_dir, name)
+        for name in os.listdir(persist_dir)
+        if os.path.isdir(os.path.join(persist_dir, name))
+    ]
+    return {
+        "collection": collection,
+        "build_seconds": round(build_seconds, 3),
+        "index_mb": round(sum(_directory_bytes(d) for d in segment_dirs) / 1e6, 2)
+    }
+
+
+def run(
+    vectors: np.ndarray,
+    m_values: List[int],
+    construction_ef_values: List[int],
+    search_ef_values: List[int],
+    top_k: int = 10,
+    queries: int = 200,
+    metric: str = "cosine",
+    target_recall: float = 0.95
+) -> Dict[str, Any]:
+    """
+    Build and query one scratch collection per parameter combination
+
+    Args:
+        vectors: Embeddings to index
+        m_values: hnsw:M values
+        construction_ef_values: hnsw:construction_ef values
+        search_ef_values: hnsw:search_ef values
+        top_k: Neighbours per query (recall@k)
+        queries: Queries timed per combination
+        metric: Distance metric
+        target_recall: Recall the recommendation must reach
+
+    Returns:
+        Report dictionary
+    """
+    query_vectors = _perturbed_queries(vectors, queries)
+
+    exact = ExactVectorIndex(vectors.shape[1], distance_metric=metric)
+    exact.add([f"chunk-{i}" for i in range(len(vectors))], vectors, [""] * len(vectors), [{}] * len(vectors))
+    truth = exact.query(query_vectors, top_k=top_k)['ids']
+
+    results = []
+    for m, construction_ef, search_ef in itertools.product(m_values, construction_ef_values, search_ef_values):
+        metadata = {
+            "hnsw:space": metric,
+            "hnsw:M": m,
+            "hnsw:construction_ef": construction_ef,
+            "hnsw:search_ef": search_ef
+        }
+        with tempfile.TemporaryDirectory() as persist_dir:
+            built = _build(persist_dir, vectors, metadata)
+            timed = _time_queries(
+                lambda q: built["collection"].query(query_embeddings=[q.tolist()], n_results=top_k, include=[])['ids'][0],
+                query_vectors
+            )
+        results.append({
+            "m": m,
+            "construction_ef": construction_ef,
+            "search_ef": search_ef,
+            "build_seconds": built["build_seconds"],
+            "index_mb": built["index_mb"],
+            "latency": timed["latency"],
+            "recall_at_k": _recall(timed["ids"], truth)
+        })
+
+    qualifying = [r for r in results if r["recall_at_k"] >= target_recall]
+    recommended: Optional[Dict[str, Any]] = min(qualifying, key=lambda r: r["latency"]["p50_ms"], default=None)
+
+    return {
+        "size": len(vectors),
+        "dimension": vectors.shape[1],
+        "top_k": top_k,
+        "queries": queries,
+        "metric": metric,
+        "target_recall": target_recall,
+        "results": results,
+        "recommended": recommended
+    }
+
+
+def main() -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="HNSW parameter sweep")
+    parser.add_argument("--size", type=int, default=10000, help="Chunks to index")
+    parser.add_argument("--from-collection", action="store_true", help="Index the configured collection's embeddings")
+    parser.add_argument("--dimension", type=int, default=settings.embedding_dimension)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--metric", default=settings.chroma_distance_metric)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    args = parser.parse_args()
+
+    if args.from_collection:
+        vectors = _collection_embeddings(args.size)
+    else:
+        vectors = synthetic_embeddings(args.size, args.dimension)
+
+    result = run(
+        vectors,
+        args.m,
+        args.construction_ef,
+        args.search_ef,
+        top_k=args.top_k,
+        queries=args.queries,
+        metric=args.metric,
+        target_recall=args.target_recall
+    )
+    result["current"] = {
+        "m": settings.chroma_hnsw_m,
+        "construction_ef": settings.chroma_hnsw_construction_ef,
+        "search_ef": settings.chroma_hnsw_search_ef
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+# Retrieval Benchmark and Load Test
+#
+# Usage:
+#   python -m benchmarks.retrieval --sizes 1000 10000 100000 --output bench.json
+#   python -m benchmarks.retrieval --sizes 1000 --baseline main.json --tolerance 0.2
+#
+# Grows a synthetic medical corpus (built from data/sample_medical_docs.json)
+# through 1k, 10k and 100k chunks in a throwaway collection, driving the
+# in-process app over ASGI exactly as a client would. At each size it reports
+# ingest throughput, single-query p50/p95/p99, throughput under concurrent
+# load and the recall@k of the HNSW collection against exact search.
+#
+# Runs offline on CPU once the embedding model is in the local model cache
+# (or EMBEDDING_MODEL points at a local directory). Result and query caches
+# are disabled unless --with-cache, so repeated runs measure the cold path.
+# With --baseline the run exits non-zero when a metric regresses by more
+# than the tolerance, which is how CI compares runs.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Nothing from app (or the other benchmarks, which import it) is imported at
+# module level: settings are read once on first import, and main() has to put
+# the throwaway collection and cache switches in the environment before that.
+
+SAMPLE_DOCS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "sample_medical_docs.json")
+
+# Matches the /documents/add-batch limit (MAX_DOCUMENTS_PER_BATCH)
+_INGEST_BATCH = 100
+
+# Metrics compared against a baseline, and whether higher is better
+_COMPARED = {
+    "ingest.chunks_per_second": True,
+    "latency.vector.p95_ms": False,
+    "latency.hybrid.p95_ms": False,
+    "load.max_qps": True,
+    "recall.hnsw_recall_at_k": True
+}
+
+
+def _sentences() -> List[Dict[str, Any]]:
+    with open(SAMPLE_DOCS_PATH) as f:
+        docs = json.load(f)
+    return [
+        {"text": sentence, "metadata": doc["metadata"], "doc": i}
+        for i, doc in enumerate(docs)
+        for sentence in re.split(r'(?<=[.!?])\s+', doc["content"].strip())
+        if len(sentence.split()) >= 5
+    ]
+
+
+def build_corpus(chunks: int, max_chars: int = 480, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Deterministic synthetic documents, each short enough to be a single chunk
+
+    Every document mixes sentences of one sample document (whose metadata it
+    takes) with one from another, behind a unique case header, so the corpus
+    has realistic topical clusters without exact duplicates. The same seed
+    always yields the same sequence, so a smaller corpus is a prefix of a
+    larger one.
+
+    Args:
+        chunks: Number of documents (= chunks)
+        max_chars: Upper bound on document length, below MAX_CHUNK_SIZE
+        seed: Random seed
+
+    Returns:
+        List of {"content", "metadata"} documents
+    """
+    rng = random.Random(seed)
+    sentences = _sentences()
+    by_doc: Dict[int, List[Dict[str, Any]]] = {}
+    for sentence in sentences:
+        by_doc.setdefault(sentence["doc"], []).append(sentence)
+    doc_ids = sorted(by_doc)
+
+    corpus = []
+    for i in range(chunks):
+        primary = by_doc[doc_ids[i % len(doc_ids)]]
+        picked = rng.sample(primary, min(2, len(primary))) + [rng.choice(sentences)]
+        content = f"Case {i}: patient aged {rng.randint(1, 95)}, seen on day {rng.randint(1, 365)}."
+        for sentence in picked:
+            if len(content) + len(sentence["text"]) + 1 > max_chars:
+                break
+            content += " " + sentence["text"]
+        corpus.append({
+            "content": content,
+            "metadata": {**picked[0]["metadata"], "source": f"synthetic-{i}"}
+        })
+    return corpus
+
+
+def build_queries(count: int, seed: int = 1) -> List[str]:
+    """Distinct query strings: short word windows taken from the sample sentences"""
+    rng = random.Random(seed)
+    sentences = [s["text"] for s in _sentences()]
+    queries = []
+    seen = set()
+    for _ in range(count * 50):
+        if len(queries) >= count:
+            break
+        words = rng.choice(sentences).rstrip(".!?").split()
+        length = rng.randint(3, min(8, len(words)))
+        start = rng.randint(0, len(words) - length)
+        query = " ".join(words[start:start + length])
+        if query not in seen:
+            seen.add(query)
+            queries.append(query)
+    return queries
+
+
+def _percentiles(timings: List[float]) -> Dict[str, float]:
+    if not timings:
+        return {}
+    ms = np.asarray(timings) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3)
+    }
+
+
+async def _ingest(client, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    chunks = 0
+    start = time.perf_counter()
+    for offset in range(0, len(documents), _INGEST_BATCH):
+        response = await client.post("/documents/add-batch", json=documents[offset:offset + _INGEST_BATCH])
+        response.raise_for_status()
+        chunks += response.json()["total_chunks"]
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(documents),
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(chunks / max(elapsed, 1e-9), 1)
+    }
+
+
+async def _query(client, query: str, mode: str, top_k: int) -> int:
+    response = await client.post("/query", json={"query": query, "mode": mode, "top_k": top_k})
+    return response.status_code
+
+
+async def _sequential(client, queries: List[str], mode: str, top_k: int) -> Dict[str, Any]:
+    timings = []
+    errors = 0
+    for query in queries:
+        start = time.perf_counter()
+        status = await _query(client, query, mode, top_k)
+        timings.append(time.perf_counter() - start)
+        errors += status != 200
+    return {**_percentiles(timings), "errors": errors}
+
+
+async def _load(client, queries: List[str], concurrency: int, mode: str, top_k: int) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` clients each send their next query as soon as the last returns"""
+    pending = iter(queries)
+    timings = []
+    statuses: Dict[int, int] = {}
+
+    async def worker():
+        for query in pending:
+            start = time.perf_counter()
+            status = await _query(client, query, mode, top_k)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(queries),
+        "qps": round(len(timings) / max(elapsed, 1e-9), 1),
+        **_percentiles(timings),
+        "rejected": statuses.get(503, 0),
+        "errors": sum(n for status, n in statuses.items() if status not in (200, 503))
+    }
+
+
+def _measure_recall(chroma_service, embedding_model, queries: List[str], top_k: int) -> Dict[str, Any]:
+    """recall@k of the collection's HNSW index against brute-force search over the same embeddings"""
+    from app.services.vector_index import ExactVectorIndex
+    from benchmarks.vector_search import _recall
+
+    query_vectors = np.asarray(embedding_model.encode(queries), dtype=np.float32)
+
+    index = ExactVectorIndex(embedding_model.get_dimension(), distance_metric=chroma_service._distance_metric())
+    start = time.perf_counter()
+    index.load(chroma_service.collection)
+    load_seconds = time.perf_counter() - start
+
+    hnsw = chroma_service.collection.query(
+        query_embeddings=query_vectors.tolist(),
+        n_results=top_k,
+        include=[]
+    )['ids']
+    truth = index.query(query_vectors, top_k=top_k)['ids']
+
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "hnsw_recall_at_k": _recall(hnsw, truth),
+        "exact_load_seconds": round(load_seconds, 3)
+    }
+
+
+async def _run(
+    sizes: List[int],
+    queries: int,
+    load_requests: int,
+    concurrency: List[int],
+    modes: List[str],
+    top_k: int,
+    seed: int
+) -> List[Dict[str, Any]]:
+    import httpx
+    from app.api.routes import get_services
+    from app.main import app
+
+    corpus = build_corpus(max(sizes), seed=seed)
+    query_pool = build_queries(queries * len(modes) + load_requests * len(concurrency) + queries, seed=seed + 1)
+    results = []
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+            chroma_service, embedding_model = get_services()
+            ingested = 0
+
+            for size in sorted(sizes):
+                entry: Dict[str, Any] = {"size": size}
+                entry["ingest"] = await _ingest(client, corpus[ingested:size])
+                ingested = size
+                entry["collection_chunks"] = chroma_service.count()
+
+                # Each measurement gets its own queries so none is answered from a cache
+                offset = 0
+
+                def take(n: int) -> List[str]:
+                    nonlocal offset
+                    taken = query_pool[offset:offset + n]
+                    offset += n
+                    return taken
+
+                entry["latency"] = {mode: await _sequential(client, take(queries), mode, top_k) for mode in modes}
+
+                levels = [await _load(client, take(load_requests), c, modes[0], top_k) for c in concurrency]
+                best = max(levels, key=lambda level: level["qps"])
+                entry["load"] = {
+                    "mode": modes[0],
+                    "levels": levels,
+                    "max_qps": best["qps"],
+                    "max_qps_concurrency": best["concurrency"]
+                }
+
+                entry["recall"] = await asyncio.to_thread(
+                    _measure_recall, chroma_service, embedding_model, take(queries), top_k
+                )
+                results.append(entry)
+                print(f"size {size}: done", file=sys.stderr)
+
+    return results
+
+
+def run(
+    sizes: List[int],
+    queries: int = 200,
+    load_requests: int = 400,
+    concurrency: List[int] = (1, 4, 16, 64),
+    modes: List[str] = ("vector", "hybrid"),
+    top_k: int = 5,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Ingest, latency, load and recall benchmark against the in-process app
+
+    The service settings (CHROMA_PERSIST_DIR and caches in particular) must
+    be set in the environment before this is called; see main().
+
+    Args:
+        sizes: Collection sizes in chunks, measured in increasing order
+        queries: Queries timed per mode and used for recall
+        load_requests: Requests sent at each concurrency level
+        concurrency: Concurrent clients of the load test
+        modes: Retrieval modes timed one query at a time; the first is load tested
+        top_k: Results per query (recall@k)
+        seed: Corpus and query seed
+
+    Returns:
+        Report dictionary
+    """
+    from app.config import get_settings
+
+    settings = get_settings()
+    results = asyncio.run(_run(list(sizes), queries, load_requests, list(concurrency), list(modes), top_k, seed))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "embedding_model": settings.embedding_model,
+            "embedding_backend": settings.embedding_backend,
+            "vector_index_mode": settings.vector_index_mode,
+            "cache": settings.enable_cache
+        },
+        "parameters": {
+            "queries": queries,
+            "load_requests": load_requests,
+            "concurrency": list(concurrency),
+            "modes": list(modes),
+            "top_k": top_k,
+            "seed": seed
+        },
+        "results": results
+    }
+
+
+def _lookup(entry: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = entry
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Metrics that got worse than the baseline by more than `tolerance`
+
+    Sizes and metrics missing from either report are skipped.
+
+    Args:
+        report: This run's report
+        baseline: Earlier report to compare against
+        tolerance: Allowed relative change in the bad direction (0.2 = 20%)
+
+    Returns:
+        One {"size", "metric", "baseline", "current", "change"} entry per regression
+    """
+    previous = {entry["size"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+
+    for entry in report["results"]:
+        if entry["size"] not in previous:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            current = _lookup(entry, metric)
+            before = _lookup(previous[entry["size"]], metric)
+            if current is None or before is None or before == 0:
+                continue
+            change = (current - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({
+                    "size": entry["size"],
+                    "metric": metric,
+                    "baseline": before,
+                    "current": current,
+                    "change": round(change, 4)
+                })
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retrieval benchmark and load test")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--load-requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--modes", nargs="+", choices=["vector", "lexical", "hybrid"], default=["vector", "hybrid"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-cache", action="store_true", help="Keep the result, embedding and semantic caches on")
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--baseline", help="Earlier report; exit 1 if a metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as persist_dir:
+        # Settings are read once on first import, so they go in the environment first
+        os.environ["CHROMA_PERSIST_DIR"] = persist_dir
+        os.environ["JOBS_DIR"] = os.path.join(persist_dir, "jobs")
+        if not args.with_cache:
+            os.environ["ENABLE_CACHE"] = "false"
+            os.environ["ENABLE_SEMANTIC_CACHE"] = "false"
+
+        result = run(
+            args.sizes,
+            queries=args.queries,
+            load_requests=args.load_requests,
+            concurrency=args.concurrency,
+            modes=args.modes,
+            top_k=args.top_k,
+            seed=args.seed
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
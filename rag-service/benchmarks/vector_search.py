@@ -0,0 +1,222 @@
+# Vector Search Benchmark (HNSW vs Exact)
+#
+# Usage:
+#   python -m benchmarks.vector_search --sizes 1000 10000 50000
+#   python -m benchmarks.vector_search --sizes 20000 --dimension 768 --dtypes float32 float16
+#   python -m benchmarks.vector_search --corpus medical --sizes 10000 --dtypes float32 float16 int8
+#
+# Builds a Chroma collection and an ExactVectorIndex over the same embeddings
+# at each collection size, then reports per-query latency of both and the
+# recall@k of HNSW (and of float16/int8 storage, with and without float32
+# rescoring, served from a mapped snapshot as the service does) against
+# exact float32 search.
+#
+# Embeddings are synthetic by default; --corpus medical embeds the synthetic
+# medical corpus of benchmarks.retrieval with the configured embedding model.
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+import chromadb
+import numpy as np
+from chromadb.config import Settings as ChromaSettings
+from app.config import get_settings
+from app.services.vector_index import ExactVectorIndex
+from app.services.vector_snapshot import open_snapshot, save_snapshot
+
+# Largest upsert Chroma accepts in one call
+_CHROMA_BATCH = 5000
+
+
+def synthetic_embeddings(count: int, dimension: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random topic centroids, like real chunk embeddings"""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def medical_embeddings(count: int, queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Embeddings of the synthetic medical corpus and of distinct queries, from the configured model"""
+    from app.models.embeddings import get_embedding_model
+    from benchmarks.retrieval import build_corpus, build_queries
+
+    settings = get_settings()
+    model = get_embedding_model(settings.embedding_model, settings.embedding_device)
+    documents = [doc["content"] for doc in build_corpus(count)]
+    return (
+        np.asarray(model.encode(documents), dtype=np.float32),
+        np.asarray(model.encode(build_queries(queries)), dtype=np.float32)
+    )
+
+
+def _percentiles(timings: List[float]) -> Dict[str, float]:
+    ms = np.asarray(timings) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "mean_ms": round(float(ms.mean()), 3)
+    }
+
+
+def _recall(found: List[List[str]], truth: List[List[str]]) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return round(hits / max(sum(len(t) for t in truth), 1), 4)
+
+
+def _time_queries(search, queries: np.ndarray) -> Dict[str, Any]:
+    timings, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ids.append(search(query))
+        timings.append(time.perf_counter() - start)
+    return {"latency": _percentiles(timings), "ids": ids}
+
+
+def run(
+    sizes: List[int],
+    dimension: int,
+    top_k: int = 10,
+    queries: int = 200,
+    metric: str = "cosine",
+    dtypes: List[str] = ("float32", "float16", "int8"),
+    rescore: int = 4,
+    corpus: str = "synthetic"
+) -> Dict[str, Any]:
+    """
+    Compare HNSW and exact search at each collection size
+
+    Args:
+        sizes: Collection sizes (number of chunks)
+        dimension: Embedding dimension
+        top_k: Neighbours per query (recall@k)
+        queries: Queries timed per index
+        metric: Distance metric of both indexes
+        dtypes: Exact index storage types to test (float32 first: it is the reference)
+        rescore: Candidates per result rescored in float32 for float16/int8 (0 = skip)
+        corpus: 'synthetic' vectors or the 'medical' corpus run through the embedding model
+
+    Returns:
+        Report dictionary
+    """
+    report = {
+        "corpus": corpus,
+        "dimension": dimension,
+        "top_k": top_k,
+        "queries": queries,
+        "metric": metric,
+        "rescore": rescore,
+        "results": []
+    }
+
+    for size in sizes:
+        if corpus == "medical":
+            vectors, query_vectors = medical_embeddings(size, queries)
+            report["dimension"] = dimension = vectors.shape[1]
+        else:
+            vectors = synthetic_embeddings(size, dimension)
+            query_vectors = synthetic_embeddings(queries, dimension, seed=size + 1)
+        ids = [f"chunk-{i}" for i in range(size)]
+        metadatas = [{"category": f"c{i % 8}"} for i in range(size)]
+        documents = [""] * size
+
+        with tempfile.TemporaryDirectory() as persist_dir:
+            client = chromadb.PersistentClient(path=persist_dir, settings=ChromaSettings(anonymized_telemetry=False))
+            collection = client.create_collection("benchmark", metadata={"hnsw:space": metric})
+
+            start = time.perf_counter()
+            for offset in range(0, size, _CHROMA_BATCH):
+                end = offset + _CHROMA_BATCH
+                collection.add(
+                    ids=ids[offset:end],
+                    embeddings=vectors[offset:end].tolist(),
+                    metadatas=metadatas[offset:end],
+                    documents=documents[offset:end]
+                )
+            entry = {"size": size, "hnsw": {"build_seconds": round(time.perf_counter() - start, 3)}}
+
+            hnsw = _time_queries(
+                lambda q: collection.query(query_embeddings=[q.tolist()], n_results=top_k, include=[])['ids'][0],
+                query_vectors
+            )
+            entry["hnsw"]["latency"] = hnsw["latency"]
+
+            truth = None
+            for dtype in dtypes:
+                index = ExactVectorIndex(dimension, distance_metric=metric, dtype=dtype)
+                index.keep_full_precision()
+                start = time.perf_counter()
+                index.add(ids, vectors, documents, metadatas)
+                build_seconds = time.perf_counter() - start
+
+                exact = _time_queries(lambda q: index.query(q, top_k)['ids'][0], query_vectors)
+                if truth is None:
+                    truth = exact["ids"]
+                filtered = _time_queries(
+                    lambda q: index.query(q, top_k, filter_metadata={"category": "c0"})['ids'][0],
+                    query_vectors
+                )
+
+                entry[f"exact_{dtype}"] = {
+                    "build_seconds": round(build_seconds, 3),
+                    "matrix_mb": index.stats()["matrix_mb"],
+                    "latency": exact["latency"],
+                    "filtered_latency": filtered["latency"],
+                    "recall_at_k": _recall(exact["ids"], truth)
+                }
+
+                if dtype != "float32" and rescore > 0:
+                    # Mapped from a snapshot and rescored from its float32 rows, as in ChromaService
+                    snapshot_dir = os.path.join(persist_dir, f"snapshot-{dtype}")
+                    save_snapshot(index, snapshot_dir, "benchmark")
+                    mapped = open_snapshot(snapshot_dir)
+                    mapped.enable_rescoring(rescore)
+                    rescored = _time_queries(lambda q: mapped.query(q, top_k)['ids'][0], query_vectors)
+                    entry[f"exact_{dtype}_rescored"] = {
+                        "latency": rescored["latency"],
+                        "recall_at_k": _recall(rescored["ids"], truth)
+                    }
+
+            entry["hnsw"]["recall_at_k"] = _recall(hnsw["ids"], truth)
+            entry["exact_speedup_p50"] = round(
+                entry["hnsw"]["latency"]["p50_ms"] / max(entry[f"exact_{dtypes[0]}"]["latency"]["p50_ms"], 1e-6),
+                2
+            )
+
+        report["results"].append(entry)
+
+    return report
+
+
+def main() -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="HNSW vs exact vector search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimension", type=int, default=settings.embedding_dimension)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--metric", default=settings.chroma_distance_metric)
+    parser.add_argument("--dtypes", nargs="+", choices=["float32", "float16", "int8"], default=["float32", "float16", "int8"])
+    parser.add_argument("--rescore", type=int, default=settings.vector_index_rescore)
+    parser.add_argument("--corpus", choices=["synthetic", "medical"], default="synthetic")
+    args = parser.parse_args()
+
+    result = run(
+        args.sizes,
+        args.dimension,
+        top_k=args.top_k,
+        queries=args.queries,
+        metric=args.metric,
+        dtypes=args.dtypes,
+        rescore=args.rescore,
+        corpus=args.corpus
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
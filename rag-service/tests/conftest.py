@@ -0,0 +1,40 @@
+# Shared test fixtures
+
+import hashlib
+from typing import List, Union
+import numpy as np
+import pytest
+from app.services.chroma_service import ChromaService
+
+DIMENSION = 64
+
+
+class StubEmbeddingModel:
+    """Deterministic bag-of-words embeddings, so tests need no model download"""
+
+    def get_dimension(self) -> int:
+        return DIMENSION
+
+    def encode(self, texts: Union[str, List[str]], show_progress: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), DIMENSION), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSION] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+@pytest.fixture
+def embedding_model() -> StubEmbeddingModel:
+    return StubEmbeddingModel()
+
+
+@pytest.fixture
+def chroma_service(tmp_path, embedding_model) -> ChromaService:
+    """A ChromaService over an empty scratch directory"""
+    return ChromaService(str(tmp_path / "chroma"), "test_collection", embedding_model, "cosine")
@@ -0,0 +1,48 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.services.ingestion_service import prepare_document
+
+
+@pytest.fixture
+def client(monkeypatch, chroma_service, embedding_model):
+    chroma_service.sync_documents([
+        prepare_document("Fever and chills are common with infections.", {"doc_id": "fever"}, chunk=False)
+    ])
+    monkeypatch.setattr(routes, "get_services", lambda: (chroma_service, embedding_model))
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+def test_collection_info_and_reset_run_off_the_event_loop(client, chroma_service, monkeypatch):
+    calls = []
+    executor_run = routes.get_query_executor().run
+    executor_run_waiting = routes.get_ingest_executor().run_waiting
+
+    async def run(fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await executor_run(fn, *args, **kwargs)
+
+    async def run_waiting(fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await executor_run_waiting(fn, *args, **kwargs)
+
+    monkeypatch.setattr(routes.get_query_executor(), "run", run)
+    monkeypatch.setattr(routes.get_ingest_executor(), "run_waiting", run_waiting)
+
+    assert client.get("/collection/info").json()['count'] == 1
+    assert client.delete("/collection/reset").json()['success']
+    assert chroma_service.count() == 0
+    assert calls == ["get_collection_info", "reset_collection"]
+
+
+def test_add_document_keeps_the_status_of_http_errors(client, chroma_service, monkeypatch):
+    monkeypatch.setattr(chroma_service, "sync_documents", lambda documents: {"success": False, "error": "disk full"})
+
+    response = client.post("/documents/add", json={"content": "Asthma causes wheezing.", "metadata": {}})
+
+    assert response.status_code == 500
+    assert response.json()['detail'] == "disk full"
@@ -0,0 +1,32 @@
+import pytest
+from app.models import embeddings
+from conftest import DIMENSION, StubEmbeddingModel
+
+
+class StubBackend(StubEmbeddingModel):
+    tokenizer = None
+    dimension = DIMENSION
+    do_lower_case = True
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(embeddings, "create_backend", lambda *args, **kwargs: StubBackend())
+    return embeddings.EmbeddingModel("stub", cache_max_mb=1)
+
+
+def test_cached_bytes_do_not_grow_with_text_length(model):
+    model.encode(["fever"])
+    short = model.cache.stats()['bytes']
+    model.clear_cache()
+
+    model.encode(["fever " * 2000])
+
+    assert model.cache.stats()['bytes'] == short
+    assert short == DIMENSION * 4 + embeddings._EMBEDDING_ENTRY_BYTES
+
+
+def test_normalized_texts_share_a_cache_entry(model):
+    model.encode(["Chest  Pain", "chest pain"])
+
+    assert len(model.cache) == 1
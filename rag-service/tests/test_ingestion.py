@@ -0,0 +1,71 @@
+from app.services.ingestion_service import document_key, prepare_document
+
+
+def _stored_sources(chroma_service):
+    return sorted(m['source'] for m in chroma_service.collection.get(include=["metadatas"])['metadatas'])
+
+
+def test_documents_sharing_source_in_one_batch_are_all_stored(chroma_service):
+    a = prepare_document("Fever is a raised body temperature.", {"source": "guide.pdf"}, chunk=False)
+    b = prepare_document("Chest pain may signal a heart attack.", {"source": "guide.pdf"}, chunk=False)
+
+    result = chroma_service.sync_documents([a, b])
+
+    assert result['success']
+    assert result['documents'] == 2
+    assert chroma_service.count() == 2
+
+
+def test_documents_sharing_source_synced_separately_do_not_delete_each_other(chroma_service):
+    a = prepare_document("Fever is a raised body temperature.", {"source": "guide.pdf"}, chunk=False)
+    b = prepare_document("Chest pain may signal a heart attack.", {"source": "guide.pdf"}, chunk=False)
+
+    chroma_service.sync_documents([a])
+    result = chroma_service.sync_documents([b])
+
+    assert result['deleted'] == 0
+    assert chroma_service.count() == 2
+
+
+def test_doc_id_replaces_the_previous_version(chroma_service):
+    old = prepare_document("Old advice on fever.", {"doc_id": "fever", "source": "guide.pdf"}, chunk=False)
+    new = prepare_document("New advice on fever.", {"doc_id": "fever", "source": "guide.pdf"}, chunk=False)
+
+    chroma_service.sync_documents([old])
+    result = chroma_service.sync_documents([new])
+
+    assert (result['added'], result['deleted']) == (1, 1)
+    assert chroma_service.collection.get(include=["documents"])['documents'] == ["New advice on fever."]
+
+
+def test_conflicting_documents_under_one_doc_id_are_rejected(chroma_service):
+    a = prepare_document("First text.", {"doc_id": "same"}, chunk=False)
+    b = prepare_document("Second text.", {"doc_id": "same"}, chunk=False)
+
+    result = chroma_service.sync_documents([a, b])
+
+    assert not result['success']
+    assert result['conflicts'] == ["same"]
+    assert chroma_service.count() == 0
+
+
+def test_repeated_document_in_one_batch_is_synced_once(chroma_service):
+    a = prepare_document("Fever is a raised body temperature.", {"source": "guide.pdf"}, chunk=False)
+
+    result = chroma_service.sync_documents([a, dict(a)])
+
+    assert result['success']
+    assert result['duplicate_documents'] == 1
+    assert chroma_service.count() == 1
+
+
+def test_add_documents_derives_the_same_ids_as_prepare_document(chroma_service):
+    text = "Migraine causes throbbing headaches."
+    metadata = {"source": "neurology", "topic": "migraine"}
+    prepared = prepare_document(text, metadata, chunk=False)
+
+    result = chroma_service.add_documents([text], [metadata])
+
+    assert result['ids'] == prepared['ids']
+    assert prepared['doc_key'] == document_key(metadata, prepared['content_hash'])
+    assert _stored_sources(chroma_service) == ["neurology"]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import job_routes
+from app.services.executor import BoundedExecutor
+from app.services.job_service import JobManager, JobStore
+from app.services.stream_ingestion import DocumentTooLargeError
+
+
+@pytest.fixture
+def job_manager(tmp_path, chroma_service):
+    executor = BoundedExecutor("test-ingest", max_workers=1, max_queue=4)
+    return JobManager(JobStore(str(tmp_path / "jobs.db")), chroma_service, executor, str(tmp_path))
+
+
+async def _body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_submit_stream_writes_every_document_to_the_payload(job_manager, monkeypatch):
+    monkeypatch.setattr("app.services.job_service._WRITE_BUFFER_BYTES", 64)
+    documents = [{"content": f"Document {i} " + "x" * 40} for i in range(20)]
+    body = b"".join(json.dumps(doc).encode() + b"\n\n" for doc in documents)
+
+    async def submit():
+        job_manager._queue = asyncio.Queue()
+        return await job_manager.submit_stream(_body(body[:100], body[100:]), 10_000)
+
+    job = asyncio.run(submit())
+
+    with open(job_manager.store.get(job['id'])['payload_path'], "rb") as f:
+        assert [json.loads(line) for line in f] == documents
+    assert job['total_documents'] == 20
+
+
+def test_submit_stream_removes_the_payload_of_a_rejected_upload(job_manager, tmp_path):
+    async def submit():
+        job_manager._queue = asyncio.Queue()
+        return await job_manager.submit_stream(_body(b"x" * 100), 10)
+
+    with pytest.raises(DocumentTooLargeError):
+        asyncio.run(submit())
+    assert not list(tmp_path.glob("*.ndjson"))
+
+
+def _run_job(job_manager, documents):
+    async def submit():
+        job_manager._queue = asyncio.Queue()
+        return await job_manager.submit_documents(documents)
+
+    record = job_manager.store.get(asyncio.run(submit())['id'])
+    while record['status'] != "completed":
+        record = job_manager._run_batch(record)
+    return record
+
+
+def test_resubmitted_doc_id_replaces_its_old_chunks(job_manager, chroma_service):
+    _run_job(job_manager, [{"content": "Fever and chills.", "metadata": {"doc_id": "fever"}}])
+    record = _run_job(job_manager, [{"content": "Fever, chills and sweats.", "metadata": {"doc_id": "fever"}}])
+
+    stored = chroma_service.collection.get(include=["documents"])
+    assert stored['documents'] == ["Fever, chills and sweats."]
+    assert (record['added'], record['deleted']) == (1, 1)
+
+
+def test_conflicting_doc_id_in_one_batch_fails_only_the_later_document(job_manager, chroma_service):
+    record = _run_job(job_manager, [
+        {"content": "Fever and chills.", "metadata": {"doc_id": "fever"}},
+        {"content": "Asthma causes wheezing.", "metadata": {"doc_id": "fever"}},
+        {"content": "Migraine causes headaches.", "metadata": {"doc_id": "migraine"}}
+    ])
+
+    assert record['failed_documents'] == 1
+    assert record['errors'][0]['document'] == 2
+    assert chroma_service.count() == 2
+
+
+def test_job_with_non_object_documents_is_rejected(job_manager, chroma_service, tmp_path, monkeypatch):
+    async def get_jobs():
+        return job_manager
+
+    monkeypatch.setattr(job_routes, "get_jobs", get_jobs)
+    app = FastAPI()
+    app.include_router(job_routes.jobs_router)
+
+    response = TestClient(app).post("/jobs", json=[{"content": "Fever."}, "not a document"])
+
+    assert response.status_code == 400
+    assert not list(tmp_path.glob("*.ndjson"))
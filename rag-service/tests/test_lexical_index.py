@@ -0,0 +1,171 @@
+import pytest
+from app.services.ingestion_service import prepare_document
+from chromadb.api.types import validate_where as chroma_validate_where
+from app.services.lexical_index import BM25Index, matches_where, validate_where
+
+
+def _ids(results):
+    return [id_ for id_, _ in results]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add(
+        ["fever", "asthma", "migraine"],
+        [
+            "High fever and chills in children",
+            "Asthma causes wheezing and shortness of breath",
+            "Migraine causes throbbing headaches"
+        ],
+        [
+            {"topic": "fever", "urgency": 2},
+            {"topic": "asthma", "urgency": 3},
+            {"topic": "migraine", "urgency": 1}
+        ]
+    )
+    return index
+
+
+def test_search_ranks_the_chunk_sharing_the_rare_term_first(index):
+    assert _ids(index.search("wheezing at night"))[0] == "asthma"
+    assert index.search("the of and") == []
+
+
+def test_incremental_add_is_searchable_and_counted(index):
+    index.add(["rash"], ["Itchy rash after fever"], [{"topic": "skin"}])
+
+    assert len(index) == 4
+    assert set(_ids(index.search("fever"))) == {"fever", "rash"}
+    assert index.stats()['chunks'] == 4
+
+
+def test_readding_an_id_replaces_its_text(index):
+    index.add(["fever"], ["Persistent cough"], [{"topic": "cough"}])
+
+    assert len(index) == 3
+    assert index.search("chills") == []
+    assert _ids(index.search("cough")) == ["fever"]
+    assert index.get(["fever"]) == [("Persistent cough", {"topic": "cough"})]
+
+
+def test_update_metadata_changes_filtering_not_text(index):
+    index.update_metadata(["migraine", "unknown"], [{"topic": "neuro", "urgency": 3}, {}])
+
+    assert index.get(["migraine"])[0] == ("Migraine causes throbbing headaches", {"topic": "neuro", "urgency": 3})
+    assert set(_ids(index.search("causes", filter_metadata={"urgency": 3}))) == {"asthma", "migraine"}
+    assert index.get(["unknown"]) == [None]
+
+
+def test_remove_drops_postings_of_its_terms(index):
+    index.remove(["migraine", "unknown"])
+
+    assert len(index) == 2
+    assert index.search("throbbing headaches") == []
+    assert "throbbing" not in index._postings
+
+
+def test_clear_empties_the_index(index):
+    index.clear()
+
+    assert len(index) == 0
+    assert index.search("fever") == []
+    assert index.stats()['terms'] == 0
+
+
+def test_search_applies_the_metadata_filter(index):
+    results = index.search("causes", filter_metadata={"topic": {"$ne": "asthma"}})
+
+    assert _ids(results) == ["migraine"]
+
+
+def test_chroma_service_keeps_the_index_in_sync(chroma_service):
+    index = chroma_service.enable_lexical_index()
+    old = prepare_document("Old advice on fever.", {"doc_id": "fever"}, chunk=False)
+    new = prepare_document("New advice on chills.", {"doc_id": "fever"}, chunk=False)
+
+    chroma_service.sync_documents([old])
+    assert _ids(index.search("fever")) == old['ids']
+
+    chroma_service.sync_documents([new])
+    assert index.search("fever") == []
+    assert _ids(index.search("chills")) == new['ids']
+
+    chroma_service.delete_documents(new['ids'])
+    assert len(index) == 0
+
+    chroma_service.sync_documents([old])
+    chroma_service.reset_collection()
+    assert len(index) == 0
+
+
+def test_enabling_the_index_loads_existing_chunks(chroma_service):
+    chroma_service.sync_documents([prepare_document("Asthma causes wheezing.", {"doc_id": "asthma"}, chunk=False)])
+
+    index = chroma_service.enable_lexical_index()
+
+    assert len(index) == 1
+    assert index.search("wheezing")
+
+
+@pytest.mark.parametrize("where, expected", [
+    (None, True),
+    ({}, True),
+    ({"topic": "fever"}, True),
+    ({"topic": "asthma"}, False),
+    ({"topic": {"$eq": "fever"}}, True),
+    ({"topic": {"$ne": "fever"}}, False),
+    ({"topic": {"$in": ["asthma", "fever"]}}, True),
+    ({"topic": {"$nin": ["asthma", "fever"]}}, False),
+    ({"urgency": {"$gt": 2}}, False),
+    ({"urgency": {"$gte": 2}}, True),
+    ({"urgency": {"$lt": 3, "$gt": 1}}, True),
+    ({"urgency": {"$lte": 1}}, False),
+    ({"missing": {"$gt": 0}}, False),
+    ({"missing": {"$ne": "x"}}, True),
+    ({"$and": [{"topic": "fever"}, {"urgency": 2}]}, True),
+    ({"$and": [{"topic": "fever"}, {"urgency": 3}]}, False),
+    ({"$or": [{"topic": "asthma"}, {"urgency": 2}]}, True),
+    ({"$or": [{"topic": "asthma"}, {"urgency": 3}]}, False),
+])
+def test_matches_where(where, expected):
+    assert matches_where({"topic": "fever", "urgency": 2}, where) is expected
+
+
+def test_matches_where_rejects_unknown_operators():
+    with pytest.raises(ValueError):
+        matches_where({"topic": "fever"}, {"topic": {"$regex": "f.*"}})
+
+
+@pytest.mark.parametrize("where", [
+    {"topic": "fever"},
+    {"urgency": {"$gte": 2}},
+    {"topic": {"$in": ["asthma", "fever"]}},
+    {"$and": [{"topic": "fever"}, {"$or": [{"urgency": 2}, {"urgency": {"$lt": 1.5}}]}]},
+])
+def test_validate_where_accepts_what_chroma_accepts(where):
+    validate_where(where)
+    chroma_validate_where(where)
+
+
+@pytest.mark.parametrize("where", [
+    {"topic": "x", "source": {"$bogus": 1}},
+    {"$and": [{"a": "x"}, {"b": {"$regex": 1}}]},
+    {"$or": "str"},
+    {"$or": [{"a": "x"}]},
+    {"$not": [{"a": "x"}, {"b": "y"}]},
+    {"topic": "x", "source": "y"},
+    {"urgency": {"$gt": 1, "$lt": 3}},
+    {"urgency": {"$gt": "2"}},
+    {"topic": {"$in": []}},
+    {"topic": {"$in": ["fever", 2]}},
+    {"topic": {"$nin": "fever"}},
+    {"topic": ["fever"]},
+    {"topic": None},
+    {"$and": [{"a": "x"}, "b"]},
+])
+def test_validate_where_rejects_malformed_filters(where):
+    with pytest.raises(ValueError):
+        validate_where(where)
+    with pytest.raises(ValueError):
+        chroma_validate_where(where)
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, generate_latest
+from app.api import routes
+from app.models.reranker import get_reranker
+from app.services.retrieval_service import RetrievalService
+
+
+def _fail():
+    raise AssertionError("a scrape must not initialize services")
+
+
+@pytest.fixture
+def services(monkeypatch, chroma_service, embedding_model):
+    """Route handlers see the test collection and stub model"""
+    monkeypatch.setattr(routes, "_chroma_service", chroma_service)
+    monkeypatch.setattr(routes, "_embedding_model", embedding_model)
+    return chroma_service, embedding_model
+
+
+def test_scrape_before_startup_loads_nothing(monkeypatch):
+    monkeypatch.setattr(routes, "_chroma_service", None)
+    monkeypatch.setattr(routes, "get_services", _fail)
+    monkeypatch.setattr(routes, "get_chroma_service", SimpleNamespace(cache_info=lambda: SimpleNamespace(currsize=0)))
+    reranker_created = get_reranker.cache_info().currsize
+
+    output = generate_latest(REGISTRY).decode()
+
+    assert "rag_executor_capacity" in output
+    assert "rag_collection_chunks" not in output
+    assert get_reranker.cache_info().currsize == reranker_created
+
+
+def test_scrape_reports_the_running_services(services):
+    _, embedding_model = services
+    embedding_model.get_cache_stats = lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75, "entries": 1}
+
+    output = generate_latest(REGISTRY).decode()
+
+    assert 'rag_collection_chunks{collection="test_collection"} 0.0' in output
+    assert 'rag_cache_hits_total{cache="embedding"} 3.0' in output
+
+
+def test_query_requests_feed_the_query_latency_histogram(monkeypatch, services):
+    from app import main
+
+    monkeypatch.setattr(main.settings, "enable_metrics", True)
+    monkeypatch.setattr(main.settings, "enable_query_batching", False)
+    monkeypatch.setattr(routes, "get_retrieval", lambda: RetrievalService(services[0]))
+    queries = REGISTRY.get_sample_value("rag_queries_total") or 0.0
+    observed = REGISTRY.get_sample_value("rag_query_duration_seconds_count") or 0.0
+
+    response = TestClient(main.app).post("/query", json={"query": "fever", "similarity_threshold": 0})
+
+    assert response.status_code == 200
+    assert REGISTRY.get_sample_value("rag_queries_total") == queries + 1
+    assert REGISTRY.get_sample_value("rag_query_duration_seconds_count") == observed + 1
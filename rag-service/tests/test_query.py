@@ -0,0 +1,77 @@
+import asyncio
+import json
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.services.ingestion_service import prepare_document
+from app.services.retrieval_service import RetrievalService
+from app.utils.tracing import trace
+
+
+@pytest.fixture
+def client(monkeypatch, chroma_service, embedding_model):
+    from app import main
+
+    chroma_service.sync_documents([
+        prepare_document("Fever and chills are common with infections.", {"doc_id": "fever", "source": "fever"}, chunk=False),
+        prepare_document("Asthma causes wheezing.", {"doc_id": "asthma", "source": "asthma"}, chunk=False)
+    ])
+    monkeypatch.setattr(routes, "_chroma_service", chroma_service)
+    monkeypatch.setattr(routes, "_embedding_model", embedding_model)
+    monkeypatch.setattr(routes, "get_retrieval", lambda: RetrievalService(chroma_service))
+    monkeypatch.setattr(routes.settings, "enable_query_batching", False)
+    monkeypatch.setattr(routes.settings, "enable_single_flight", False)
+    monkeypatch.setattr(routes, "get_query_cache", lambda: None)
+    return TestClient(main.app)
+
+
+def test_query_is_serialized_inside_the_build_response_span(client):
+    request = routes.QueryRequest(query="fever chills", top_k=1, similarity_threshold=0)
+
+    async def run():
+        with trace("POST /query") as root:
+            response = await routes.query_knowledge(request)
+        return root, response
+
+    root, response = asyncio.run(run())
+
+    assert isinstance(response, Response)
+    assert [child.name for child in root.children][-1] == "build_response"
+    body = json.loads(response.body)
+    assert body['count'] == 1
+    assert body['results'][0]['metadata']['source'] == "fever"
+
+
+def test_query_response_matches_the_schema(client):
+    response = client.post("/query", json={"query": "fever chills", "top_k": 1, "similarity_threshold": 0})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == "application/json"
+    body = response.json()
+    assert set(body) == set(routes.QueryResponse.model_fields)
+    assert routes.QueryResponse(**body).results[0]['metadata']['source'] == "fever"
+
+
+def test_batch_query_keeps_request_order(client):
+    response = client.post("/query/batch", json={"queries": [
+        {"query": "asthma wheezing", "top_k": 1, "similarity_threshold": 0},
+        {"query": "fever chills", "top_k": 1, "similarity_threshold": 0}
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count'] == 2
+    assert [r['results'][0]['metadata']['source'] for r in body['results']] == ["asthma", "fever"]
+
+
+@pytest.mark.parametrize("where", [
+    {"topic": "x", "source": {"$bogus": 1}},
+    {"$and": [{"a": "x"}, {"b": {"$regex": 1}}]},
+    {"$or": "str"},
+])
+def test_malformed_where_filter_is_a_client_error(client, where):
+    response = client.post("/query", json={"query": "fever", "where": where})
+
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith("Invalid where filter")
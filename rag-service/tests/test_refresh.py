@@ -0,0 +1,95 @@
+import os
+import pytest
+from app.services.chroma_service import ChromaService
+from app.services.ingestion_service import prepare_document
+from app.services.vector_snapshot import CURRENT_LINK, read_manifest
+
+
+def _document(doc_id, text):
+    return prepare_document(text, {"doc_id": doc_id, "source": doc_id}, chunk=False)
+
+
+@pytest.fixture
+def workers(tmp_path, embedding_model):
+    """Two services on one persist directory, as two worker processes would have"""
+    return [
+        ChromaService(str(tmp_path / "chroma"), "test_collection", embedding_model, "cosine")
+        for _ in range(2)
+    ]
+
+
+def test_refresh_picks_up_another_workers_writes(workers):
+    writer, reader = workers
+    reader.enable_lexical_index()
+    assert reader.count() == 0
+    version = reader.version
+
+    writer.sync_documents([_document("fever", "Fever and chills are common with infections.")])
+
+    assert reader.refresh()
+    assert reader.count() == 1
+    assert [id_ for id_, _ in reader.lexical_index.search("chills")] == writer.collection.get()['ids']
+    assert reader.version > version
+    assert not reader.refresh()
+
+
+def test_own_writes_do_not_reload(chroma_service):
+    chroma_service.enable_lexical_index()
+    index = chroma_service.lexical_index
+
+    chroma_service.sync_documents([_document("fever", "Fever and chills.")])
+    chroma_service.sync_documents([_document("fever", "Fever, chills and sweats.")])
+    chroma_service.delete_documents(chroma_service.collection.get()['ids'])
+
+    assert not chroma_service.refresh()
+    assert chroma_service.lexical_index is index
+
+
+def test_write_interleaved_with_another_worker_reloads(workers, monkeypatch):
+    writer, reader = workers
+    reader.enable_lexical_index()
+    write_started = reader._write_started
+
+    def racing_the_writer():
+        started = write_started()
+        writer.sync_documents([_document("asthma", "Asthma causes wheezing.")])
+        return started
+
+    monkeypatch.setattr(reader, "_write_started", racing_the_writer)
+    reader.sync_documents([_document("fever", "Fever and chills.")])
+
+    assert reader.refresh()
+    assert len(reader.lexical_index) == 2
+
+
+def test_refresh_rebuilds_the_exact_index(workers, tmp_path, embedding_model):
+    writer, reader = workers
+    reader.enable_exact_index(dtype="int8", snapshot_dir=str(tmp_path / "snapshot"), rescore=2)
+    assert len(reader.vector_index) == 0
+
+    writer.sync_documents([_document("fever", "Fever and chills are common with infections.")])
+    assert reader.refresh()
+
+    assert len(reader.vector_index) == 1
+    assert reader.vector_index.rescore_factor == 2
+    result = reader.query_by_embeddings([embedding_model.encode_query("fever chills")], top_k=1)
+    assert result['results'][0][0]['metadata']['source'] == "fever"
+
+
+def test_workers_refreshing_a_snapshot_share_one_new_version(workers, tmp_path, embedding_model):
+    snapshot_dir = str(tmp_path / "snapshot")
+    writer, reader = workers
+    third = ChromaService(writer.persist_directory, writer.collection_name, embedding_model, "cosine")
+    for service in workers + [third]:
+        service.enable_exact_index(snapshot_dir=snapshot_dir)
+    before = read_manifest(snapshot_dir)['fingerprint']
+
+    writer.sync_documents([_document("fever", "Fever and chills are common with infections.")])
+    assert reader.refresh()
+    version = os.readlink(os.path.join(snapshot_dir, CURRENT_LINK))
+    assert third.refresh()
+
+    assert os.readlink(os.path.join(snapshot_dir, CURRENT_LINK)) == version
+    assert read_manifest(snapshot_dir)['fingerprint'] not in (None, before)
+    assert reader.vector_index.mapped and third.vector_index.mapped
+    assert len(third.vector_index) == 1
@@ -0,0 +1,102 @@
+import time
+from typing import List, Optional, Tuple
+import pytest
+from app.services.ingestion_service import prepare_document
+from app.services.retrieval_service import RetrievalService
+from app.services.semantic_cache import SemanticCache
+from conftest import DIMENSION
+
+DOCUMENTS = {
+    "fever": "Fever and chills are common with infections.",
+    "asthma": "Asthma causes wheezing and chest tightness.",
+    "migraine": "Migraine causes throbbing headaches and nausea.",
+    "rash": "A rash with fever may need urgent care."
+}
+
+
+class StubReranker:
+    """Scores 1.0 for the chunk a query prefers (or containing its first word), else 0.0"""
+
+    def __init__(self, preferred=None):
+        self.preferred = preferred or {}
+        self.passes = []
+
+    def cached_scores(self, query: str, chunk_ids: List[str]) -> List[Optional[float]]:
+        return [None] * len(chunk_ids)
+
+    def estimate_seconds(self, pairs: int) -> float:
+        return 0.0
+
+    def score(self, pairs: List[Tuple[str, str, str]]) -> List[float]:
+        self.passes.append(len(pairs))
+        return [
+            float(text == DOCUMENTS[self.preferred[query]] if query in self.preferred else query.lower() in text.lower())
+            for query, _, text in pairs
+        ]
+
+
+@pytest.fixture
+def retrieval(chroma_service):
+    chroma_service.sync_documents([
+        prepare_document(text, {"doc_id": doc_id, "source": doc_id}, chunk=False)
+        for doc_id, text in DOCUMENTS.items()
+    ])
+    return RetrievalService(chroma_service, reranker=StubReranker(), rerank_candidates=4)
+
+
+def _top_sources(response):
+    return [result['results'][0]['metadata']['source'] for result in response['results']]
+
+
+def test_rerank_scores_each_query_of_a_batch_against_its_own_pool(retrieval):
+    # The query with a deadline is re-ranked after the one without, so the
+    # shared pass scores the pools in a different order than the batch
+    queries = [
+        {"query_text": "asthma wheezing", "top_k": 1, "rerank": True, "deadline": time.perf_counter() + 60},
+        {"query_text": "migraine headaches", "top_k": 1, "rerank": True}
+    ]
+
+    retrieval.reranker.preferred = {"asthma wheezing": "rash", "migraine headaches": "fever"}
+
+    response = retrieval.search(queries)
+
+    assert response['success']
+    assert _top_sources(response) == ["rash", "fever"]
+    assert retrieval.reranker.passes == [8]
+    for result in response['results']:
+        assert result['rerank']['applied']
+        assert result['results'][0]['rerank_score'] == 1.0
+
+
+def test_query_past_its_deadline_keeps_first_stage_order(retrieval):
+    retrieval.reranker.estimate_seconds = lambda pairs: 10.0
+    queries = [
+        {"query_text": "fever", "top_k": 2, "rerank": True, "deadline": time.perf_counter() + 1},
+        {"query_text": "rash", "top_k": 2, "rerank": True}
+    ]
+
+    response = retrieval.search(queries)
+
+    assert response['results'][0]['rerank'] == {"applied": False, "reason": "budget"}
+    assert response['results'][1]['rerank']['applied']
+    assert retrieval.reranker.passes == [4]
+
+
+def test_semantic_cache_hit_is_fused_with_its_own_lexical_hits(chroma_service):
+    chroma_service.sync_documents([
+        prepare_document(text, {"doc_id": doc_id, "source": doc_id}, chunk=False)
+        for doc_id, text in DOCUMENTS.items()
+    ])
+    chroma_service.enable_lexical_index()
+    retrieval = RetrievalService(chroma_service, semantic_cache=SemanticCache(DIMENSION, max_distance=0.5))
+
+    def search(text):
+        response = retrieval.search([{"query_text": text, "top_k": 4, "mode": "hybrid"}])
+        return response['results'][0]
+
+    search("fever infections")
+    near_duplicate = search("fever infections wheezing")
+
+    assert near_duplicate['cache']['hit']
+    bm25 = {hit['metadata']['source']: hit['bm25_score'] for hit in near_duplicate['results']}
+    assert bm25['asthma'] is not None
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import boto3
+import pytest
+from moto import mock_aws
+from app.services.executor import BoundedExecutor
+from app.services.job_service import JobManager, JobStore
+from app.services.s3_service import S3Service
+
+BUCKET = "medical-docs"
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def s3_service(chroma_service, s3_client):
+    return S3Service(chroma_service, BUCKET, max_workers=2, batch_size=2, page_size=2, client=s3_client)
+
+
+def _put(client, key, body):
+    client.put_object(Bucket=BUCKET, Key=key, Body=body.encode("utf-8"))
+
+
+def _stored_documents(chroma_service):
+    return sorted(chroma_service.collection.get(include=["documents"])['documents'])
+
+
+def test_every_page_of_the_listing_is_ingested(s3_service, s3_client, chroma_service):
+    for i in range(5):
+        _put(s3_client, f"guides/topic-{i}.txt", f"Guide number {i} on common symptoms.")
+    _put(s3_client, "guides/index.csv", "not,a,document")
+
+    pages = list(s3_service.list_objects("guides/"))
+    report = s3_service.ingest("guides/")
+
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert report['success']
+    assert (report['listed'], report['unsupported'], report['downloaded']) == (6, 1, 5)
+    assert chroma_service.count() == 5
+
+
+def test_unchanged_objects_are_skipped_by_etag(s3_service, s3_client, chroma_service):
+    for i in range(3):
+        _put(s3_client, f"topic-{i}.md", f"Notes {i} on fever management.")
+    s3_service.ingest()
+
+    report = s3_service.ingest()
+
+    assert (report['unchanged'], report['downloaded'], report['added']) == (3, 0, 0)
+    assert chroma_service.count() == 3
+
+
+def test_changed_object_is_reingested(s3_service, s3_client, chroma_service):
+    _put(s3_client, "fever.txt", "Old advice on fever.")
+    _put(s3_client, "cough.txt", "Advice on coughs.")
+    s3_service.ingest()
+
+    _put(s3_client, "fever.txt", "New advice on fever.")
+    report = s3_service.ingest()
+
+    assert (report['unchanged'], report['downloaded']) == (1, 1)
+    assert (report['added'], report['deleted']) == (1, 1)
+    assert _stored_documents(chroma_service) == ["Advice on coughs.", "New advice on fever."]
+
+
+def test_text_object_is_chunked_paragraph_by_paragraph(s3_service, s3_client, chroma_service):
+    paragraphs = [f"Paragraph {i} " + "about chest pain " * 20 for i in range(6)]
+    _put(s3_client, "chest-pain.txt", "\n\n".join(paragraphs))
+
+    s3_service.ingest()
+
+    stored = chroma_service.collection.get(include=["documents", "metadatas"])
+    assert len(stored['documents']) > 1
+    assert all(len(chunk) <= 512 for chunk in stored['documents'])
+    assert {m['title'] for m in stored['metadatas']} == {"chest-pain"}
+    assert {m['doc_id'] for m in stored['metadatas']} == {f"s3://{BUCKET}/chest-pain.txt"}
+
+
+def test_json_object_with_a_list_is_stored_as_separate_documents(s3_service, s3_client, chroma_service):
+    documents = [{"content": "Asthma causes wheezing."}, {"content": "Eczema causes itchy skin."}]
+    _put(s3_client, "conditions.json", json.dumps(documents))
+
+    report = s3_service.ingest()
+
+    assert report['documents'] == 2
+    assert _stored_documents(chroma_service) == ["Asthma causes wheezing.", "Eczema causes itchy skin."]
+
+
+def test_s3_job_runs_the_ingest_in_the_background(tmp_path, chroma_service, s3_service, s3_client):
+    _put(s3_client, "fever.txt", "Advice on fever.")
+    manager = JobManager(
+        JobStore(str(tmp_path / "jobs.db")),
+        chroma_service,
+        BoundedExecutor("test-ingest", max_workers=1, max_queue=4),
+        str(tmp_path / "jobs"),
+        s3_service=s3_service
+    )
+
+    async def run():
+        manager._queue = asyncio.Queue()
+        job = manager.submit_s3()
+        await manager._run_job(manager._queue.get_nowait())
+        return job, manager.get(job['id'])
+
+    queued, finished = asyncio.run(run())
+
+    assert (queued['kind'], queued['status']) == ("s3", "queued")
+    assert finished['status'] == "completed"
+    assert finished['result']['downloaded'] == 1
+    assert chroma_service.count() == 1
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from app.services.stream_ingestion import DocumentTooLargeError, iter_lines
+
+
+async def _body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _lines(*chunks, max_line_bytes=100):
+    async def collect():
+        return [line async for line in iter_lines(_body(*chunks), max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def test_lines_split_across_reads_are_joined():
+    assert _lines(b'{"a":', b' 1}\n{"b"', b': 2}\n', b'{"c": 3}') == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_blank_lines_and_trailing_newline_are_kept_as_empty_lines():
+    assert _lines(b"x\n\ny\n") == [b"x", b"", b"y"]
+
+
+def test_oversized_line_complete_within_one_read_is_rejected():
+    with pytest.raises(DocumentTooLargeError):
+        _lines(b"short\n" + b"x" * 101 + b"\nshort\n")
+
+
+def test_oversized_line_spread_over_reads_is_rejected():
+    with pytest.raises(DocumentTooLargeError):
+        _lines(b"x" * 60, b"x" * 60, b"\n")
+
+
+def test_line_at_the_limit_is_accepted():
+    assert _lines(b"x" * 50, b"x" * 50 + b"\n") == [b"x" * 100]
@@ -0,0 +1,70 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.utils.document_parsers import parse_and_chunk
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, chroma_service, embedding_model):
+    async def parse_in_process(path, kind):
+        return parse_and_chunk(path, kind, 512, 50)
+
+    monkeypatch.setattr(routes, "get_services", lambda: (chroma_service, embedding_model))
+    monkeypatch.setattr(routes, "parse_file", parse_in_process)
+    monkeypatch.setattr(routes.settings, "upload_dir", str(tmp_path / "uploads"))
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+def _files(*names):
+    return [("files", (name, f"Notes from {name} on fever.".encode(), "text/plain")) for name in names]
+
+
+def _stored_sources(chroma_service):
+    return sorted(m['source'] for m in chroma_service.collection.get(include=["metadatas"])['metadatas'])
+
+
+def test_files_uploaded_together_are_stored_under_their_own_names(client, chroma_service):
+    response = client.post(
+        "/documents/upload",
+        files=_files("a.txt", "b.txt", "c.txt"),
+        data={"metadata": json.dumps({"category": "triage"})}
+    )
+
+    assert response.status_code == 200
+    assert response.json()['success']
+    assert _stored_sources(chroma_service) == ["a.txt", "b.txt", "c.txt"]
+
+
+@pytest.mark.parametrize("field", ["source", "doc_id", "file_type"])
+def test_metadata_may_not_override_file_fields(client, chroma_service, field):
+    response = client.post(
+        "/documents/upload",
+        files=_files("a.txt", "b.txt"),
+        data={"metadata": json.dumps({field: "shared"})}
+    )
+
+    assert response.status_code == 400
+    assert chroma_service.count() == 0
+
+
+def test_duplicate_filenames_are_rejected(client, chroma_service):
+    response = client.post("/documents/upload", files=_files("a.txt", "a.txt"))
+
+    assert response.status_code == 400
+    assert chroma_service.count() == 0
+
+
+def test_reuploading_a_file_replaces_its_chunks(client, chroma_service):
+    client.post("/documents/upload", files=_files("a.txt"))
+    response = client.post(
+        "/documents/upload",
+        files=[("files", ("a.txt", b"Revised notes on fever.", "text/plain"))]
+    )
+
+    assert response.json()['files'][0]['deleted'] == 1
+    assert chroma_service.collection.get(include=["documents"])['documents'] == ["Revised notes on fever."]
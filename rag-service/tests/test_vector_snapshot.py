@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import pytest
+from chromadb.api.client import SharedSystemClient
+from chromadb.segment.impl.vector.local_persistent_hnsw import PersistentLocalHnswSegment
+from app.services.chroma_service import ChromaService
+from app.services.ingestion_service import prepare_document
+from app.services.vector_snapshot import CURRENT_LINK, LOCK_FILE, open_snapshot, read_manifest, save_snapshot
+
+
+def _document(doc_id, text, **metadata):
+    return prepare_document(text, {"doc_id": doc_id, **metadata}, chunk=False)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    return str(tmp_path / "snapshot")
+
+
+@pytest.fixture
+def seeded(chroma_service):
+    chroma_service.sync_documents([
+        _document("fever", "Fever and chills."),
+        _document("asthma", "Asthma causes wheezing.")
+    ])
+    return chroma_service
+
+
+def _restart(service, snapshot_dir):
+    """A new service over the same persisted collection, with the exact index enabled"""
+    fresh = ChromaService(service.persist_directory, service.collection_name, service.embedding_function, "cosine")
+    fresh.enable_exact_index(snapshot_dir=snapshot_dir)
+    return fresh
+
+
+def test_unchanged_collection_maps_the_snapshot(seeded, snapshot_dir):
+    seeded.enable_exact_index(snapshot_dir=snapshot_dir)
+
+    restarted = _restart(seeded, snapshot_dir)
+
+    assert read_manifest(snapshot_dir)['fingerprint'] == seeded.content_fingerprint()
+    assert restarted.vector_index.mapped
+
+
+def test_write_by_another_process_with_the_same_count_is_detected(seeded, snapshot_dir):
+    seeded.enable_exact_index(snapshot_dir=snapshot_dir)
+
+    # Written without the exact index, so nothing invalidates the snapshot
+    other = ChromaService(seeded.persist_directory, seeded.collection_name, seeded.embedding_function, "cosine")
+    other.sync_documents([_document("fever", "Fever and chills.", topic="fever")])
+
+    restarted = _restart(seeded, snapshot_dir)
+
+    assert read_manifest(snapshot_dir)['fingerprint'] == other.content_fingerprint()
+    assert [m.get('topic') for m in restarted.vector_index.export()[3]].count("fever") == 1
+
+
+def test_own_write_invalidates_the_snapshot(seeded, snapshot_dir):
+    seeded.enable_exact_index(snapshot_dir=snapshot_dir)
+
+    seeded.sync_documents([_document("migraine", "Migraine causes headaches.")])
+
+    assert read_manifest(snapshot_dir) is None
+    restarted = _restart(seeded, snapshot_dir)
+    assert len(restarted.vector_index) == 3
+    assert read_manifest(snapshot_dir)['count'] == 3
+
+
+def test_reset_invalidates_the_snapshot(seeded, snapshot_dir):
+    seeded.enable_exact_index(snapshot_dir=snapshot_dir)
+
+    seeded.reset_collection()
+
+    assert read_manifest(snapshot_dir) is None
+
+
+def test_saving_swaps_in_a_new_directory_and_keeps_the_previous_one(seeded, snapshot_dir):
+    index = seeded.enable_exact_index(snapshot_dir=snapshot_dir)
+    first = os.readlink(os.path.join(snapshot_dir, CURRENT_LINK))
+    mapped = open_snapshot(snapshot_dir)
+
+    save_snapshot(index, snapshot_dir, "second")
+    second = os.readlink(os.path.join(snapshot_dir, CURRENT_LINK))
+    save_snapshot(index, snapshot_dir, "third")
+    third = os.readlink(os.path.join(snapshot_dir, CURRENT_LINK))
+
+    assert len({first, second, third}) == 3
+    assert sorted(name for name in os.listdir(snapshot_dir) if name not in (CURRENT_LINK, LOCK_FILE)) == sorted([second, third])
+    assert read_manifest(snapshot_dir)['fingerprint'] == "third"
+    # An index mapped from a removed version keeps reading its files
+    assert sorted(mapped.export()[1]) == sorted(index.export()[1])
+
+
+def test_legacy_single_directory_snapshot_is_read_and_replaced(seeded, snapshot_dir, tmp_path):
+    index = seeded.enable_exact_index()
+    save_snapshot(index, snapshot_dir, seeded.content_fingerprint())
+    live = os.path.join(snapshot_dir, os.readlink(os.path.join(snapshot_dir, CURRENT_LINK)))
+    os.remove(os.path.join(snapshot_dir, CURRENT_LINK))
+    for name in os.listdir(live):
+        os.replace(os.path.join(live, name), os.path.join(snapshot_dir, name))
+    os.rmdir(live)
+
+    assert read_manifest(snapshot_dir)['count'] == 2
+    assert len(open_snapshot(snapshot_dir)) == 2
+
+    save_snapshot(index, snapshot_dir, "new")
+    assert sorted(os.listdir(snapshot_dir)) == sorted([CURRENT_LINK, os.readlink(os.path.join(snapshot_dir, CURRENT_LINK))])
+
+
+def _hnsw_loaded(service):
+    return any(
+        isinstance(segment, PersistentLocalHnswSegment)
+        for segment in service.client._server._manager._instances.values()
+    )
+
+
+def _cosine_distances(service, query):
+    stored = service.collection.get(include=["embeddings"])
+    vectors = np.asarray(stored['embeddings'], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return dict(zip(stored['ids'], (1.0 - vectors @ (query / np.linalg.norm(query))).tolist())), vectors, stored['ids']
+
+
+def test_compact_snapshot_rescores_from_its_float32_rows_without_loading_hnsw(seeded, snapshot_dir, embedding_model):
+    # A Chroma system of its own, as another worker process would have
+    SharedSystemClient.clear_system_cache()
+    worker = ChromaService(seeded.persist_directory, seeded.collection_name, embedding_model, "cosine")
+    index = worker.enable_exact_index(dtype="int8", snapshot_dir=snapshot_dir, rescore=2)
+    query = embedding_model.encode_query("fever chills")
+
+    hits = worker.query_by_embeddings([query], top_k=2)['results'][0]
+    expected, vectors, ids = _cosine_distances(seeded, query)
+
+    assert index.mapped and index.stats()['full_precision_rows']
+    assert [hit['id'] for hit in hits] == sorted(expected, key=expected.get)
+    assert [hit['distance'] for hit in hits] == pytest.approx(sorted(expected.values()), abs=1e-6)
+    embeddings = worker.get_embeddings(ids)
+    assert np.allclose([embeddings[id_] for id_ in ids], vectors, atol=1e-6)
+    assert not _hnsw_loaded(worker)
+
+
+def test_compact_snapshot_rescores_rows_written_since(seeded, snapshot_dir, embedding_model):
+    index = seeded.enable_exact_index(dtype="float16", snapshot_dir=snapshot_dir, rescore=2)
+
+    seeded.sync_documents([_document("migraine", "Migraine causes headaches.")])
+    query = embedding_model.encode_query("migraine headaches")
+    hits = seeded.query_by_embeddings([query], top_k=3)['results'][0]
+    expected, _, _ = _cosine_distances(seeded, query)
+
+    assert len(index) == 3 and index.rescoring
+    assert {hit['id']: hit['distance'] for hit in hits} == pytest.approx(expected, abs=1e-6)
+
+
+def test_compact_index_needs_a_snapshot_directory(chroma_service):
+    with pytest.raises(ValueError, match="snapshot directory"):
+        chroma_service.enable_exact_index(dtype="int8")